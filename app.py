@@ -3,6 +3,13 @@ import pandas as pd
 from datetime import datetime
 from modules.pension import PensionRebalancing
 from modules.history import TransactionHistory
+from modules.nav import PortfolioNav
+from modules.quote_cache import quote_cache
+from modules.fetch_executor import fetch_executor
+from modules.market_poller import get_market_poller
+from modules.metrics import upstream_metrics
+from modules.profiler import script_profiler
+from modules.settings import PROFILE_ENABLED
 
 # 페이지 설정
 st.set_page_config(
@@ -12,6 +19,17 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# 프로파일링 (환경 변수 또는 사이드바 토글로 켠 경우 이번 실행 전체를 샘플링)
+script_profiler.begin_run(PROFILE_ENABLED or st.session_state.get('profile_enabled', False))
+
+# 이번 렌더링의 upstream 요청 마감 시각 설정 및 실행별 계측 시작
+fetch_executor.begin_render()
+upstream_metrics.begin_rerun()
+
+# 거래내역은 화면을 그리는 동안 백그라운드에서 미리 조회
+history = TransactionHistory()
+history_future = fetch_executor.submit('gspread', history.fetch_history) if history.gc else None
+
 # CSS 스타일 주입
 st.markdown("""
     <style>
@@ -164,42 +182,76 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-# Ticker Row (Mock Data for Speed, or use simple fdr calls if preferred)
-# Using static placeholders for now to ensure layout, can be connected to real data later
-st.markdown("""
-    <div class="ticker-row">
-        <span class="ticker-item">S&P 500 <span class="ticker-up">▲ 5,088.80 (+1.03%)</span></span>
-        <span class="ticker-item">NASDAQ <span class="ticker-up">▲ 16,041.62 (+1.30%)</span></span>
-        <span class="ticker-item">KOSPI <span class="ticker-down">▼ 2,647.00 (-0.50%)</span></span>
-        <span class="ticker-item">USD/KRW <span class="ticker-up">▲ 1,330.00 (+0.15%)</span></span>
-        <span class="ticker-item">GOLD <span class="ticker-up">▲ 2,035.00 (+0.50%)</span></span>
-    </div>
-""", unsafe_allow_html=True)
-
-# 타이틀
-st.title("STOCK DASHBOARD")
-st.markdown(f"**SYSTEM TIME**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-
 # 사이드바
 with st.sidebar:
     st.header("SETTINGS")
     auto_refresh = st.checkbox("AUTO REFRESH (60s)", value=False)
 
-    if auto_refresh:
-        import time
-        time.sleep(60)
-        st.rerun()
+    # 자동 새로고침 시 시세 관련 영역(fragment)만 주기적으로 다시 실행
+    # 거래내역 등 나머지 화면은 그대로 유지되며 화면 조작도 막히지 않음
+    refresh_interval = 60 if auto_refresh else None
 
     st.markdown("---")
     st.info("MONITORING ACTIVE")
 
+    cache_stats = quote_cache.stats()
+    st.caption(
+        f"QUOTE CACHE: {cache_stats['hits']} hits / {cache_stats['misses']} misses "
+        f"(TTL {cache_stats['ttl']:.0f}s, {cache_stats['size']}/{cache_stats['maxsize']})"
+    )
+
+    # upstream 계측 패널 (이번 실행의 호출이 모두 끝난 뒤 화면 맨 끝에서 채움)
+    metrics_panel = st.container()
+
+    # 켜면 토글로 인한 재실행부터 매 실행의 flame graph와 상위 함수 표를 저장
+    st.toggle("PROFILE RUNS", key="profile_enabled", value=PROFILE_ENABLED, disabled=PROFILE_ENABLED)
+    profile_panel = st.container()
+
+# Ticker Row
+# 백그라운드 폴러가 게시한 최신 스냅샷을 메모리에서 읽어 표시 (세션 수와 무관하게 upstream 조회는 프로세스당 1회)
+market_poller = get_market_poller()
+
+def render_ticker_row():
+    snapshot = market_poller.snapshot
+    items_html = []
+
+    for item in (snapshot['items'] if snapshot else []):
+        if pd.isna(item['price']):
+            items_html.append(f'<span class="ticker-item">{item["label"]} -</span>')
+            continue
+
+        change = item['change_pct']
+        if pd.isna(change):
+            quote = f"{item['price']:,.2f}"
+        elif change >= 0:
+            quote = f'<span class="ticker-up">▲ {item["price"]:,.2f} ({change:+.2f}%)</span>'
+        else:
+            quote = f'<span class="ticker-down">▼ {item["price"]:,.2f} ({change:+.2f}%)</span>'
+        items_html.append(f'<span class="ticker-item">{item["label"]} {quote}</span>')
+
+    if not items_html:
+        items_html.append('<span class="ticker-item">LOADING MARKET DATA...</span>')
+
+    st.markdown(f"""
+        <div class="ticker-row">
+            {''.join(items_html)}
+        </div>
+    """, unsafe_allow_html=True)
+
+with script_profiler.section('ticker row'):
+    upstream_metrics.fragment(render_ticker_row, run_every=refresh_interval)()
+
+# 타이틀
+st.title("STOCK DASHBOARD")
+st.markdown(f"**SYSTEM TIME**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+
 # 탭 생성
-tab1, tab2, tab3 = st.tabs(["BY ACCOUNT", "ALL TRANSACTIONS", "PENSION REBALANCING"])
+tab1, tab2, tab3, tab4 = st.tabs(["BY ACCOUNT", "ALL TRANSACTIONS", "PENSION REBALANCING", "PERFORMANCE"])
 
 # 데이터 로드 (한 번만 로드하여 공유)
 try:
-    history = TransactionHistory()
-    df_history = history.get_history()
+    with script_profiler.section('ledger load'):
+        df_history = history.get_history(future=history_future)
 except Exception as e:
     st.error(f"DATA FETCH ERROR: {e}")
     df_history = pd.DataFrame()
@@ -209,21 +261,25 @@ with tab1:
     st.header("Transaction History by Account")
     
     if not df_history.empty:
-        accounts, account_col = history.get_accounts(df_history)
+        # 거래내역을 불러올 때 한 번 만들어 둔 계좌 인덱스 사용
+        account_index = history.get_account_index()
         
-        if accounts:
-            selected_account = st.selectbox("SELECT ACCOUNT", accounts)
+        if account_index is not None and account_index.accounts:
+            selected_account = st.selectbox("SELECT ACCOUNT", account_index.accounts)
             
-            if selected_account:
-                filtered_df = df_history[df_history[account_col] == selected_account]
-                styled_df = history.style_dataframe(filtered_df)
-                st.dataframe(styled_df, use_container_width=True, hide_index=True)
-                st.caption(f"Records: {len(filtered_df)}")
+            if selected_account is not None:
+                filtered_df = account_index.view(selected_account)
+                history.display_grid(filtered_df, key=f"account_{selected_account}")
+
+                stats = account_index.stats.loc[selected_account]
+                caption = f"Records: {stats['거래건수']}"
+                if '첫 거래일' in stats and pd.notna(stats['첫 거래일']):
+                    caption += f" | FIRST: {stats['첫 거래일']:%Y-%m-%d} | LAST: {stats['마지막 거래일']:%Y-%m-%d}"
+                st.caption(caption)
         else:
             st.warning("ACCOUNT COLUMN NOT FOUND IN DATA")
             # 계좌 컬럼을 못 찾으면 전체 데이터 표시
-            styled_df = history.style_dataframe(df_history)
-            st.dataframe(styled_df, use_container_width=True, hide_index=True)
+            history.display_grid(df_history, key="account_all")
     else:
         st.warning("NO DATA AVAILABLE")
 
@@ -232,20 +288,32 @@ with tab2:
     st.header("All Transactions")
     
     if not df_history.empty:
-        styled_df = history.style_dataframe(df_history)
-        st.dataframe(styled_df, use_container_width=True, hide_index=True)
+        history.display_grid(df_history, key="all_transactions")
         st.caption(f"Total Records: {len(df_history)}")
     else:
         st.warning("NO DATA AVAILABLE")
 
 # 3. 연금 리밸런싱 탭
+pension = PensionRebalancing(history=history)
+
 with tab3:
     try:
-        pension = PensionRebalancing()
-        pension.display_dashboard()
+        pension.display_dashboard(refresh_interval=refresh_interval)
     except Exception as e:
         st.error(f"DATA FETCH ERROR: {e}")
 
+# 4. 계좌별 평가금액 추이 탭
+with tab4:
+    st.header("Portfolio Performance")
+
+    if not df_history.empty:
+        # 연금 리밸런싱 자산의 검색어로도 종목명을 티커로 변환
+        aliases = {ticker: [info['search_key']] for ticker, info in pension.assets.items()}
+        nav = PortfolioNav(history, aliases=aliases)
+        upstream_metrics.fragment(nav.display_dashboard)()
+    else:
+        st.warning("NO DATA AVAILABLE")
+
 # 푸터
 st.markdown("---")
 st.markdown(
@@ -256,3 +324,12 @@ st.markdown(
     """,
     unsafe_allow_html=True
 )
+
+# upstream 계측 표시 및 내보내기
+with metrics_panel:
+    upstream_metrics.display_panel()
+upstream_metrics.end_rerun()
+
+# 프로파일 저장 및 결과 표시
+with profile_panel:
+    script_profiler.display_panel(script_profiler.end_run())
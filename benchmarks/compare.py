@@ -0,0 +1,73 @@
+"""두 벤치마크 결과 파일 비교
+
+사용법: python -m benchmarks.compare <기준.json> <비교.json> [--threshold 0.2]
+단계별 시간이 threshold 비율 이상 늘었거나 upstream 호출 수가 늘면 회귀로 표시하고 종료 코드 1을 반환합니다.
+"""
+import argparse
+import json
+import sys
+
+# 이보다 짧은 단계는 측정 오차가 커서 시간 회귀로 보지 않음
+MIN_SECONDS = 0.25
+
+
+def load(path):
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+
+    phases = {}
+    for result in data['results']:
+        for phase in result.get('phases', []):
+            phases[result['target'], result['size'], phase['phase']] = phase
+    return data, phases
+
+
+def compare(base, head, threshold):
+    """(행 목록, 회귀 수)
+
+    각 행: (대상, 크기, 단계, 기준 시간, 비교 시간, 변화율, 기준 호출 수, 비교 호출 수, 기준 메모리, 비교 메모리, 회귀 여부)
+    """
+    rows = []
+    regressions = 0
+    for key in sorted(base.keys() & head.keys(), key=lambda k: (k[0], k[1])):
+        before, after = base[key], head[key]
+        change = after['seconds'] / before['seconds'] - 1 if before['seconds'] > 0 else 0.0
+        calls_before, calls_after = sum(before['calls'].values()), sum(after['calls'].values())
+
+        regressed = (
+            (change > threshold and after['seconds'] >= MIN_SECONDS)
+            or calls_after > calls_before
+            or (bool(after['exceptions']) and not before['exceptions'])
+        )
+        regressions += regressed
+        rows.append((*key, before['seconds'], after['seconds'], change, calls_before, calls_after,
+                     before['peak_rss_mb'], after['peak_rss_mb'], regressed))
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('base')
+    parser.add_argument('head')
+    parser.add_argument('--threshold', type=float, default=0.2, help='시간 회귀로 볼 증가 비율 (기본 20%%)')
+    args = parser.parse_args()
+
+    base_data, base = load(args.base)
+    head_data, head = load(args.head)
+    rows, regressions = compare(base, head, args.threshold)
+
+    print(f"{base_data['label']} -> {head_data['label']}")
+    print(f"{'target':>8} {'size':>7} {'phase':<12} {'base(s)':>9} {'head(s)':>9} {'change':>8} {'calls':>9} {'peak MB':>11}")
+    for target, size, phase, t0, t1, change, c0, c1, m0, m1, regressed in rows:
+        print(f"{target:>8} {size:>7} {phase:<12} {t0:>9.3f} {t1:>9.3f} {change:>+8.0%} {c0:>4}->{c1:<4} "
+              f"{m0:>5.0f}->{m1:<5.0f}{'  REGRESSION' if regressed else ''}")
+
+    missing = base.keys() ^ head.keys()
+    if missing:
+        print(f"{len(missing)} phase(s) only in one file: {sorted(missing)[:5]}")
+
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
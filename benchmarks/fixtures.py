@@ -0,0 +1,220 @@
+"""pykrx, yfinance, FinanceDataReader, gspread를 대체하는 오프라인 고정 데이터
+
+모든 데이터는 티커/행 번호로 시드를 고정해 생성하므로 실행할 때마다 같은 값이 나옵니다.
+modules.providers의 공용 공급자를 교체하여 설치하며, 호출 통계는 modules.metrics가 집계합니다.
+"""
+import zlib
+from collections import Counter
+from contextlib import ExitStack
+from datetime import datetime, timedelta
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+# 고정 데이터가 존재하는 거래일 (최근 11년 평일)
+SESSIONS = pd.bdate_range(datetime.now() - timedelta(days=365 * 11), datetime.now().date())
+
+KRX_NAMES = {
+    '360750': 'TIGER 미국S&P500',
+    '132030': 'KODEX 골드선물(H)',
+    '305080': 'TIGER 미국채10년선물',
+    '455890': 'RISE 머니마켓액티브',
+    '195980': 'ARIRANG 신흥국MSCI(합성 H)'
+}
+US_NAMES = {'NVDA': 'NVIDIA Corporation', 'GOOG': 'Alphabet Inc. (Google)', 'AVGO': 'Broadcom Inc.', 'OXY': 'Occidental Petroleum'}
+ACCOUNTS = ['연금저축', 'ISA', '해외주식']
+LEDGER_HEADER = ['날짜', '계좌', '종목명', '수량', '단가', '구분']
+
+# 시세판에 포함되는 국내 종목 (scale_holdings로 합성 종목이 추가됨)
+KRX_UNIVERSE = dict(KRX_NAMES)
+
+
+def _seed(*parts):
+    return zlib.crc32('|'.join(map(str, parts)).encode('utf-8'))
+
+
+def _base_price(ticker):
+    if ticker == 'KRW=X':
+        return 1300.0
+    if ticker.startswith('^'):
+        return 3000.0
+    return 10000.0 + _seed(ticker) % 90000 if ticker[:1].isdigit() else 50.0 + _seed(ticker) % 400
+
+
+def ohlcv(ticker, start=None, end=None):
+    """[start, end] 구간의 일봉 (Open/High/Low/Close/Volume, 티커별 고정 랜덤워크)"""
+    rng = np.random.default_rng(_seed('ohlcv', ticker))
+    if ticker == 'KRW=X':
+        # 환율은 입력 범위(1000~2000원)를 벗어나지 않도록 기준값 주변에서만 변동
+        close = _base_price(ticker) + 100 * np.sin(np.arange(len(SESSIONS)) / 200) + rng.normal(0, 5, len(SESSIONS))
+    else:
+        close = _base_price(ticker) * np.cumprod(1 + rng.normal(0.0003, 0.01, len(SESSIONS)))
+    df = pd.DataFrame({
+        'Open': close * 0.998,
+        'High': close * 1.01,
+        'Low': close * 0.99,
+        'Close': close,
+        'Volume': rng.integers(1_000, 1_000_000, len(SESSIONS)).astype(float)
+    }, index=SESSIONS)
+
+    if start is not None:
+        df = df[df.index >= pd.Timestamp(start)]
+    if end is not None:
+        df = df[df.index <= pd.Timestamp(end)]
+    return df
+
+
+def _period_start(period):
+    days = {'1d': 1, '5d': 5, '1mo': 31, '3mo': 92, '6mo': 183, '1y': 366, '2y': 731, '5y': 1827, '10y': 3653}
+    return SESSIONS[-1] - timedelta(days=days.get(period, 31))
+
+
+def ledger_values(rows):
+    """헤더 + rows개의 거래내역 (시트 get_all_values 형식, 문자열)"""
+    names = list(KRX_NAMES.values()) + list(US_NAMES)
+    rng = np.random.default_rng(_seed('ledger', rows))
+    dates = SESSIONS[-2500:][np.sort(rng.integers(0, 2500, rows))]
+    name_idx = rng.integers(0, len(names), rows)
+    qty = rng.integers(1, 20, rows)
+    sell = rng.random(rows) < 0.15
+
+    tickers = {name: ticker for ticker, name in KRX_NAMES.items()}
+    held = Counter()
+    values = [list(LEDGER_HEADER)]
+    for i in range(rows):
+        name = names[name_idx[i]]
+        account = '해외주식' if name in US_NAMES else ACCOUNTS[i % 2]
+        price = _base_price(tickers.get(name, name))
+        # 보유 수량보다 많이 매도하지 않음
+        is_sell = sell[i] and held[account, name] >= qty[i]
+        held[account, name] += -qty[i] if is_sell else qty[i]
+        values.append([
+            dates[i].strftime('%Y-%m-%d'), account, name, str(qty[i]),
+            f"{price:,.2f}" if name in US_NAMES else f"{price:,.0f}",
+            '매도' if is_sell else '매수'
+        ])
+    return values
+
+
+class FixtureProvider:
+    """modules.providers 공급자 인터페이스를 고정 데이터로 구현 (네트워크 없음)"""
+
+    mode = 'fixture'
+
+    def __init__(self, ledger_rows):
+        """
+        Args:
+            ledger_rows: 구글 시트 거래내역 행 수
+        """
+        self.ledger = ledger_values(ledger_rows)
+
+    # pykrx
+    def etf_board(self, date):
+        tickers = list(KRX_UNIVERSE)
+        # 전 종목 랜덤워크를 만들지 않도록 날짜/티커 시드의 변동만 적용
+        noise = np.array([_seed('board', ticker, date) % 1000 for ticker in tickers]) / 1000 * 0.04 - 0.02
+        close = np.array([_base_price(ticker) for ticker in tickers]) * (1 + noise)
+        return pd.DataFrame({
+            'NAV': close, '시가': close * 0.998, '고가': close * 1.01, '저가': close * 0.99,
+            '종가': close, '거래량': np.full(len(tickers), 100_000.0)
+        }, index=tickers)
+
+    def etf_ohlcv(self, ticker, start, end):
+        df = ohlcv(ticker, pd.Timestamp(start), pd.Timestamp(end))
+        return df.rename(columns={'Open': '시가', 'High': '고가', 'Low': '저가', 'Close': '종가', 'Volume': '거래량'})
+
+    # FinanceDataReader
+    def fdr_ohlcv(self, symbol, start, end=None):
+        return ohlcv(symbol, start, end)
+
+    # yfinance (end는 해당 날짜를 포함하지 않음)
+    def yf_history(self, symbol, period=None, start=None, end=None, **kwargs):
+        if period is not None:
+            start = _period_start(period)
+        end = pd.Timestamp(end) - timedelta(days=1) if end is not None else None
+        return ohlcv(symbol, start, end)
+
+    def yf_download(self, tickers, period=None, start=None, end=None, **kwargs):
+        tickers = [tickers] if isinstance(tickers, str) else list(tickers)
+        return pd.concat({ticker: self.yf_history(ticker, period, start, end) for ticker in tickers}, axis=1)
+
+    def yf_info(self, symbol):
+        bar = ohlcv(symbol).iloc[-1]
+        return {
+            'longName': US_NAMES.get(symbol, symbol),
+            'currentPrice': bar['Close'],
+            'previousClose': bar['Open'],
+            'fiftyTwoWeekHigh': bar['High'] * 1.2,
+            'fiftyTwoWeekLow': bar['Low'] * 0.8
+        }
+
+    # 구글 시트
+    def ledger_client(self, credentials_json):
+        return 'fixture'
+
+    def ledger_modified_time(self, gc, spreadsheet_id, sheet_name):
+        return '2024-01-01T00:00:00.000Z'
+
+    def ledger_values(self, gc, spreadsheet_id, sheet_name):
+        return [list(row) for row in self.ledger]
+
+    def ledger_ranges(self, gc, spreadsheet_id, sheet_name, ranges):
+        start = int(''.join(ch for ch in ranges[1].split(':')[0] if ch.isdigit()))
+        return [[self.ledger[0]], [list(row) for row in self.ledger[start - 1:]]]
+
+
+def scale_holdings(portfolio, market, count):
+    """포트폴리오 보유 종목을 count개로 맞춤 (기본 종목 뒤에 합성 종목 추가)
+
+    Args:
+        portfolio: KoreanPortfolio 또는 USPortfolio
+        market: 'KRX' 또는 'US'
+    """
+    names = portfolio.etf_names if market == 'KRX' else portfolio.stock_names
+    tickers = list(portfolio.holdings)[:count]
+    for i in range(count - len(tickers)):
+        ticker = f"{900000 + i}" if market == 'KRX' else f"SYN{i:05d}"
+        names[ticker] = f"합성 종목 {i}" if market == 'KRX' else f"Synthetic {i}"
+        tickers.append(ticker)
+        if market == 'KRX':
+            KRX_UNIVERSE[ticker] = names[ticker]
+
+    portfolio.holdings = {ticker: portfolio.holdings.get(ticker, 10) for ticker in tickers}
+    portfolio.avg_price = {ticker: portfolio.avg_price.get(ticker, _base_price(ticker)) for ticker in tickers}
+    return portfolio
+
+
+def _start_poller(poller):
+    """백그라운드 스레드 대신 렌더링 전에 한 번만 동기 조회"""
+    if poller.snapshot is None:
+        poller.poll_once()
+    return poller
+
+
+SECRETS = {
+    'gcp_service_account': {'type': 'service_account', 'client_email': 'bench@example.com'},
+    'google_sheets': {'spreadsheet_id': 'benchmark', 'sheet_name': 'ledger'}
+}
+
+
+def install(ledger_rows, recordings=None):
+    """공용 공급자를 고정 데이터(또는 저장된 응답 재생)로 교체 (반환된 ExitStack을 닫으면 원래대로 복구)
+
+    Args:
+        ledger_rows: 고정 데이터 거래내역 행 수
+        recordings: 지정하면 고정 데이터 대신 이 디렉터리의 저장된 응답을 재생
+    """
+    import modules.market_poller as market_poller
+    from modules.providers import RecordReplayProvider, set_provider
+
+    if recordings:
+        provider = RecordReplayProvider('replay', recordings)
+    else:
+        provider = FixtureProvider(ledger_rows)
+
+    stack = ExitStack()
+    previous = set_provider(provider)
+    stack.callback(set_provider, previous)
+    stack.enter_context(mock.patch.object(market_poller.MarketPoller, 'start', _start_poller))
+    return stack
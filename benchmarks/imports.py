@@ -0,0 +1,155 @@
+"""모듈별 import 비용 보고서 (서버 시작/첫 세션의 import 시간)
+
+사용법: python -m benchmarks.imports [--repeat 3] [--json 파일]
+측정마다 새 프로세스에서 Streamlit과 pandas(앱이 항상 쓰는 기본 라이브러리)를 먼저 import한 뒤
+대상 모듈만 import하는 데 걸린 시간을 재고, 그중 가장 짧은 값을 사용합니다.
+"""
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+from collections import Counter
+
+from benchmarks.worker import ROOT
+
+# 공급자/차트 라이브러리 (처음 사용할 때 import하므로 시작 비용에서 빠지고 첫 호출에서 지불)
+DEFERRED = ['pykrx.stock', 'yfinance', 'FinanceDataReader', 'gspread', 'google.oauth2.service_account',
+            'plotly.graph_objects']
+
+BASELINE = ['pandas', 'streamlit']
+
+# 새 프로세스에서 실행: 인자의 모듈을 import하고 시간과 새로 로드된 모듈을 JSON으로 출력
+_PROBE = """
+import importlib, json, sys, time
+preload = sys.argv[1].split(',') if sys.argv[1] else []
+for name in preload:
+    importlib.import_module(name)
+before = set(sys.modules)
+started = time.perf_counter()
+for name in sys.argv[2:]:
+    importlib.import_module(name)
+elapsed = time.perf_counter() - started
+print(json.dumps({'seconds': elapsed, 'modules': sorted(set(sys.modules) - before)}))
+"""
+
+
+def app_imports():
+    """app.py가 직접 import하는 모듈 이름"""
+    with open(os.path.join(ROOT, 'app.py'), encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+
+    names = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            names += [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            names.append(node.module)
+    return list(dict.fromkeys(names))
+
+
+def project_modules():
+    return sorted(
+        f"modules.{name[:-3]}" for name in os.listdir(os.path.join(ROOT, 'modules'))
+        if name.endswith('.py') and name != '__init__.py'
+    )
+
+
+def probe(names, preload=BASELINE, importtime=False):
+    """새 프로세스에서 preload 후 names를 import
+
+    Returns:
+        {'seconds', 'modules'(새로 로드된 모듈), 'packages'(-X importtime 기준 최상위 패키지별 자체 시간, 선택)}
+    """
+    command = [sys.executable]
+    if importtime:
+        command += ['-X', 'importtime']
+    command += ['-c', _PROBE, ','.join(preload), *names]
+
+    proc = subprocess.run(command, cwd=ROOT, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+
+    if importtime:
+        # "import time: 자체(us) | 누적(us) | 모듈" 중 새로 로드된 모듈만 패키지별로 합산
+        loaded = set(result['modules'])
+        packages = Counter()
+        for line in proc.stderr.splitlines():
+            if not line.startswith('import time:') or '|' not in line:
+                continue
+            own, _, name = line[len('import time:'):].split('|')
+            name = name.strip()
+            if name in loaded and own.strip().isdigit():
+                packages[name.split('.')[0]] += int(own) / 1e6
+        result['packages'] = dict(packages.most_common())
+    return result
+
+
+def fastest(names, repeat, **kwargs):
+    """repeat번 측정하여 가장 짧은 결과 (디스크 캐시 등 잡음 제거)"""
+    return min((probe(names, **kwargs) for _ in range(repeat)), key=lambda result: result['seconds'])
+
+
+def build_report(repeat=3):
+    startup = app_imports()
+    report = {
+        'baseline': fastest(BASELINE, repeat, preload=[]),
+        'app': fastest(startup, repeat, importtime=True),
+        'modules': {},
+        'deferred': {}
+    }
+    report['app']['imports'] = startup
+
+    for name in project_modules():
+        report['modules'][name] = fastest([name], repeat)
+    for name in DEFERRED:
+        # 공급자 모듈 등 앱 모듈을 먼저 불러온 상태에서 처음 사용할 때 추가되는 비용
+        report['deferred'][name] = fastest([name], repeat, preload=BASELINE + startup)
+    return report
+
+
+def _packages(result):
+    """새로 로드된 최상위 패키지 (프로젝트 모듈 제외)"""
+    return sorted({name.split('.')[0] for name in result['modules']} - {'modules'})
+
+
+def summarize(report):
+    lines = [
+        f"baseline ({'+'.join(BASELINE)})  {report['baseline']['seconds']:.3f}s",
+        f"app.py startup imports       {report['app']['seconds']:.3f}s  "
+        f"({len(report['app']['modules'])} new modules)",
+        '',
+        '== app.py startup by package (self time) =='
+    ]
+    lines += [f"  {package:<32} {seconds:.3f}s" for package, seconds in list(report['app']['packages'].items())[:15]]
+
+    lines += ['', '== project modules (on top of baseline) ==']
+    for name, result in sorted(report['modules'].items(), key=lambda item: -item[1]['seconds']):
+        packages = ', '.join(_packages(result)[:8])
+        lines.append(f"  {name:<32} {result['seconds']:.3f}s  {packages}")
+
+    lines += ['', '== deferred libraries (paid on first use) ==']
+    for name, result in report['deferred'].items():
+        lines.append(f"  {name:<32} {result['seconds']:.3f}s")
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=3, help='측정 반복 횟수 (가장 짧은 값 사용)')
+    parser.add_argument('--json', help='전체 결과를 저장할 JSON 파일')
+    args = parser.parse_args()
+
+    report = build_report(args.repeat)
+    print(summarize(report))
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"saved {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""오프라인 벤치마크 전체 실행 및 결과 저장
+
+사용법: python -m benchmarks.run [--targets app pension] [--sizes 10 1000] [--label 이름]
+결과는 benchmarks/results/<라벨>.json에 저장되며 compare.py로 커밋 간 비교합니다.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from benchmarks.worker import ROOT, TARGETS
+
+SIZES = [10, 1000, 100000]
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+
+
+def _git(*args):
+    try:
+        return subprocess.run(['git', *args], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    """결과 비교에 필요한 실행 환경 정보"""
+    import numpy
+    import pandas
+    import streamlit
+
+    commit = _git('rev-parse', '--short', 'HEAD')
+    return {
+        'commit': commit,
+        'dirty': bool(_git('status', '--porcelain', '--untracked-files=no')),
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'versions': {'streamlit': streamlit.__version__, 'pandas': pandas.__version__, 'numpy': numpy.__version__}
+    }
+
+
+def run_one(target, size, trace=False, recordings=None):
+    """새 프로세스에서 대상 하나를 측정 (캐시/모듈 상태가 섞이지 않도록 분리)"""
+    command = [sys.executable, '-m', 'benchmarks.worker', target, str(size)]
+    if trace:
+        command.append('--tracemalloc')
+    if recordings:
+        command += ['--recordings', os.path.abspath(recordings)]
+
+    proc = subprocess.run(command, cwd=ROOT, capture_output=True, text=True)
+    if proc.returncode != 0:
+        return {'target': target, 'size': size, 'failed': proc.stderr.strip().splitlines()[-1:]}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def summarize(result):
+    """한 줄 요약 (단계별 시간과 upstream 호출 수)"""
+    if 'failed' in result:
+        return f"{result['target']:>8} {result['size']:>7}  FAILED {result['failed']}"
+
+    parts = []
+    for phase in result['phases']:
+        calls = sum(phase['calls'].values())
+        flag = ' !' if phase['exceptions'] or phase['errors'] else ''
+        parts.append(f"{phase['phase']} {phase['seconds']:.3f}s/{calls}{flag}")
+    peak = max(phase['peak_rss_mb'] for phase in result['phases'])
+    return f"{result['target']:>8} {result['size']:>7}  " + '  '.join(parts) + f"  peak {peak:.0f}MB"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--targets', nargs='+', choices=sorted(TARGETS), default=list(TARGETS))
+    parser.add_argument('--sizes', nargs='+', type=int, default=SIZES)
+    parser.add_argument('--label', help='결과 파일 이름 (기본값: 현재 커밋)')
+    parser.add_argument('--tracemalloc', action='store_true', help='파이썬 힙 최대 사용량도 측정')
+    parser.add_argument('--recordings', help='고정 데이터 대신 재생할 저장 응답 디렉터리')
+    args = parser.parse_args()
+
+    env = environment()
+    label = args.label or (env['commit'] or 'working-tree') + ('-dirty' if env['dirty'] else '')
+
+    results = []
+    started = time.perf_counter()
+    for target in args.targets:
+        for size in args.sizes:
+            result = run_one(target, size, args.tracemalloc, args.recordings)
+            print(summarize(result), flush=True)
+            results.append(result)
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"{label}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'label': label, 'environment': env, 'results': results}, f, ensure_ascii=False, indent=2)
+
+    print(f"saved {path} ({time.perf_counter() - started:.0f}s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,8 @@
+"""벤치마크용 국내 ETF 화면 (보유 종목 수: BENCH_HOLDINGS)"""
+import os
+
+from benchmarks.fixtures import scale_holdings
+from modules.korean_stocks import KoreanPortfolio
+
+portfolio = scale_holdings(KoreanPortfolio(), 'KRX', int(os.environ.get('BENCH_HOLDINGS', 4)))
+portfolio.display_dashboard()
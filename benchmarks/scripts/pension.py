@@ -0,0 +1,4 @@
+"""벤치마크용 연금 리밸런싱 화면 (거래내역 행 수는 고정 데이터에서 결정)"""
+from modules.pension import PensionRebalancing
+
+PensionRebalancing().display_dashboard()
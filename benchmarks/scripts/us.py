@@ -0,0 +1,8 @@
+"""벤치마크용 해외 주식 화면 (보유 종목 수: BENCH_HOLDINGS)"""
+import os
+
+from benchmarks.fixtures import scale_holdings
+from modules.us_stocks import USPortfolio
+
+portfolio = scale_holdings(USPortfolio(), 'US', int(os.environ.get('BENCH_HOLDINGS', 4)))
+portfolio.display_dashboard()
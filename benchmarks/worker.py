@@ -0,0 +1,150 @@
+"""벤치마크 1건 실행: 대상 화면 하나를 고정 데이터로 렌더링하고 결과를 JSON으로 출력
+
+사용법: python -m benchmarks.worker <대상> <크기> [--tracemalloc] [--recordings 디렉터리]
+(캐시 디렉터리를 비운 새 프로세스에서 실행해야 cold 결과가 의미가 있으므로 run.py가 호출)
+"""
+import argparse
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 대상 이름 -> (스크립트 경로, 크기가 의미하는 값)
+TARGETS = {
+    'korean': (os.path.join('benchmarks', 'scripts', 'korean.py'), 'holdings'),
+    'us': (os.path.join('benchmarks', 'scripts', 'us.py'), 'holdings'),
+    'pension': (os.path.join('benchmarks', 'scripts', 'pension.py'), 'ledger_rows'),
+    'app': ('app.py', 'ledger_rows')
+}
+
+# 화면 위젯 수가 보유 종목 수에 비례하므로 종목 수는 이 값에서 자름
+MAX_HOLDINGS = 1000
+
+# 렌더링이 끝난 화면에서 실행할 사용자 동작 (대상 -> 함수(AppTest))
+ACTIONS = {
+    'korean': lambda at: at.toggle(key=f"kr_chart_open_{at.expander[0].label.split('(')[-1].rstrip(')')}").set_value(True),
+    'us': lambda at: at.toggle(key=f"us_chart_open_{at.expander[0].label.split('(')[-1].rstrip(')')}").set_value(True),
+    'pension': lambda at: (
+        at.radio(key='pension_method').set_value('최적화 (매수/매도)'),
+        next(button for button in at.button if button.label == '리밸런싱 계산').click()
+    ),
+    'app': lambda at: at.toggle(key='nav_open').set_value(True)
+}
+
+
+def _peak_rss_mb():
+    # Linux의 ru_maxrss는 KB 단위
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _upstream_delta(before, after):
+    """두 upstream 합계 사이의 차이 (변화가 있는 upstream만)"""
+    empty = {'calls': 0, 'errors': 0, 'seconds': 0.0, 'bytes': 0}
+    delta = {}
+    for upstream, total in after.items():
+        previous = before.get(upstream, empty)
+        if total['calls'] != previous['calls']:
+            delta[upstream] = {
+                'calls': total['calls'] - previous['calls'],
+                'errors': total['errors'] - previous['errors'],
+                'seconds': round(total['seconds'] - previous['seconds'], 4),
+                'bytes': total['bytes'] - previous['bytes']
+            }
+    return delta
+
+
+def measure(name, at, step, metrics, trace):
+    """step()을 실행하여 소요 시간, upstream 호출(횟수, 시간, 오류, 응답 크기), 메모리, 화면 오류를 기록"""
+    before = metrics.totals()
+    if trace:
+        tracemalloc.start()
+
+    started = time.perf_counter()
+    step()
+    elapsed = time.perf_counter() - started
+
+    upstream = _upstream_delta(before, metrics.totals())
+    result = {
+        'phase': name,
+        'seconds': round(elapsed, 4),
+        'calls': {key: total['calls'] for key, total in upstream.items()},
+        'upstream': upstream,
+        'peak_rss_mb': round(_peak_rss_mb(), 1),
+        'exceptions': [str(e.value) for e in at.exception],
+        'errors': [str(e.value) for e in at.error]
+    }
+    if trace:
+        result['peak_traced_mb'] = round(tracemalloc.get_traced_memory()[1] / 2 ** 20, 1)
+        tracemalloc.stop()
+    return result
+
+
+def run(target, size, trace=False, recordings=None, timeout=600):
+    script, size_kind = TARGETS[target]
+    holdings = min(size, MAX_HOLDINGS) if size_kind == 'holdings' else None
+    ledger_rows = size if size_kind == 'ledger_rows' else 10
+
+    # 모듈을 import하기 전에 빈 캐시 디렉터리를 지정해야 cold 실행이 됨
+    os.environ['STOCK_DASHBOARD_CACHE_DIR'] = tempfile.mkdtemp(prefix='stock-dashboard-bench-')
+    if holdings is not None:
+        os.environ['BENCH_HOLDINGS'] = str(holdings)
+    os.chdir(ROOT)
+    sys.path.insert(0, ROOT)
+
+    started = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+    from benchmarks import fixtures
+    from modules.metrics import upstream_metrics
+    import_seconds = time.perf_counter() - started
+
+    fixtures.install(ledger_rows, recordings)
+    baseline_rss = _peak_rss_mb()
+
+    def new_session():
+        at = AppTest.from_file(os.path.join(ROOT, script), default_timeout=timeout)
+        for key, value in fixtures.SECRETS.items():
+            at.secrets[key] = value
+        return at
+
+    at = new_session()
+    phases = [
+        measure('cold', at, at.run, upstream_metrics, trace),
+        measure('warm', at, at.run, upstream_metrics, trace),
+        measure('interaction', at, lambda: (ACTIONS[target](at), at.run()), upstream_metrics, trace)
+    ]
+
+    # 같은 프로세스의 새 세션 (프로세스 공용 캐시만 남은 상태)
+    session = new_session()
+    phases.append(measure('new_session', session, session.run, upstream_metrics, trace))
+
+    return {
+        'target': target,
+        'size': size,
+        'holdings': holdings,
+        'ledger_rows': ledger_rows,
+        'import_seconds': round(import_seconds, 4),
+        'baseline_rss_mb': round(baseline_rss, 1),
+        'provider': 'replay' if recordings else 'fixture',
+        'tracemalloc': trace,
+        'phases': phases
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('target', choices=sorted(TARGETS))
+    parser.add_argument('size', type=int)
+    parser.add_argument('--tracemalloc', action='store_true', help='파이썬 힙 최대 사용량도 측정 (시간 측정값이 느려짐)')
+    parser.add_argument('--recordings', help='고정 데이터 대신 재생할 저장 응답 디렉터리 (STOCK_DASHBOARD_PROVIDER=record로 저장)')
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.target, args.size, args.tracemalloc, args.recordings), ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
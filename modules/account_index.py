@@ -0,0 +1,59 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+
+class AccountIndex:
+    """계좌별 행 위치를 미리 계산해 둔 거래내역 인덱스
+
+    거래내역을 불러올 때 한 번만 만들고, 계좌 전환 시에는 해당 계좌의 행만 꺼내 씁니다.
+    """
+
+    def __init__(self, df, account_col, date_col=None):
+        """
+        Args:
+            df: 거래내역 DataFrame
+            account_col: 계좌 컬럼명
+            date_col: 날짜 컬럼명 (있으면 계좌별 첫/마지막 거래일 계산)
+        """
+        self.df = df
+        self.account_col = account_col
+
+        # 계좌를 정수 코드로 변환한 뒤 안정 정렬하여 계좌별 연속 구간(offset)으로 묶음
+        codes, uniques = pd.factorize(df[account_col])
+        valid = codes >= 0
+        self._order = np.flatnonzero(valid)[np.argsort(codes[valid], kind='stable')]
+        counts = np.bincount(codes[valid], minlength=len(uniques))
+        self._offsets = np.concatenate([[0], np.cumsum(counts)])
+
+        self.accounts = uniques.tolist()
+        self._codes = {account: i for i, account in enumerate(self.accounts)}
+        self._views = {}
+        self._lock = threading.Lock()
+
+        # 계좌별 요약 통계 (같은 순회에서 계산)
+        stats = pd.DataFrame({'계좌': self.accounts, '거래건수': counts})
+        if date_col:
+            dates = pd.to_datetime(df[date_col], errors='coerce')
+            by_code = pd.Series(dates.to_numpy()[valid]).groupby(codes[valid])
+            stats['첫 거래일'] = by_code.min().reindex(range(len(uniques))).to_numpy()
+            stats['마지막 거래일'] = by_code.max().reindex(range(len(uniques))).to_numpy()
+        self.stats = stats.set_index('계좌')
+
+    def view(self, account):
+        """해당 계좌의 거래내역 (계좌 행 수에 비례하는 비용, 결과는 캐시)"""
+        with self._lock:
+            if account in self._views:
+                return self._views[account]
+
+        code = self._codes.get(account)
+        if code is None:
+            return self.df.iloc[0:0]
+
+        rows = self._order[self._offsets[code]:self._offsets[code + 1]]
+        view = self.df.iloc[rows]
+
+        with self._lock:
+            self._views[account] = view
+        return view
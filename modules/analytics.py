@@ -0,0 +1,173 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# 분석 기간 (표시 이름 -> 종료일 기준 기간, None은 별도 처리)
+PERIODS = {
+    '1M': pd.DateOffset(months=1),
+    '3M': pd.DateOffset(months=3),
+    '6M': pd.DateOffset(months=6),
+    'YTD': None,
+    '1Y': pd.DateOffset(years=1),
+    '3Y': pd.DateOffset(years=3),
+    'ALL': None
+}
+
+TRADING_DAYS = 252
+
+# (NavEngine, 데이터 버전, 계좌, 기간) -> 분석 결과
+_memo = OrderedDict()
+_memo_lock = threading.Lock()
+_MEMO_MAXSIZE = 256
+
+
+def period_start(dates, period):
+    """기간 시작일 이후 첫 거래일의 행 번호"""
+    end = dates[-1]
+    if period == 'ALL':
+        return 0
+    if period == 'YTD':
+        start = pd.Timestamp(end.year, 1, 1)
+    else:
+        start = end - PERIODS[period]
+    return int(dates.searchsorted(start))
+
+
+def daily_returns(values, flows):
+    """일간 수익률 (그날 거래 금액은 장 마감 시점 입출금으로 보고 제외)
+
+    Args:
+        values: 날짜별 평가금액 (D,) 또는 (D, N)
+        flows: 날짜별 거래 금액 (매수 +, 매도 -), values와 같은 모양
+
+    Returns:
+        둘째 날부터의 수익률 (D - 1,) 또는 (D - 1, N). 전일 평가금액이 없으면 0
+    """
+    previous = values[:-1]
+    gain = values[1:] - flows[1:] - previous
+    return np.divide(gain, previous, out=np.zeros_like(gain, dtype=float), where=previous > 0)
+
+
+def time_weighted_return(returns):
+    """시간가중수익률 (일간 수익률의 누적 곱)"""
+    return np.prod(1 + returns, axis=0) - 1
+
+
+def max_drawdown(returns):
+    """시간가중 누적 지수 기준 최대 낙폭 (음수)"""
+    if len(returns) == 0:
+        return 0.0
+    wealth = np.cumprod(1 + returns, axis=0)
+    peak = np.maximum.accumulate(np.maximum(wealth, 1), axis=0)
+    return (wealth / peak - 1).min(axis=0)
+
+
+def volatility(returns, periods_per_year=TRADING_DAYS):
+    """연환산 변동성"""
+    if len(returns) < 2:
+        return np.nan
+    return np.std(returns, axis=0, ddof=1) * np.sqrt(periods_per_year)
+
+
+def rolling_volatility(returns, window=60, periods_per_year=TRADING_DAYS):
+    """이동 구간 연환산 변동성 (returns: Series 또는 DataFrame)"""
+    return returns.rolling(window).std() * np.sqrt(periods_per_year)
+
+
+def xirr(amounts, days, guess=0.1, tol=1e-9, max_iter=100):
+    """불규칙한 현금흐름의 연환산 내부수익률 (뉴턴법, 여러 현금흐름을 행 단위로 동시에 계산)
+
+    Args:
+        amounts: 현금흐름 (N,) 또는 (M, N). 투자자 기준 입금은 -, 회수(최종 평가금액 포함)는 +
+        days: 첫 현금흐름으로부터 경과 일수 (N,)
+
+    Returns:
+        내부수익률 스칼라 또는 (M,) 배열 (수렴하지 않으면 NaN)
+    """
+    amounts = np.atleast_2d(np.asarray(amounts, dtype=float))
+    years = np.asarray(days, dtype=float) / 365.0
+    rate = np.full(len(amounts), guess)
+    converged = np.zeros(len(amounts), dtype=bool)
+
+    for _ in range(max_iter):
+        discount = (1 + rate)[:, np.newaxis] ** -years
+        npv = (amounts * discount).sum(axis=1)
+        slope = (-years * amounts * discount).sum(axis=1) / (1 + rate)
+
+        step = np.divide(npv, slope, out=np.zeros_like(npv), where=slope != 0)
+        rate = np.where(converged, rate, np.maximum(rate - step, -0.9999))
+        converged |= np.abs(step) < tol
+        if converged.all():
+            break
+
+    rate = np.where(converged, rate, np.nan)
+    return rate if len(rate) > 1 else float(rate[0])
+
+
+def account_analytics(engine, account=None, period='ALL'):
+    """계좌(None이면 전체)의 기간별 수익률 지표 (데이터 버전별로 결과 재사용)
+
+    Returns:
+        {'start', 'end', 'twr', 'irr', 'mdd', 'volatility', 'pnl', 'returns', 'attribution'}
+    """
+    key = (id(engine), engine.version, account, period)
+    with _memo_lock:
+        if key in _memo:
+            _memo.move_to_end(key)
+            return _memo[key]
+
+    result = _compute(engine, account, period)
+
+    with _memo_lock:
+        _memo[key] = result
+        while len(_memo) > _MEMO_MAXSIZE:
+            _memo.popitem(last=False)
+    return result
+
+
+def _compute(engine, account, period):
+    dates = engine.dates
+    columns = [col for col in engine.columns if account is None or col[0] == account]
+    mask = np.array([account is None or col[0] == account for col in engine.columns], dtype=bool)
+
+    # 기간 시작 전날 평가금액을 기준으로 삼음 (전체 기간이면 첫날)
+    base = max(period_start(dates, period) - 1, 0)
+    values = engine.values[base:, mask]
+    flows = engine.flows[base:, mask]
+    total_values = values.sum(axis=1)
+    total_flows = flows.sum(axis=1)
+
+    returns = daily_returns(total_values, total_flows)
+
+    # 금액가중수익률: 기준일 평가금액과 이후 거래를 투자, 마지막 평가금액을 회수로 보는 현금흐름
+    cash_flows = -total_flows.copy()
+    cash_flows[0] = -total_values[0]
+    cash_flows[-1] += total_values[-1]
+    days = (dates[base:] - dates[base]).days.to_numpy()
+    nonzero = cash_flows != 0
+    irr = xirr(cash_flows[nonzero], days[nonzero]) if nonzero.sum() >= 2 else np.nan
+
+    # 종목별 손익 = 기말 평가금액 - 기초 평가금액 - 기간 중 순매수 금액
+    pnl = values[-1] - values[0] - flows[1:].sum(axis=0)
+    total_pnl = pnl.sum()
+    attribution = pd.DataFrame({
+        '계좌': [col[0] for col in columns],
+        '티커': [col[1] for col in columns],
+        '기말 평가금액(원)': values[-1],
+        '손익(원)': pnl,
+        '손익 기여도': pnl / total_pnl if total_pnl != 0 else np.nan
+    }).sort_values('손익(원)', ascending=False, kind='stable')
+
+    return {
+        'start': dates[base],
+        'end': dates[-1],
+        'twr': float(time_weighted_return(returns)),
+        'irr': irr,
+        'mdd': float(max_drawdown(returns)),
+        'volatility': float(volatility(returns)),
+        'pnl': float(total_pnl),
+        'returns': pd.Series(returns, index=dates[base + 1:]),
+        'attribution': attribution.reset_index(drop=True)
+    }
@@ -0,0 +1,138 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+# 공급자별 동시 실행 수와 초당 요청 수 제한
+DEFAULT_LIMITS = {
+    'pykrx': {'concurrency': 2, 'rate': 2.0},
+    'yfinance': {'concurrency': 4, 'rate': 5.0},
+    'fdr': {'concurrency': 4, 'rate': 5.0},
+    'gspread': {'concurrency': 2, 'rate': 1.0}
+}
+
+
+class TokenBucket:
+    """초당 rate개의 토큰이 채워지는 토큰 버킷"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, deadline=None):
+        """토큰 하나를 얻을 때까지 대기 (deadline을 넘기면 False)"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait_time = (1 - self.tokens) / self.rate
+
+            if deadline is not None and time.monotonic() + wait_time > deadline:
+                return False
+            time.sleep(wait_time)
+
+
+class FetchExecutor:
+    """upstream 요청을 병렬로 실행하는 공용 스레드 풀"""
+
+    def __init__(self, max_workers=16, limits=None, render_budget=20.0):
+        """
+        Args:
+            max_workers: 전체 워커 스레드 수
+            limits: 공급자별 {'concurrency': int, 'rate': float} 설정
+            render_budget: 한 번의 화면 렌더링에서 upstream 요청에 쓸 수 있는 최대 시간(초)
+        """
+        self.render_budget = render_budget
+        self._thread_prefix = 'fetch'
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=self._thread_prefix)
+        self._semaphores = {}
+        self._buckets = {}
+        self._local = threading.local()
+
+        for provider, limit in (limits or DEFAULT_LIMITS).items():
+            self._semaphores[provider] = threading.BoundedSemaphore(limit['concurrency'])
+            self._buckets[provider] = TokenBucket(limit['rate'])
+
+    def begin_render(self, budget=None):
+        """현재 스크립트 실행의 마감 시각 설정 (app.py 시작 시 호출)"""
+        self._local.deadline = time.monotonic() + (budget or self.render_budget)
+
+    def remaining(self):
+        """현재 렌더링의 남은 시간(초)"""
+        deadline = getattr(self._local, 'deadline', None)
+        if deadline is None:
+            return self.render_budget
+        return max(0.0, deadline - time.monotonic())
+
+    def in_worker(self):
+        """현재 스레드가 이 실행기의 워커인지 (워커에서 같은 풀의 작업을 기다리면 풀이 막힐 수 있음)"""
+        return threading.current_thread().name.startswith(f"{self._thread_prefix}_")
+
+    def _run(self, provider, fn, args, kwargs, deadline, ctx):
+        # 워커 스레드에서도 제출한 세션의 Streamlit 컨텍스트를 유지
+        add_script_run_ctx(threading.current_thread(), ctx)
+
+        bucket = self._buckets.get(provider)
+        semaphore = self._semaphores.get(provider)
+
+        if bucket is not None and not bucket.acquire(deadline):
+            raise TimeoutError(f"{provider} 요청 한도 대기 중 제한 시간을 초과했습니다.")
+
+        if semaphore is None:
+            return fn(*args, **kwargs)
+        with semaphore:
+            return fn(*args, **kwargs)
+
+    def submit(self, provider, fn, *args, **kwargs):
+        """요청 하나를 제출하고 Future 반환"""
+        deadline = time.monotonic() + self.remaining()
+        return self._pool.submit(self._run, provider, fn, args, kwargs, deadline, get_script_run_ctx())
+
+    def run_all(self, tasks, timeout=None):
+        """여러 요청을 병렬 실행하고 {키: 결과 또는 예외} 반환
+
+        Args:
+            tasks: {키: (공급자, 함수, 인자...)} 딕셔너리
+            timeout: 최대 대기 시간(초). 렌더링 마감 시각을 넘지 않습니다.
+        """
+        budget = self.remaining()
+        if timeout is not None:
+            budget = min(budget, timeout)
+
+        futures = {
+            key: self.submit(task[0], task[1], *task[2:])
+            for key, task in tasks.items()
+        }
+        wait(futures.values(), timeout=budget)
+
+        results = {}
+        for key, future in futures.items():
+            if future.done():
+                error = future.exception()
+                results[key] = error if error is not None else future.result()
+            else:
+                future.cancel()
+                results[key] = TimeoutError(f"{key} 요청이 제한 시간 내에 완료되지 않았습니다.")
+        return results
+
+    def map(self, provider, fn, items, timeout=None):
+        """같은 함수를 여러 항목에 병렬 적용하고 {항목: 결과 또는 예외} 반환"""
+        return self.run_all({item: (provider, fn, item) for item in items}, timeout=timeout)
+
+
+# 프로세스 전체에서 공유하는 실행기
+# 환경변수 FETCH_MAX_WORKERS, FETCH_RENDER_BUDGET으로 설정할 수 있습니다.
+fetch_executor = FetchExecutor(
+    max_workers=int(os.environ.get('FETCH_MAX_WORKERS', 16)),
+    render_budget=float(os.environ.get('FETCH_RENDER_BUDGET', 20))
+)
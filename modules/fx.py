@@ -0,0 +1,79 @@
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from modules.providers import YF_COLUMNS, get_provider
+from modules.ohlcv_store import ohlcv_store
+from modules.market_poller import get_market_poller
+
+
+class FXService:
+    """USD/KRW 일별 환율(로컬 저장소)과 실시간 환율(백그라운드 폴러) 제공"""
+
+    def __init__(self, symbol='KRW=X', fallback_rate=1350):
+        """
+        Args:
+            symbol: yfinance 환율 심볼
+            fallback_rate: 환율을 전혀 조회하지 못했을 때 사용할 값
+        """
+        self.symbol = symbol
+        self.fallback_rate = fallback_rate
+
+    def _fetch(self, start, end):
+        """yfinance에서 [start, end] 구간의 일별 환율 조회"""
+        hist = get_provider().yf_history(
+            self.symbol,
+            start=start.strftime('%Y-%m-%d'),
+            end=(end + timedelta(days=1)).strftime('%Y-%m-%d')
+        )
+        return hist.rename(columns=YF_COLUMNS)
+
+    def daily_series(self, start, end=None):
+        """[start, end] 구간의 일별 종가 환율 Series (부족한 날짜만 조회하여 저장)"""
+        df = ohlcv_store.get_history('FX', self.symbol, start, end or datetime.now(), self._fetch)
+        series = df['close'].astype(float).dropna()
+        series.index = pd.DatetimeIndex(series.index)
+        return series
+
+    def live_rate(self):
+        """실시간 환율: 폴러 스냅샷 -> 최근 일별 종가 -> 기본값 순으로 사용"""
+        rate = get_market_poller().latest(self.symbol)
+        if rate is not None:
+            return rate
+
+        try:
+            series = self.daily_series(datetime.now() - timedelta(days=10))
+            if len(series):
+                return float(series.iloc[-1])
+        except Exception:
+            pass
+        return float(self.fallback_rate)
+
+    def rates_on(self, dates, series=None):
+        """각 날짜의 환율 배열 (그날 환율이 없으면 직전 영업일, 그보다 앞이면 첫 환율)
+
+        Args:
+            dates: 날짜 배열
+            series: 미리 조회한 일별 환율 (없으면 dates 구간을 조회)
+        """
+        dates = pd.DatetimeIndex(pd.to_datetime(dates))
+        if len(dates) == 0:
+            return np.zeros(0)
+        if series is None:
+            series = self.daily_series(dates.min() - timedelta(days=10), dates.max())
+        if series.empty:
+            return np.full(len(dates), self.live_rate())
+
+        # 정렬된 환율 날짜에서 이진 탐색으로 한 번에 찾음
+        positions = np.clip(series.index.searchsorted(dates, side='right') - 1, 0, len(series) - 1)
+        return series.to_numpy()[positions]
+
+    def convert(self, amounts, dates, series=None):
+        """USD 금액을 각 날짜의 환율로 원화 환산"""
+        return np.asarray(amounts, dtype=float) * self.rates_on(dates, series)
+
+
+# 프로세스 전체에서 공유하는 환율 서비스
+fx_service = FXService(fallback_rate=float(os.environ.get('FX_FALLBACK_RATE', 1350)))
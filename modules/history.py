@@ -1,9 +1,36 @@
+import json
+import threading
+
+import numpy as np
 import pandas as pd
 import streamlit as st
-import gspread
-from google.oauth2.service_account import Credentials
+
+from modules.fetch_executor import fetch_executor
+from modules.ledger_sync import get_ledger_sync
+from modules.providers import get_provider
+from modules.positions import compute_positions
+from modules.profiler import script_profiler
+from modules.account_index import AccountIndex
+from modules.schema import get_schema
+
+# 파싱된 거래내역 캐시: (스프레드시트 ID, 시트 이름) -> {'version', 'df', 'derived'}
+_parsed_ledgers = {}
+_parsed_ledgers_lock = threading.Lock()
+
+
+@st.cache_resource(show_spinner=False)
+def get_gspread_client(credentials_json):
+    """서비스 계정으로 인증한 gspread 클라이언트 (프로세스당 한 번만 인증)"""
+    return get_provider().ledger_client(credentials_json)
+
 
 class TransactionHistory:
+    """거래내역 데이터 접근 계층
+
+    인증된 클라이언트는 프로세스 전체에서, 파싱된 거래내역은 시트가 바뀔 때까지 공유합니다.
+    한 번의 렌더링에서는 app.py가 만든 인스턴스 하나를 모든 탭과 PensionRebalancing이 함께 사용합니다.
+    """
+
     def __init__(self):
         # Google Sheets API를 사용한 안전한 인증 방식
         # 서비스 계정 키는 .streamlit/secrets.toml에 저장됩니다
@@ -13,13 +40,8 @@ class TransactionHistory:
             self.sheet_name = st.secrets["google_sheets"]["sheet_name"]
             self.spreadsheet_id = st.secrets["google_sheets"]["spreadsheet_id"]
 
-            # Google Sheets API 인증
-            scopes = [
-                "https://www.googleapis.com/auth/spreadsheets.readonly",
-                "https://www.googleapis.com/auth/drive.readonly"
-            ]
-            credentials = Credentials.from_service_account_info(credentials_dict, scopes=scopes)
-            self.gc = gspread.authorize(credentials)
+            # Google Sheets API 인증 (캐시된 클라이언트 재사용)
+            self.gc = get_gspread_client(json.dumps(credentials_dict, sort_keys=True))
 
         except KeyError as e:
             st.error(f"Google Sheets configuration not found in secrets: {e}")
@@ -35,6 +57,9 @@ class TransactionHistory:
             self.sheet_name = ""
             self.spreadsheet_id = ""
 
+        # 이번 렌더링에서 이미 불러온 거래내역
+        self._df = None
+
     def _validate_sheet_url(self):
         """Ensure the configured sheet URL uses HTTPS and points to Google Sheets."""
         if not self.sheet_url:
@@ -49,73 +74,156 @@ class TransactionHistory:
         if parsed.netloc not in allowed_hosts:
             raise ValueError("Google Sheets URL must point to Google Sheets domain.")
 
-    def get_history(self):
-        """구글 스프레드시트에서 거래내역을 가져옵니다 (Google Sheets API 사용)."""
+    def fetch_history(self, force=False):
+        """스프레드시트에서 거래내역을 조회 (오류는 호출한 쪽으로 전달, 워커 스레드에서 실행 가능)
+
+        시트가 수정되지 않았으면 로컬 캐시를, 행이 추가됐으면 추가된 행만 받아 사용합니다.
+        """
+        sync = get_ledger_sync(self.spreadsheet_id, self.sheet_name)
+        header, rows, version = sync.sync(self.gc, force=force)
+
+        # 시트가 바뀌지 않았으면 이전에 파싱한 DataFrame을 그대로 사용 (읽기 전용으로 공유)
+        key = (self.spreadsheet_id, self.sheet_name)
+        with _parsed_ledgers_lock:
+            cached = _parsed_ledgers.get(key)
+            if cached is not None and cached['version'] == version:
+                return cached['df']
+
+        # 컬럼 역할에 맞는 자료형(날짜, 숫자, 범주형)으로 컬럼 단위 변환
+        df = get_schema(header).build_frame(rows)
+
+        with _parsed_ledgers_lock:
+            # 그 사이 다른 세션이 더 새로운 버전을 저장했으면 덮어쓰지 않음
+            cached = _parsed_ledgers.get(key)
+            if cached is None or cached['version'] < version:
+                _parsed_ledgers[key] = {'version': version, 'df': df, 'derived': {}}
+
+        return df
+
+    def get_history(self, future=None):
+        """구글 스프레드시트에서 거래내역을 가져옵니다 (Google Sheets API 사용).
+
+        Args:
+            future: fetch_executor로 미리 제출한 fetch_history 작업 (있으면 그 결과를 사용)
+        """
+        # 같은 렌더링 안에서는 한 번만 불러옴
+        if self._df is not None:
+            return self._df
+
         try:
             if not self.gc:
                 st.warning("Google Sheets API 인증이 설정되지 않았습니다.")
                 return pd.DataFrame()
 
-            # 스프레드시트 열기
-            spreadsheet = self.gc.open_by_key(self.spreadsheet_id)
+            if future is not None:
+                self._df = future.result(timeout=fetch_executor.remaining())
+            else:
+                self._df = self.fetch_history()
+            return self._df
+        except Exception as e:
+            st.error(f"거래내역을 불러오는 중 오류가 발생했습니다: {e}")
+            return pd.DataFrame()
 
-            # 특정 시트 선택
-            worksheet = spreadsheet.worksheet(self.sheet_name)
+    def _derived(self, name, build):
+        """현재 거래내역에서 파생된 데이터를 거래내역이 바뀔 때까지 재사용"""
+        df = self.get_history()
 
-            # 데이터를 DataFrame으로 변환
-            data = worksheet.get_all_records()
-            df = pd.DataFrame(data)
+        with _parsed_ledgers_lock:
+            entry = _parsed_ledgers.get((self.spreadsheet_id, self.sheet_name))
+        if entry is None or entry['df'] is not df:
+            return build(df)
 
-            # 데이터 전처리 (필요한 경우)
-            if '날짜' in df.columns:
-                df['날짜'] = pd.to_datetime(df['날짜'], errors='coerce').dt.strftime('%Y-%m-%d')
+        if name not in entry['derived']:
+            entry['derived'][name] = build(df)
+        return entry['derived'][name]
 
-            return df
-        except Exception as e:
-            st.error(f"거래내역을 불러오는 중 오류가 발생했습니다: {e}")
-            return pd.DataFrame()
+    def get_positions(self):
+        """모든 계좌 x 종목의 보유 수량 표 ('계좌', '종목명', '보유수량', '거래건수')"""
+        def build(df):
+            schema = get_schema(df.columns)
+            if not (schema.name and schema.qty):
+                return compute_positions(df.iloc[0:0], None, None, None)
+            return compute_positions(df, schema.account, schema.name, schema.qty, schema.type)
+
+        return self._derived('positions', build)
+
+    def get_account_index(self):
+        """계좌별 행 위치와 요약 통계를 담은 AccountIndex (계좌 컬럼이 없으면 None)"""
+        def build(df):
+            schema = get_schema(df.columns)
+            if not schema.account:
+                return None
+            return AccountIndex(df, schema.account, schema.date)
+
+        return self._derived('account_index', build)
 
     def get_accounts(self, df):
         """데이터프레임에서 계좌 목록을 추출합니다."""
-        # '계좌', '증권사', 'Account' 등의 컬럼명을 찾습니다.
-        account_col = None
-        possible_names = ['계좌', '증권사', 'Account', 'account', '자산']
-        
-        for col in df.columns:
-            if any(name in col for name in possible_names):
-                account_col = col
-                break
+        # '계좌', '증권사', 'Account' 등의 컬럼명을 찾습니다 (헤더별로 한 번만 판별).
+        account_col = get_schema(df.columns).account
         
         if account_col:
             return df[account_col].unique().tolist(), account_col
         return [], None
 
+    @script_profiler.profiled('style_dataframe')
     def style_dataframe(self, df):
-        """데이터프레임에 블룸버그 스타일을 적용합니다."""
+        """데이터프레임에 블룸버그 스타일을 적용합니다.
+
+        원래 자료형을 유지하고, 매수/매도 색상은 구분 컬럼에만 벡터 연산으로 적용합니다.
+        """
         if df.empty:
             return df
-            
-        # 모든 컬럼을 문자열로 변환하여 표시 (포맷팅 이슈 방지)
-        display_df = df.astype(str)
-        
-        styled_df = display_df.style.set_properties(**{
+
+        styled_df = df.style.set_properties(**{
             'background-color': '#131722',
             'color': '#D1D4DC',
             'border-color': '#2A2E39'
         })
-        
-        # 매수/매도 컬러링
-        # '구분' 컬럼이 있거나, 데이터 내용 중에 '매수', '매도'가 있는 경우 처리
-        def color_buy_sell(val):
-            val_str = str(val)
-            if '매수' in val_str:
-                return 'color: #26a69a' # TradingView Green
-            elif '매도' in val_str:
-                return 'color: #ef5350' # TradingView Red
-            return ''
-
-        # 전체 데이터프레임에 대해 applymap을 쓰면 느릴 수 있으므로, 특정 컬럼이 있으면 그 컬럼만, 아니면 전체
-        # 여기서는 간단하게 전체에 적용 (데이터가 크지 않다고 가정)
-        styled_df = styled_df.map(color_buy_sell)
-        
+
+        # 매수/매도 컬러링 ('구분' 컬럼에만 적용)
+        type_col = get_schema(df.columns).type
+        if type_col:
+            def color_buy_sell(col):
+                values = col.astype(str)
+                return np.where(
+                    values.str.contains('매수', regex=False), 'color: #26a69a', # TradingView Green
+                    np.where(values.str.contains('매도', regex=False), 'color: #ef5350', '') # TradingView Red
+                )
+
+            styled_df = styled_df.apply(color_buy_sell, subset=[type_col])
+
         return styled_df
+
+    def display_grid(self, df, key, page_sizes=(50, 100, 500)):
+        """거래내역을 페이지 단위로 표시 (현재 페이지만 스타일링하여 브라우저로 전송)
+
+        Args:
+            df: 표시할 거래내역
+            key: 위젯 키 접두어 (표시 대상이 바뀌면 페이지가 처음으로 돌아가도록 다른 키 사용)
+            page_sizes: 선택 가능한 페이지당 행 수
+        """
+        if df.empty:
+            st.dataframe(df, use_container_width=True, hide_index=True)
+            return
+
+        col1, col2, _ = st.columns([1, 1, 4])
+        with col1:
+            page_size = st.selectbox("ROWS PER PAGE", page_sizes, key=f"{key}_page_size")
+
+        total_pages = (len(df) - 1) // page_size + 1
+        with col2:
+            page = st.number_input("PAGE", min_value=1, max_value=total_pages, value=1, key=f"{key}_page_{page_size}")
+
+        start = (page - 1) * page_size
+        page_df = df.iloc[start:start + page_size]
+
+        # 날짜 컬럼은 datetime으로 보관하고 표시 형식만 지정
+        column_config = {
+            col: st.column_config.DateColumn(format="YYYY-MM-DD")
+            for col in page_df.select_dtypes(include='datetime').columns
+        }
+
+        st.dataframe(self.style_dataframe(page_df), use_container_width=True, hide_index=True,
+                     column_config=column_config)
+        st.caption(f"Rows {start + 1:,}-{start + len(page_df):,} of {len(df):,} (page {page}/{total_pages})")
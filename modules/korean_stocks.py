@@ -1,8 +1,21 @@
 import streamlit as st
-import pykrx.stock as stock
 import pandas as pd
 from datetime import datetime, timedelta
-import plotly.graph_objects as go
+
+from modules.lazy_import import lazy_import
+from modules.metrics import upstream_metrics
+from modules.providers import get_provider
+from modules.profiler import script_profiler
+from modules.quote_cache import quote_cache
+from modules.trading_calendar import last_trading_date
+from modules.krx_snapshot import get_etf_quote
+from modules.ohlcv_store import ohlcv_store
+
+# 차트는 펼친 종목에서만 그리므로 plotly는 처음 그릴 때 import
+go = lazy_import('plotly.graph_objects')
+
+# pykrx 컬럼명 <-> 저장소 컬럼명
+PYKRX_COLUMNS = {'시가': 'open', '고가': 'high', '저가': 'low', '종가': 'close', '거래량': 'volume'}
 
 
 class KoreanPortfolio:
@@ -33,23 +46,21 @@ class KoreanPortfolio:
             '455890': 'RISE 머니마켓액티브'
         }
 
+    def get_daily_quote(self, ticker):
+        """마지막 거래일의 OHLCV를 공용 캐시를 통해 조회 (ETF 시세판 1회 조회로 전 종목 처리)"""
+        date = last_trading_date()
+        return quote_cache.get_or_fetch(
+            'KRX', ticker, date,
+            lambda: get_etf_quote(ticker, date)
+        )
+
     def get_current_price(self, ticker):
         """ETF 티커를 입력받아 현재 가격을 반환하는 함수"""
         try:
-            # 오늘 날짜
-            today = datetime.now().strftime('%Y%m%d')
-
-            # 주말인 경우 마지막 거래일로 조정
-            if datetime.now().weekday() >= 5:  # 토요일(5) 또는 일요일(6)
-                days_back = datetime.now().weekday() - 4
-                today = (datetime.now() - timedelta(days=days_back)).strftime('%Y%m%d')
+            quote = self.get_daily_quote(ticker)
 
-            # ETF 현재가 조회
-            df = stock.get_etf_ohlcv_by_date(today, today, ticker)
-
-            if not df.empty:
-                price = df['종가'].iloc[-1]
-                return int(price)
+            if quote is not None:
+                return int(quote['close'])
             else:
                 return None
 
@@ -60,30 +71,19 @@ class KoreanPortfolio:
     def get_etf_info(self, ticker):
         """ETF의 상세 정보를 조회하는 함수"""
         try:
-            # 오늘 날짜
-            today = datetime.now().strftime('%Y%m%d')
-
-            # 주말인 경우 마지막 거래일로 조정
-            if datetime.now().weekday() >= 5:
-                days_back = datetime.now().weekday() - 4
-                today = (datetime.now() - timedelta(days=days_back)).strftime('%Y%m%d')
-
-            # ETF OHLCV 데이터 조회
-            df = stock.get_etf_ohlcv_by_date(today, today, ticker)
-
-            if not df.empty:
-                data = df.iloc[-1]
+            data = self.get_daily_quote(ticker)
 
+            if data is not None:
                 etf_info = {
                     'ticker': ticker,
                     'name': self.etf_names.get(ticker, ticker),
-                    'current_price': int(data['종가']),
-                    'open_price': int(data['시가']),
-                    'high_price': int(data['고가']),
-                    'low_price': int(data['저가']),
-                    'volume': int(data['거래량']),
-                    'day_change': int(data['종가'] - data['시가']),
-                    'day_change_percent': ((data['종가'] - data['시가']) / data['시가'] * 100) if data['시가'] != 0 else 0
+                    'current_price': int(data['close']),
+                    'open_price': int(data['open']),
+                    'high_price': int(data['high']),
+                    'low_price': int(data['low']),
+                    'volume': int(data['volume']),
+                    'day_change': int(data['close'] - data['open']),
+                    'day_change_percent': ((data['close'] - data['open']) / data['open'] * 100) if data['open'] != 0 else 0
                 }
 
                 return etf_info
@@ -122,21 +122,114 @@ class KoreanPortfolio:
             'total_profit_loss': total_profit_loss
         }
 
+    def _fetch_ohlcv(self, ticker, start, end):
+        """pykrx에서 [start, end] 구간의 일봉을 조회"""
+        df = get_provider().etf_ohlcv(ticker, start.strftime('%Y%m%d'), end.strftime('%Y%m%d'))
+        return df.rename(columns=PYKRX_COLUMNS)
+
+    def _fetch_historical_data(self, ticker, days=30):
+        """로컬 저장소에서 과거 OHLCV를 읽고, 부족한 거래일만 pykrx로 조회 (워커 스레드에서 실행 가능)"""
+        end_date = datetime.now()
+        start_date = end_date - timedelta(days=days)
+
+        df = ohlcv_store.get_history(
+            'KRX', ticker, start_date, end_date,
+            lambda start, end: self._fetch_ohlcv(ticker, start, end)
+        )
+        return df.rename(columns={v: k for k, v in PYKRX_COLUMNS.items()})
+
     def get_historical_data(self, ticker, days=30):
         """ETF의 과거 데이터를 조회하는 함수"""
         try:
-            end_date = datetime.now().strftime('%Y%m%d')
-            start_date = (datetime.now() - timedelta(days=days)).strftime('%Y%m%d')
-
-            df = stock.get_etf_ohlcv_by_date(start_date, end_date, ticker)
-            return df
+            return self._fetch_historical_data(ticker, days)
         except Exception as e:
             st.error(f"과거 데이터 조회 중 오류 발생: {e}")
             return None
 
-    def display_dashboard(self):
-        """Streamlit 대시보드 표시"""
+    def display_dashboard(self, refresh_interval=None):
+        """Streamlit 대시보드 표시
+
+        Args:
+            refresh_interval: 요약/상세 테이블(현재가)을 자동 갱신하는 주기(초). None이면 갱신하지 않음
+        """
+
+        # 현재가에 의존하는 요약/상세 테이블만 주기적으로 다시 실행 (차트는 그대로 유지)
+        upstream_metrics.fragment(self.display_summary, run_every=refresh_interval)()
+
+        st.markdown("---")
+
+        # 개별 종목 차트
+        st.subheader("종목별 30일 가격 추이")
+
+        # 종목을 펼쳐 '차트 보기'를 켠 경우에만 데이터를 조회하고 차트를 생성
+        for ticker in self.holdings:
+            with st.expander(f"📈 {self.etf_names[ticker]} ({ticker})"):
+                upstream_metrics.fragment(self.display_chart)(ticker)
+
+    @script_profiler.profiled('chart building')
+    def build_chart(self, ticker):
+        """30일 캔들스틱 차트와 상세 정보 생성 (데이터가 없으면 None)"""
+        hist_data = self.get_historical_data(ticker, days=30)
+
+        if hist_data is None or hist_data.empty:
+            return None
 
+        # Plotly 캔들스틱 차트
+        fig = go.Figure(data=[go.Candlestick(
+            x=hist_data.index,
+            open=hist_data['시가'],
+            high=hist_data['고가'],
+            low=hist_data['저가'],
+            close=hist_data['종가']
+        )])
+
+        fig.update_layout(
+            title=f"{self.etf_names[ticker]} 30일 가격 차트",
+            yaxis_title="가격 (원)",
+            xaxis_title="날짜",
+            height=400
+        )
+
+        return fig, self.get_etf_info(ticker)
+
+    def display_chart(self, ticker):
+        """종목 차트 및 상세 정보 표시 (요청 시에만 생성하고 세션별로 캐시)"""
+        if not st.toggle("차트 보기", key=f"kr_chart_open_{ticker}"):
+            return
+
+        trading_date = last_trading_date()
+        charts = st.session_state.setdefault('kr_charts', {})
+        # 이전 거래일 차트는 다시 쓰지 않으므로 정리
+        for stale in [key for key in charts if key[1] != trading_date]:
+            del charts[stale]
+
+        key = (ticker, trading_date)
+        if key not in charts:
+            chart = self.build_chart(ticker)
+            if chart is None:
+                # 일시적인 조회 실패일 수 있으므로 캐시하지 않고 다음 실행에서 다시 시도
+                st.warning(f"{self.etf_names[ticker]} 차트 데이터를 불러올 수 없습니다.")
+                return
+            charts[key] = chart
+
+        fig, info = charts[key]
+        st.plotly_chart(fig, use_container_width=True)
+
+        # 상세 정보
+        if info:
+            col1, col2, col3, col4 = st.columns(4)
+
+            with col1:
+                st.metric("시가", f"{info['open_price']:,}원")
+            with col2:
+                st.metric("고가", f"{info['high_price']:,}원")
+            with col3:
+                st.metric("저가", f"{info['low_price']:,}원")
+            with col4:
+                st.metric("거래량", f"{info['volume']:,}주")
+
+    def display_summary(self):
+        """포트폴리오 요약 메트릭 및 보유 종목 상세 테이블 표시"""
         # 전체 포트폴리오 요약
         summary = self.get_portfolio_summary()
 
@@ -209,47 +302,3 @@ class KoreanPortfolio:
         }).map(lambda x: 'color: #00FF00' if '+' in str(x) else ('color: #FF0000' if '-' in str(x) else ''), subset=['수익률', '손익'])
         
         st.dataframe(styled_df, use_container_width=True, hide_index=True)
-
-        st.markdown("---")
-
-        # 개별 종목 차트
-        st.subheader("종목별 30일 가격 추이")
-
-        for ticker in self.holdings:
-            with st.expander(f"📈 {self.etf_names[ticker]} ({ticker})"):
-                hist_data = self.get_historical_data(ticker, days=30)
-
-                if hist_data is not None and not hist_data.empty:
-                    # Plotly 캔들스틱 차트
-                    fig = go.Figure(data=[go.Candlestick(
-                        x=hist_data.index,
-                        open=hist_data['시가'],
-                        high=hist_data['고가'],
-                        low=hist_data['저가'],
-                        close=hist_data['종가']
-                    )])
-
-                    fig.update_layout(
-                        title=f"{self.etf_names[ticker]} 30일 가격 차트",
-                        yaxis_title="가격 (원)",
-                        xaxis_title="날짜",
-                        height=400
-                    )
-
-                    st.plotly_chart(fig, use_container_width=True)
-
-                    # 상세 정보
-                    info = self.get_etf_info(ticker)
-                    if info:
-                        col1, col2, col3, col4 = st.columns(4)
-
-                        with col1:
-                            st.metric("시가", f"{info['open_price']:,}원")
-                        with col2:
-                            st.metric("고가", f"{info['high_price']:,}원")
-                        with col3:
-                            st.metric("저가", f"{info['low_price']:,}원")
-                        with col4:
-                            st.metric("거래량", f"{info['volume']:,}주")
-                else:
-                    st.warning(f"{self.etf_names[ticker]} 차트 데이터를 불러올 수 없습니다.")
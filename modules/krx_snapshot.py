@@ -0,0 +1,37 @@
+from modules.providers import get_provider
+from modules.quote_cache import quote_cache
+
+# 시세판 조회 실패로 보고 종목별 개별 조회로 대체하는 오류
+# (네트워크/HTTP 오류는 OSError, 응답 파싱 오류는 ValueError/KeyError, 재생 모드의 ReplayMissError는 LookupError)
+BOARD_ERRORS = (OSError, LookupError, ValueError)
+
+
+def _fetch_etf_board(date):
+    """pykrx에서 해당 거래일의 ETF 전 종목 OHLCV를 한 번에 조회"""
+    df = get_provider().etf_board(date)
+
+    # 티커 인덱스로 정렬해 두고 종목 조회는 인덱스 룩업으로 처리
+    df.index = df.index.astype(str)
+    return df.sort_index()
+
+
+def get_etf_board(date):
+    """해당 거래일(YYYYMMDD)의 KRX ETF 시세판 (공용 캐시 사용)"""
+    return quote_cache.get_or_fetch('KRX_BOARD', 'ETF', date, lambda: _fetch_etf_board(date))
+
+
+def get_etf_quote(ticker, date):
+    """시세판에서 한 종목의 OHLCV를 찾아 반환 (없으면 None)"""
+    board = get_etf_board(date)
+
+    if board.empty or ticker not in board.index:
+        return None
+
+    data = board.loc[ticker]
+    return {
+        'open': data['시가'],
+        'high': data['고가'],
+        'low': data['저가'],
+        'close': data['종가'],
+        'volume': data['거래량']
+    }
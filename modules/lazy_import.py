@@ -0,0 +1,40 @@
+import importlib
+import threading
+
+
+class LazyModule:
+    """속성에 처음 접근할 때 실제로 import하는 모듈 대리 객체
+
+    pykrx, yfinance처럼 import에만 수백 ms가 걸리는 라이브러리를 처음 사용할 때까지 미뤄
+    서버 시작과 첫 세션의 화면 표시를 앞당깁니다.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        # 여러 스레드가 동시에 처음 접근해도 import는 한 번만
+        with self._lock:
+            if self._module is None:
+                self._module = importlib.import_module(self._name)
+        return self._module
+
+    @property
+    def loaded(self):
+        return self._module is not None
+
+    def __getattr__(self, attr):
+        module = self._module
+        if module is None:
+            module = self._load()
+        return getattr(module, attr)
+
+    def __repr__(self):
+        return f"<lazy module '{self._name}' ({'loaded' if self.loaded else 'not loaded'})>"
+
+
+def lazy_import(name):
+    """import name을 처음 사용할 때로 미룸 (예: yf = lazy_import('yfinance'))"""
+    return LazyModule(name)
@@ -0,0 +1,166 @@
+import hashlib
+import json
+import threading
+import time
+
+from modules.lazy_import import lazy_import
+from modules.metrics import upstream_metrics
+from modules.providers import get_provider
+from modules.settings import cache_path
+
+gspread_utils = lazy_import('gspread.utils')
+
+
+def _column_letter(n):
+    """열 번호 -> A1 표기 열 문자 (예: 1 -> A, 27 -> AA)"""
+    return gspread_utils.rowcol_to_a1(1, n)[:-1]
+
+
+class LedgerSync:
+    """구글 시트 거래내역을 로컬 파일에 보관하고 변경분만 내려받는 동기화 클래스"""
+
+    def __init__(self, spreadsheet_id, sheet_name, check_interval=30, overlap_rows=20,
+                 full_reload_interval=86400):
+        """
+        Args:
+            spreadsheet_id: 스프레드시트 ID
+            sheet_name: 거래내역 시트 이름
+            check_interval: 시트 수정 여부를 다시 확인하는 최소 간격(초)
+            overlap_rows: 증분 조회 시 함께 받아 기존 캐시와 비교할 마지막 행 수 (수정 감지용)
+            full_reload_interval: 이 시간(초)이 지나면 변경이 없어 보여도 전체를 다시 조회
+        """
+        self.spreadsheet_id = spreadsheet_id
+        self.sheet_name = sheet_name
+        self.check_interval = check_interval
+        self.overlap_rows = overlap_rows
+        self.full_reload_interval = full_reload_interval
+
+        key = hashlib.sha1(f"{spreadsheet_id}:{sheet_name}".encode('utf-8')).hexdigest()[:16]
+        self.path = cache_path(f"ledger_{key}.json")
+
+        self.header = []
+        self.rows = []
+        self.modified_time = None
+        self.full_loaded_at = 0
+        self.checked_at = 0
+        self.last_sync = None
+        # 행을 다시 받거나 추가할 때마다 증가 (수정 시각/행 수가 같아도 내용이 바뀔 수 있으므로)
+        self.revision = 0
+
+        self._lock = threading.Lock()
+        self._load()
+
+    @property
+    def version(self):
+        """현재 보관 중인 거래내역의 버전 (전체 조회 또는 행 추가마다 증가하는 번호)"""
+        return self.revision
+
+    def _load(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+            self.header = data['header']
+            self.rows = data['rows']
+            self.modified_time = data['modified_time']
+            self.full_loaded_at = data['full_loaded_at']
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def _save(self):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'header': self.header,
+                'rows': self.rows,
+                'modified_time': self.modified_time,
+                'full_loaded_at': self.full_loaded_at
+            }, f, ensure_ascii=False)
+
+    def _normalize(self, rows, width):
+        """get_all_records와 같은 규칙으로 숫자 변환하고 열 수를 헤더에 맞춤"""
+        return [
+            gspread_utils.numericise_all((list(row) + [''] * width)[:width])
+            for row in rows
+        ]
+
+    def _full_reload(self, gc):
+        values = get_provider().ledger_values(gc, self.spreadsheet_id, self.sheet_name)
+        self.header = values[0] if values else []
+        self.rows = self._normalize(values[1:], len(self.header))
+        self.full_loaded_at = time.time()
+        self.last_sync = 'full'
+        self.revision += 1
+
+    def _incremental(self, gc):
+        """추가된 행만 조회. 기존 행이 수정된 흔적이 있으면 False 반환"""
+        width = len(self.header)
+        cached = len(self.rows)
+        overlap = min(self.overlap_rows, cached)
+
+        # 시트의 1행은 헤더, 데이터 i번째 행은 (i + 2)행
+        start_row = cached - overlap + 2
+        header_range, tail_range = get_provider().ledger_ranges(
+            gc, self.spreadsheet_id, self.sheet_name,
+            ['1:1', f"A{start_row}:{_column_letter(width)}"]
+        )
+
+        header = list(header_range[0]) if header_range else []
+        if len(header) > width or (header + [''] * width)[:width] != self.header:
+            return False
+
+        # 추가된 행 없이 수정만 됐다면 앞쪽 행이 바뀐 것이므로 전체 조회
+        tail = self._normalize(tail_range, width)
+        if len(tail) <= overlap or tail[:overlap] != self.rows[cached - overlap:]:
+            return False
+
+        self.rows.extend(tail[overlap:])
+        self.last_sync = 'append'
+        self.revision += 1
+        return True
+
+    def sync(self, gc, force=False):
+        """시트와 동기화한 뒤 (헤더, 행 목록, 버전) 반환
+
+        버전은 잠금 안에서 행과 함께 읽으므로, 다른 세션의 동기화로 바뀐 번호가 이 행 목록에 붙지 않습니다.
+
+        Args:
+            gc: 인증된 gspread 클라이언트 (get_gspread_client)
+            force: True이면 수정 여부와 관계없이 전체를 다시 조회
+        """
+        with self._lock:
+            now = time.time()
+            if not force and self.header and now - self.checked_at < self.check_interval:
+                self.last_sync = 'skip'
+                upstream_metrics.record_cache('ledger', 'sheet', self.sheet_name, True)
+                return self.header, list(self.rows), self.revision
+
+            modified_time = get_provider().ledger_modified_time(gc, self.spreadsheet_id, self.sheet_name)
+            full_reload_due = now - self.full_loaded_at > self.full_reload_interval
+
+            if force or full_reload_due or not self.header:
+                self._full_reload(gc)
+            elif modified_time == self.modified_time:
+                self.last_sync = 'unchanged'
+            elif not self._incremental(gc):
+                self._full_reload(gc)
+
+            # 수정 여부 확인 외에 내려받은 행이 없으면 캐시로 처리한 것으로 봄
+            upstream_metrics.record_cache('ledger', 'sheet', self.sheet_name, self.last_sync == 'unchanged')
+            if self.last_sync != 'unchanged':
+                self.modified_time = modified_time
+                self._save()
+
+            self.checked_at = now
+            return self.header, list(self.rows), self.revision
+
+
+_syncs = {}
+_syncs_lock = threading.Lock()
+
+
+def get_ledger_sync(spreadsheet_id, sheet_name):
+    """프로세스 공용 LedgerSync 인스턴스 반환"""
+    with _syncs_lock:
+        key = (spreadsheet_id, sheet_name)
+        if key not in _syncs:
+            _syncs[key] = LedgerSync(spreadsheet_id, sheet_name)
+        return _syncs[key]
@@ -0,0 +1,127 @@
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from modules.providers import get_provider
+
+# 티커 행에 표시할 지수/환율/원자재 (표시 이름, yfinance 심볼)
+MARKET_SYMBOLS = [
+    ('S&P 500', '^GSPC'),
+    ('NASDAQ', '^IXIC'),
+    ('KOSPI', '^KS11'),
+    ('USD/KRW', 'KRW=X'),
+    ('GOLD', 'GC=F')
+]
+
+
+class TickRing:
+    """최근 시세를 고정 크기 NumPy 배열에 보관하는 링 버퍼"""
+
+    def __init__(self, capacity, width):
+        """
+        Args:
+            capacity: 보관할 최대 틱 수
+            width: 틱 하나에 담기는 값의 수 (심볼 수)
+        """
+        self.capacity = capacity
+        self.times = np.zeros(capacity, dtype=np.float64)
+        self.values = np.full((capacity, width), np.nan, dtype=np.float64)
+        self.count = 0
+        self._pos = 0
+        self._lock = threading.Lock()
+
+    def append(self, timestamp, values):
+        with self._lock:
+            self.times[self._pos] = timestamp
+            self.values[self._pos] = values
+            self._pos = (self._pos + 1) % self.capacity
+            self.count = min(self.count + 1, self.capacity)
+
+    def recent(self, n=None):
+        """최근 n개 틱을 시간순으로 (times, values) 반환"""
+        with self._lock:
+            n = self.count if n is None else min(n, self.count)
+            index = (np.arange(self._pos - n, self._pos)) % self.capacity
+            return self.times[index].copy(), self.values[index].copy()
+
+
+class MarketPoller:
+    """서버 프로세스당 하나만 실행되어 지수/환율/원자재 시세를 주기적으로 갱신하는 백그라운드 스레드"""
+
+    def __init__(self, symbols=None, interval=60, capacity=1440):
+        """
+        Args:
+            symbols: (표시 이름, yfinance 심볼) 목록
+            interval: 조회 주기(초)
+            capacity: 링 버퍼에 보관할 최근 틱 수
+        """
+        self.symbols = symbols or MARKET_SYMBOLS
+        self.interval = interval
+        self.ticks = TickRing(capacity, len(self.symbols))
+        self.snapshot = None
+        self.last_error = None
+        self._thread = None
+
+    def poll_once(self):
+        """모든 심볼의 최근 2거래일 종가를 한 번의 요청으로 조회하여 스냅샷 갱신"""
+        tickers = [symbol for _, symbol in self.symbols]
+        data = get_provider().yf_download(tickers, period='5d', group_by='ticker', auto_adjust=False, progress=False)
+
+        prices = np.full(len(tickers), np.nan)
+        previous = np.full(len(tickers), np.nan)
+
+        for i, ticker in enumerate(tickers):
+            if not isinstance(data.columns, pd.MultiIndex) or ticker not in data.columns.get_level_values(0):
+                continue
+            closes = data[ticker]['Close'].dropna().to_numpy()
+            if len(closes) >= 1:
+                prices[i] = closes[-1]
+            if len(closes) >= 2:
+                previous[i] = closes[-2]
+
+        now = time.time()
+        self.ticks.append(now, prices)
+
+        items = []
+        for i, (label, _) in enumerate(self.symbols):
+            change_pct = (prices[i] / previous[i] - 1) * 100 if previous[i] > 0 else np.nan
+            items.append({'label': label, 'price': prices[i], 'change_pct': change_pct})
+
+        # 새 스냅샷 객체로 교체하여 모든 세션에 게시 (읽는 쪽은 잠금 불필요)
+        self.snapshot = {'updated_at': now, 'items': items}
+
+    def latest(self, symbol):
+        """스냅샷에서 심볼의 최근 가격 (없으면 None)"""
+        snapshot = self.snapshot
+        if snapshot is None:
+            return None
+
+        for (_, item_symbol), item in zip(self.symbols, snapshot['items']):
+            if item_symbol == symbol and not np.isnan(item['price']):
+                return float(item['price'])
+        return None
+
+    def _run(self):
+        while True:
+            try:
+                self.poll_once()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = e
+            time.sleep(self.interval)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='market-poller', daemon=True)
+            self._thread.start()
+        return self
+
+
+@st.cache_resource(show_spinner=False)
+def get_market_poller():
+    """서버 프로세스 공용 폴러 (처음 호출될 때 한 번만 시작)"""
+    return MarketPoller(interval=float(os.environ.get('MARKET_POLL_INTERVAL', 60))).start()
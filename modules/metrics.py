@@ -0,0 +1,369 @@
+import functools
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from modules.settings import METRICS_JSONL_FILE, METRICS_PROMETHEUS_FILE
+
+# 공급자 메서드 -> upstream 이름
+UPSTREAMS = {
+    'etf_board': 'pykrx',
+    'etf_ohlcv': 'pykrx',
+    'fdr_ohlcv': 'fdr',
+    'yf_history': 'yfinance',
+    'yf_download': 'yfinance',
+    'yf_info': 'yfinance',
+    'ledger_modified_time': 'gspread',
+    'ledger_values': 'gspread',
+    'ledger_ranges': 'gspread'
+}
+
+PROMETHEUS_PREFIX = 'stock_dashboard'
+
+
+def _call_label(method, args):
+    """호출 대상 라벨 (종목 티커, 일괄 조회 종목, 시트 이름)"""
+    if method == 'etf_board':
+        return 'ALL'
+    if method.startswith('ledger_'):
+        # (클라이언트, 스프레드시트 ID, 시트 이름, ...)
+        return str(args[2]) if len(args) > 2 else ''
+    if not args:
+        return ''
+    if method == 'yf_download' and not isinstance(args[0], str):
+        tickers = sorted(args[0])
+        return ','.join(tickers) if len(tickers) <= 5 else f"{len(tickers)} tickers"
+    return str(args[0])
+
+
+def payload_bytes(value, sample=100):
+    """응답의 대략적인 크기(바이트). DataFrame은 메모리 사용량, 행 목록은 앞쪽 행으로 추정"""
+    if value is None:
+        return 0
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        usage = value.memory_usage(index=True)
+        return int(usage.sum() if isinstance(value, pd.DataFrame) else usage)
+    if isinstance(value, str):
+        return len(value.encode('utf-8'))
+    if isinstance(value, (list, tuple)):
+        if not value:
+            return 0
+        head = value[:sample]
+        size = sum(payload_bytes(item, sample) if isinstance(item, (list, tuple)) else len(str(item)) for item in head)
+        return int(size * len(value) / len(head))
+    if isinstance(value, dict):
+        try:
+            return len(json.dumps(value, default=str).encode('utf-8'))
+        except (TypeError, ValueError):
+            return 0
+    return 0
+
+
+class _CallStats:
+    __slots__ = ('calls', 'errors', 'seconds', 'max_seconds', 'bytes')
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.bytes = 0
+
+    def add(self, seconds, size, failed):
+        self.calls += 1
+        self.errors += failed
+        self.seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.bytes += size
+
+
+class _Scope:
+    """한 집계 범위(프로세스 전체 또는 한 번의 실행)의 호출/캐시 통계"""
+
+    def __init__(self):
+        self.started_at = time.time()
+        # (upstream, 메서드, 라벨) -> _CallStats
+        self.calls = {}
+        # (캐시, 구분, 라벨) -> [hit, miss]
+        self.cache = {}
+
+    def add_call(self, key, seconds, size, failed):
+        stats = self.calls.get(key)
+        if stats is None:
+            stats = self.calls[key] = _CallStats()
+        stats.add(seconds, size, failed)
+
+    def add_cache(self, key, hit):
+        counts = self.cache.setdefault(key, [0, 0])
+        counts[0 if hit else 1] += 1
+
+
+class UpstreamMetrics:
+    """upstream 호출(시간, 응답 크기, 오류)과 캐시 적중 여부를 실행별/프로세스별로 집계"""
+
+    def __init__(self, max_sessions=256):
+        """
+        Args:
+            max_sessions: 실행별 통계를 보관할 최대 세션 수 (초과 시 오래된 세션부터 제거)
+        """
+        self.max_sessions = max_sessions
+        self.process = _Scope()
+        # 세션 ID -> 현재 실행의 _Scope
+        self._reruns = OrderedDict()
+        self._lock = threading.Lock()
+        # 현재 스레드에서 fragment 단독 실행 범위를 이미 열었는지 (중첩 fragment는 바깥 범위에 기록)
+        self._local = threading.local()
+
+    @staticmethod
+    def _session_id():
+        ctx = get_script_run_ctx(suppress_warning=True)
+        return ctx.session_id if ctx is not None else None
+
+    def _scopes(self):
+        """기록할 범위 목록 (세션 컨텍스트가 없는 백그라운드 스레드는 프로세스 범위만)"""
+        rerun = self._reruns.get(self._session_id())
+        return (self.process, rerun) if rerun is not None else (self.process,)
+
+    def begin_rerun(self):
+        """현재 세션의 실행별 통계를 새로 시작 (app.py 시작 시 호출)"""
+        session_id = self._session_id()
+        with self._lock:
+            self._reruns[session_id] = _Scope()
+            self._reruns.move_to_end(session_id)
+            while len(self._reruns) > self.max_sessions:
+                self._reruns.popitem(last=False)
+
+    def fragment(self, func, **kwargs):
+        """st.fragment(func, **kwargs)와 같지만, fragment만 다시 실행될 때(run_every, fragment 안 위젯 조작)도
+        그 실행의 통계를 새로 시작하고 끝나면 내보냄 (전체 실행 중에는 app.py의 실행 범위에 기록)
+        """
+        @functools.wraps(func)
+        def run(*args, **func_kwargs):
+            ctx = get_script_run_ctx(suppress_warning=True)
+            fragment_rerun = ctx is not None and bool(getattr(ctx, 'fragment_ids_this_run', None))
+            if not fragment_rerun or getattr(self._local, 'fragment', False):
+                return func(*args, **func_kwargs)
+
+            self._local.fragment = True
+            self.begin_rerun()
+            try:
+                return func(*args, **func_kwargs)
+            finally:
+                self._local.fragment = False
+                self.end_rerun(scope_name=f"fragment:{func.__name__}")
+
+        return st.fragment(run, **kwargs)
+
+    def current_rerun(self):
+        """현재 세션의 실행별 통계 (없으면 None)"""
+        with self._lock:
+            return self._reruns.get(self._session_id())
+
+    def record_call(self, method, args, seconds, size, failed):
+        key = (UPSTREAMS.get(method, 'other'), method, _call_label(method, args))
+        with self._lock:
+            for scope in self._scopes():
+                scope.add_call(key, seconds, size, failed)
+
+    def record_cache(self, cache, namespace, label, hit):
+        """캐시 조회 결과 기록
+
+        Args:
+            cache: 캐시 이름 ('quote', 'ohlcv', 'ledger')
+            namespace: 캐시 안의 구분 (시장 등)
+            label: 종목 티커 또는 시트 이름
+            hit: upstream 조회 없이 캐시로 처리했으면 True
+        """
+        key = (cache, str(namespace), str(label))
+        with self._lock:
+            for scope in self._scopes():
+                scope.add_cache(key, hit)
+
+    def instrument(self, provider):
+        """공급자의 upstream 메서드를 계측하는 래퍼 반환 (이미 계측된 공급자는 그대로)"""
+        if provider is None or isinstance(provider, InstrumentedProvider):
+            return provider
+        return InstrumentedProvider(provider, self)
+
+    def totals(self, scope=None):
+        """upstream별 합계 {upstream: {'calls', 'errors', 'seconds', 'bytes'}}"""
+        scope = scope or self.process
+        totals = {}
+        with self._lock:
+            for (upstream, _, _), stats in scope.calls.items():
+                total = totals.setdefault(upstream, {'calls': 0, 'errors': 0, 'seconds': 0.0, 'bytes': 0})
+                total['calls'] += stats.calls
+                total['errors'] += stats.errors
+                total['seconds'] += stats.seconds
+                total['bytes'] += stats.bytes
+        return totals
+
+    def calls_frame(self, scope=None, by_label=False):
+        """호출 통계 표 (by_label=False면 upstream/메서드 단위로 합산)"""
+        scope = scope or self.process
+        with self._lock:
+            rows = [
+                (upstream, method, label, s.calls, s.errors, s.seconds, s.max_seconds, s.bytes)
+                for (upstream, method, label), s in scope.calls.items()
+            ]
+
+        columns = ['UPSTREAM', 'METHOD', 'TICKER', 'CALLS', 'ERRORS', 'TOTAL(s)', 'MAX(s)', 'BYTES']
+        df = pd.DataFrame(rows, columns=columns).astype({
+            'CALLS': 'int64', 'ERRORS': 'int64', 'TOTAL(s)': 'float64', 'MAX(s)': 'float64', 'BYTES': 'int64'
+        })
+        if not by_label:
+            df = df.groupby(['UPSTREAM', 'METHOD'], as_index=False).agg({
+                'CALLS': 'sum', 'ERRORS': 'sum', 'TOTAL(s)': 'sum', 'MAX(s)': 'max', 'BYTES': 'sum'
+            })
+        df['AVG(ms)'] = (df['TOTAL(s)'] / df['CALLS'].where(df['CALLS'] > 0) * 1000).round(1)
+        df['KB'] = (df['BYTES'] / 1024).round(1)
+        return df.drop(columns='BYTES').sort_values('TOTAL(s)', ascending=False, kind='stable').reset_index(drop=True)
+
+    def cache_frame(self, scope=None, by_label=False):
+        """캐시 적중 통계 표"""
+        scope = scope or self.process
+        with self._lock:
+            rows = [(cache, namespace, label, hit, miss) for (cache, namespace, label), (hit, miss) in scope.cache.items()]
+
+        df = pd.DataFrame(rows, columns=['CACHE', 'KIND', 'TICKER', 'HITS', 'MISSES']).astype({'HITS': 'int64', 'MISSES': 'int64'})
+        if not by_label:
+            df = df.groupby(['CACHE', 'KIND'], as_index=False)[['HITS', 'MISSES']].sum()
+        total = df['HITS'] + df['MISSES']
+        df['HIT RATE'] = (df['HITS'] / total.where(total > 0)).round(3)
+        return df
+
+    def to_prometheus(self):
+        """프로세스 누적 통계를 Prometheus 텍스트 형식으로 변환"""
+        def escape(value):
+            return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+        with self._lock:
+            calls = list(self.process.calls.items())
+            cache = list(self.process.cache.items())
+
+        series = [
+            ('upstream_calls_total', 'counter', 'Upstream calls', lambda s: s.calls),
+            ('upstream_errors_total', 'counter', 'Upstream calls that raised', lambda s: s.errors),
+            ('upstream_seconds_total', 'counter', 'Time spent in upstream calls', lambda s: s.seconds),
+            ('upstream_seconds_max', 'gauge', 'Slowest upstream call', lambda s: s.max_seconds),
+            ('upstream_bytes_total', 'counter', 'Approximate upstream response size', lambda s: s.bytes)
+        ]
+
+        lines = []
+        for name, kind, help_text, value in series:
+            lines.append(f"# HELP {PROMETHEUS_PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {PROMETHEUS_PREFIX}_{name} {kind}")
+            for (upstream, method, label), stats in calls:
+                labels = f'upstream="{escape(upstream)}",method="{escape(method)}",ticker="{escape(label)}"'
+                lines.append(f"{PROMETHEUS_PREFIX}_{name}{{{labels}}} {value(stats)}")
+
+        lines.append(f"# HELP {PROMETHEUS_PREFIX}_cache_requests_total Cache lookups by result")
+        lines.append(f"# TYPE {PROMETHEUS_PREFIX}_cache_requests_total counter")
+        for (cache_name, namespace, label), (hits, misses) in cache:
+            labels = f'cache="{escape(cache_name)}",kind="{escape(namespace)}",ticker="{escape(label)}"'
+            lines.append(f'{PROMETHEUS_PREFIX}_cache_requests_total{{{labels},result="hit"}} {hits}')
+            lines.append(f'{PROMETHEUS_PREFIX}_cache_requests_total{{{labels},result="miss"}} {misses}')
+
+        return '\n'.join(lines) + '\n'
+
+    def to_jsonl(self, scope=None, scope_name='process'):
+        """통계를 JSON lines 형식으로 변환 (호출/캐시 항목마다 한 줄)"""
+        scope = scope or self.process
+        now = time.time()
+        with self._lock:
+            records = [
+                {'ts': now, 'scope': scope_name, 'type': 'call', 'upstream': upstream, 'method': method,
+                 'ticker': label, 'calls': s.calls, 'errors': s.errors, 'seconds': round(s.seconds, 6),
+                 'max_seconds': round(s.max_seconds, 6), 'bytes': s.bytes}
+                for (upstream, method, label), s in scope.calls.items()
+            ] + [
+                {'ts': now, 'scope': scope_name, 'type': 'cache', 'cache': cache_name, 'kind': namespace,
+                 'ticker': label, 'hits': hits, 'misses': misses}
+                for (cache_name, namespace, label), (hits, misses) in scope.cache.items()
+            ]
+        return ''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in records)
+
+    def end_rerun(self, prometheus_file=METRICS_PROMETHEUS_FILE, jsonl_file=METRICS_JSONL_FILE, scope_name='rerun'):
+        """실행이 끝날 때 설정된 파일로 내보내기 (Prometheus textfile collector, JSON lines 로그)
+
+        Args:
+            scope_name: JSON lines의 scope 값 ('rerun' 또는 fragment 단독 실행은 'fragment:<함수 이름>')
+        """
+        if prometheus_file:
+            # 수집기가 쓰다 만 파일을 읽지 않도록 임시 파일에 쓴 뒤 교체
+            temp_path = f"{prometheus_file}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                f.write(self.to_prometheus())
+            os.replace(temp_path, prometheus_file)
+
+        rerun = self.current_rerun()
+        if jsonl_file and rerun is not None:
+            with open(jsonl_file, 'a', encoding='utf-8') as f:
+                f.write(self.to_jsonl(rerun, scope_name=scope_name))
+
+    def display_panel(self):
+        """사이드바 계측 패널 (접이식)"""
+        with st.expander("UPSTREAM METRICS"):
+            scope_name = st.radio("SCOPE", ["THIS RUN", "PROCESS"], horizontal=True, key="metrics_scope")
+            by_label = st.toggle("BY TICKER", key="metrics_by_ticker")
+
+            scope = self.current_rerun() if scope_name == "THIS RUN" else self.process
+            if scope is None:
+                st.caption("NO DATA")
+                return
+
+            calls = self.calls_frame(scope, by_label)
+            if calls.empty:
+                st.caption("NO UPSTREAM CALLS")
+            else:
+                st.caption(f"{int(calls['CALLS'].sum())} calls | {calls['TOTAL(s)'].sum():.2f}s | "
+                           f"{int(calls['ERRORS'].sum())} errors | {calls['KB'].sum():,.0f} KB")
+                st.dataframe(calls, hide_index=True, use_container_width=True)
+
+            cache = self.cache_frame(scope, by_label)
+            if not cache.empty:
+                st.dataframe(cache, hide_index=True, use_container_width=True)
+
+            col1, col2 = st.columns(2)
+            col1.download_button("PROMETHEUS", self.to_prometheus(), file_name="stock_dashboard.prom",
+                                 mime="text/plain", key="metrics_prometheus")
+            col2.download_button("JSONL", self.to_jsonl(scope, 'rerun' if scope is not self.process else 'process'),
+                                 file_name="stock_dashboard_metrics.jsonl", mime="application/x-ndjson",
+                                 key="metrics_jsonl")
+
+
+class InstrumentedProvider:
+    """공급자의 upstream 메서드 호출마다 시간, 응답 크기, 오류를 UpstreamMetrics에 기록하는 래퍼"""
+
+    def __init__(self, provider, registry):
+        self.provider = provider
+        self.registry = registry
+        self.mode = provider.mode
+
+    def __getattr__(self, name):
+        method = getattr(self.provider, name)
+        if name not in UPSTREAMS:
+            return method
+
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                value = method(*args, **kwargs)
+            except Exception:
+                self.registry.record_call(name, args, time.perf_counter() - started, 0, True)
+                raise
+            self.registry.record_call(name, args, time.perf_counter() - started, payload_bytes(value), False)
+            return value
+
+        timed.__name__ = name
+        return timed
+
+
+# 프로세스 전체에서 공유하는 계측 레지스트리
+upstream_metrics = UpstreamMetrics()
@@ -0,0 +1,472 @@
+import re
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from modules.fetch_executor import fetch_executor
+from modules.ohlcv_store import ohlcv_store
+from modules.profiler import script_profiler
+from modules.positions import trade_signs
+from modules.schema import get_schema
+from modules.analytics import PERIODS, account_analytics, rolling_volatility
+from modules.korean_stocks import KoreanPortfolio
+from modules.us_stocks import USPortfolio
+from modules.fx import fx_service
+
+# 시장별 일봉 조회 공급자 (fetch_executor 요청 제한 구분)
+MARKET_PROVIDERS = {'KRX': 'pykrx', 'US': 'yfinance'}
+
+
+def instrument_market(ticker):
+    """국내 종목코드(숫자로 시작하는 6자리)는 'KRX', 그 외는 'US'"""
+    ticker = str(ticker)
+    return 'KRX' if len(ticker) == 6 and ticker[0].isdigit() else 'US'
+
+
+def _normalize_name(name):
+    """공백을 없애고 대문자로 통일 (예: 'TIGER 미국 S&P500' -> 'TIGER미국S&P500')"""
+    return re.sub(r'\s+', '', str(name)).upper()
+
+
+def map_instruments(names, catalog):
+    """종목명 목록을 티커로 변환 (고유 종목명 단위로 한 번만 판별)
+
+    Args:
+        names: 거래내역 종목명 Series
+        catalog: {티커: [종목명 또는 검색어, ...]}
+
+    Returns:
+        names와 같은 길이의 티커 배열 (찾지 못하면 None)
+    """
+    tickers = {_normalize_name(ticker): ticker for ticker in catalog}
+    # 긴 이름부터 비교하여 짧은 검색어가 먼저 잘못 일치하지 않도록 함
+    keywords = sorted(
+        ((_normalize_name(keyword), ticker) for ticker, keys in catalog.items() for keyword in keys),
+        key=lambda item: -len(item[0])
+    )
+
+    def resolve(name):
+        normalized = _normalize_name(name)
+        if normalized in tickers:
+            return tickers[normalized]
+        for keyword, ticker in keywords:
+            if keyword and keyword in normalized:
+                return ticker
+        return None
+
+    codes, uniques = pd.factorize(names.astype(str))
+    resolved = np.array([resolve(name) for name in uniques] + [None], dtype=object)
+    return resolved[codes]
+
+
+def ledger_trades(df, catalog):
+    """거래내역을 NAV 계산용 거래 목록('날짜', '계좌', '티커', '수량', '금액')으로 변환
+
+    '금액'은 부호 있는 수량 x 단가 (단가 컬럼이 없으면 NaN, 종목 통화 기준)
+
+    Returns:
+        (거래 DataFrame, 티커를 찾지 못한 종목명 목록)
+    """
+    columns = ['날짜', '계좌', '티커', '수량', '금액']
+    schema = get_schema(df.columns)
+    if df.empty or not (schema.date and schema.name and schema.qty):
+        return pd.DataFrame(columns=columns), []
+
+    # 종목코드 컬럼이 있으면 우선 사용하고, 없는 행만 종목명으로 판별
+    tickers = map_instruments(df[schema.name], catalog)
+    if schema.code:
+        codes = df[schema.code].astype(str).to_numpy()
+        tickers = np.where(np.isin(codes, ['', 'nan']), tickers, codes)
+
+    sign = trade_signs(df[schema.type]) if schema.type else 1
+    qty = pd.to_numeric(df[schema.qty], errors='coerce').to_numpy(dtype=float) * sign
+    price = pd.to_numeric(df[schema.price], errors='coerce').to_numpy(dtype=float) if schema.price else np.nan
+    trades = pd.DataFrame({
+        '날짜': pd.to_datetime(df[schema.date], errors='coerce').to_numpy(),
+        '계좌': df[schema.account].astype(str).to_numpy() if schema.account else '',
+        '티커': tickers,
+        '수량': qty,
+        '금액': qty * price
+    })
+
+    unmapped = sorted(set(df[schema.name].astype(str)[pd.isna(tickers)]))
+    valid = trades['날짜'].notna() & trades['티커'].notna() & trades['수량'].notna()
+    return trades[valid].reset_index(drop=True), unmapped
+
+
+class NavEngine:
+    """날짜 x (계좌, 티커) 보유 수량 행렬과 계좌별 NAV를 누적합으로 계산하고, 새 거래일/거래만 반영해 갱신
+
+    holdings(보유 수량), flows(그날 거래 금액, 매수 +), values(평가금액)는 모두 같은 날짜 x (계좌, 티커) 행렬입니다.
+    """
+
+    def __init__(self):
+        self.dates = pd.DatetimeIndex([])
+        self.columns = [] # (계좌, 티커)
+        self.holdings = np.zeros((0, 0))
+        self.flows = np.zeros((0, 0))
+        self.values = np.zeros((0, 0))
+        self.nav = pd.DataFrame()
+        self.last_update = None
+        self.version = 0
+
+        self._closes = np.zeros((0, 0))
+        self._tickers = []
+        self._column_index = {}
+        self._trade_count = 0
+        self._trade_hash = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _fingerprint(trades):
+        return int(pd.util.hash_pandas_object(trades, index=False).sum()) if len(trades) else 0
+
+    def _add_trades(self, trades):
+        """거래를 보유 수량 행렬에 더하고 (해당 거래일 이후 모든 행에 누적) 바뀐 첫 행 번호 반환"""
+        if trades.empty:
+            return len(self.dates)
+
+        keys = list(zip(trades['계좌'], trades['티커']))
+        for key in dict.fromkeys(keys):
+            if key not in self._column_index:
+                self._column_index[key] = len(self.columns)
+                self.columns.append(key)
+        if self.holdings.shape[1] < len(self.columns):
+            pad = ((0, 0), (0, len(self.columns) - self.holdings.shape[1]))
+            self.holdings = np.pad(self.holdings, pad)
+            self.flows = np.pad(self.flows, pad)
+
+        # 거래일이 거래소 휴일이면 다음 거래일, 마지막 거래일 이후면 마지막 거래일에 반영
+        rows = np.minimum(self.dates.searchsorted(trades['날짜'].to_numpy()), len(self.dates) - 1)
+        cols = np.array([self._column_index[key] for key in keys])
+
+        # 거래 금액은 거래내역 단가 기준, 단가가 없으면 그날 종가 기준
+        ticker_index = {ticker: i for i, ticker in enumerate(self._tickers)}
+        closes = self._closes[rows, [ticker_index[ticker] for _, ticker in keys]]
+        qty = trades['수량'].to_numpy(dtype=float)
+        amounts = trades['금액'].to_numpy(dtype=float)
+        amounts = np.where(np.isnan(amounts), qty * closes, amounts)
+
+        first = int(rows.min())
+        changes = np.zeros((len(self.dates) - first, len(self.columns)))
+        np.add.at(changes, (rows - first, cols), qty)
+        self.holdings[first:] += changes.cumsum(axis=0)
+        np.add.at(self.flows, (rows, cols), np.nan_to_num(amounts))
+        return first
+
+    def update(self, trades, closes):
+        """거래 목록과 종가 행렬로 보유 수량/NAV 갱신
+
+        Args:
+            trades: ledger_trades가 만든 거래 목록 (거래내역 순서)
+            closes: 날짜 x 티커 종가 DataFrame (원화 기준, 결측은 직전 값으로 채운 상태)
+        """
+        with self._lock:
+            dates = closes.index
+            tickers = list(closes.columns)
+            values = closes.to_numpy(dtype=float)
+            old = len(self.dates)
+
+            # 기존 거래가 그대로이고 기존 거래일/종가(마지막 행 제외)가 같으면 증분 갱신
+            incremental = (
+                old > 0
+                and len(trades) >= self._trade_count
+                and self._fingerprint(trades.iloc[:self._trade_count]) == self._trade_hash
+                and tickers[:len(self._tickers)] == self._tickers
+                and len(dates) >= old and dates[:old].equals(self.dates)
+                and np.array_equal(values[:old - 1, :len(self._tickers)], self._closes[:old - 1], equal_nan=True)
+            )
+
+            # 거래/거래일/종목/종가가 모두 같으면 다시 계산하지 않음 (마지막 행의 장중 종가가 바뀌면 재계산)
+            unchanged = (
+                incremental
+                and len(dates) == old
+                and len(trades) == self._trade_count
+                and tickers == self._tickers
+                and np.array_equal(values[old - 1], self._closes[old - 1], equal_nan=True)
+            )
+            if unchanged:
+                self.last_update = 'unchanged'
+                return self.nav
+
+            self._closes = values
+            self._tickers = tickers
+
+            if incremental:
+                new_trades = trades.iloc[self._trade_count:]
+                # 새 거래일은 마지막 보유 수량을 이어 붙인 뒤 새 거래만 더함
+                self.holdings = np.vstack([self.holdings, np.repeat(self.holdings[-1:], len(dates) - old, axis=0)])
+                self.flows = np.vstack([self.flows, np.zeros((len(dates) - old, self.flows.shape[1]))])
+                self.dates = dates
+                first = min(self._add_trades(new_trades), old - 1)
+                self.last_update = 'incremental'
+            else:
+                self.dates = dates
+                self.columns = []
+                self._column_index = {}
+                self.holdings = np.zeros((len(dates), 0))
+                self.flows = np.zeros((len(dates), 0))
+                self._add_trades(trades)
+                first = 0
+                self.last_update = 'full'
+
+            # NAV를 다시 계산할 때마다 버전을 올려 버전별로 저장한 수익률 지표를 무효화
+            self.version += 1
+
+            self._trade_count = len(trades)
+            self._trade_hash = self._fingerprint(trades)
+
+            self._update_nav(first)
+            return self.nav
+
+    def _update_nav(self, first):
+        """first 행부터 계좌별 평가금액 합계를 다시 계산"""
+        accounts = list(dict.fromkeys(account for account, _ in self.columns))
+        if list(self.nav.columns) != accounts:
+            first = 0
+
+        ticker_index = {ticker: i for i, ticker in enumerate(self._tickers)}
+        price_cols = np.array([ticker_index[ticker] for _, ticker in self.columns], dtype=int)
+
+        # 계좌별 합산은 (열 -> 계좌) 원-핫 행렬 곱으로 한 번에 계산
+        onehot = np.zeros((len(self.columns), len(accounts)))
+        onehot[np.arange(len(self.columns)), [accounts.index(account) for account, _ in self.columns]] = 1
+
+        prices = np.nan_to_num(self._closes[first:, price_cols])
+        values = self.holdings[first:] * prices
+        self.values = values if first == 0 else np.vstack([self.values[:first], values])
+
+        nav = pd.DataFrame(values @ onehot, index=self.dates[first:], columns=accounts)
+        self.nav = nav if first == 0 else pd.concat([self.nav.iloc[:first], nav])
+
+    def _frame(self, matrix):
+        return pd.DataFrame(
+            matrix, index=self.dates,
+            columns=pd.MultiIndex.from_tuples(self.columns, names=['계좌', '티커'])
+        )
+
+    def holdings_frame(self):
+        """날짜 x (계좌, 티커) 보유 수량 DataFrame"""
+        return self._frame(self.holdings)
+
+    def flows_frame(self):
+        """날짜 x (계좌, 티커) 거래 금액 DataFrame (매수 +, 매도 -)"""
+        return self._frame(self.flows)
+
+    def values_frame(self):
+        """날짜 x (계좌, 티커) 평가금액 DataFrame"""
+        return self._frame(self.values)
+
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def get_nav_engine(key):
+    """거래내역별 프로세스 공용 NavEngine"""
+    with _engines_lock:
+        if key not in _engines:
+            _engines[key] = NavEngine()
+        return _engines[key]
+
+
+class PortfolioNav:
+    """거래내역과 로컬 일봉 저장소를 결합한 계좌별 일간 NAV"""
+
+    def __init__(self, history, aliases=None):
+        """
+        Args:
+            history: 공유할 TransactionHistory
+            aliases: 추가 종목명/검색어 {티커: [이름, ...]} (예: 연금 리밸런싱 자산의 search_key)
+        """
+        self.history = history
+        self.aliases = aliases or {}
+
+        # 종목명 목록과 일봉 조회 함수는 추이를 켰을 때 처음 필요하므로 _load_portfolios에서 준비
+        self.catalog = None
+        self.us = None
+        self.fetchers = None
+        self.us_trades = pd.DataFrame()
+        self.engine = get_nav_engine((history.spreadsheet_id, history.sheet_name))
+
+    def _load_portfolios(self):
+        """국내/해외 포트폴리오에서 티커 -> 종목명/검색어 목록과 시장별 일봉 조회 함수 준비"""
+        if self.catalog is not None:
+            return
+
+        korean = KoreanPortfolio()
+        us = USPortfolio()
+
+        catalog = {ticker: [name] for ticker, name in korean.etf_names.items()}
+        for ticker, name in us.stock_names.items():
+            catalog[ticker] = [name]
+        for ticker, names in self.aliases.items():
+            catalog.setdefault(ticker, []).extend(names)
+
+        self.us = us
+        self.fetchers = {'KRX': korean._fetch_ohlcv, 'US': us._fetch_ohlcv}
+        self.catalog = catalog
+
+    def load_closes(self, tickers, start, end=None):
+        """티커별 종가를 로컬 저장소에서 읽어 날짜 x 티커 행렬로 결합 (해외 종목은 일별 환율로 원화 환산)
+
+        Returns:
+            (종가 DataFrame, {티커: 오류})
+        """
+        self._load_portfolios()
+        end = end or datetime.now()
+        closes = {}
+        errors = {}
+        fx_rates = None
+
+        for market, provider in MARKET_PROVIDERS.items():
+            market_tickers = [ticker for ticker in tickers if instrument_market(ticker) == market]
+            fetch = self.fetchers[market]
+            results = fetch_executor.map(
+                provider,
+                lambda ticker, market=market, fetch=fetch: ohlcv_store.get_history(
+                    market, ticker, start, end,
+                    lambda s, e, ticker=ticker: fetch(ticker, s, e)
+                ),
+                market_tickers
+            )
+
+            for ticker in market_tickers:
+                result = results[ticker]
+                if isinstance(result, Exception):
+                    errors[ticker] = result
+                    continue
+                close = result['close'].astype(float)
+                if market == 'US':
+                    if fx_rates is None:
+                        fx_rates = fx_service.daily_series(pd.Timestamp(start) - pd.Timedelta(days=10), end)
+                    close = close * fx_service.rates_on(close.index, fx_rates)
+                closes[ticker] = close
+
+        if not closes:
+            return pd.DataFrame(columns=list(tickers), dtype=float), errors
+
+        # 국내/미국 거래일의 합집합 기준으로 휴장일은 직전 종가 사용
+        df = pd.concat(closes, axis=1).sort_index().ffill()
+        df.index = pd.DatetimeIndex(df.index)
+        return df.reindex(columns=[ticker for ticker in tickers if ticker in closes]), errors
+
+    def calculate_nav(self):
+        """계좌별 NAV DataFrame (날짜 x 계좌), 판별하지 못한 종목명, 조회 오류 반환"""
+        self._load_portfolios()
+        df = self.history.get_history()
+        trades, unmapped = ledger_trades(df, self.catalog)
+        if trades.empty:
+            return pd.DataFrame(), unmapped, {}
+
+        tickers = list(dict.fromkeys(trades['티커']))
+        closes, errors = self.load_closes(tickers, trades['날짜'].min())
+
+        # 시세가 없는 종목의 거래는 제외하고, 해외 종목 거래 금액은 거래일 환율로 원화 환산
+        trades = trades[trades['티커'].isin(closes.columns)].reset_index(drop=True)
+        if trades.empty or closes.empty:
+            return pd.DataFrame(), unmapped, errors
+
+        us = trades['티커'].map(instrument_market).to_numpy() == 'US'
+        self.us_trades = trades[us].reset_index(drop=True)
+        if us.any():
+            trades.loc[us, '금액'] = fx_service.convert(self.us_trades['금액'], self.us_trades['날짜'])
+
+        return self.engine.update(trades, closes), unmapped, errors
+
+    def display_dashboard(self):
+        """계좌별 평가금액 추이 표시 (전체 기간 시세 조회가 필요하므로 켰을 때만 계산)"""
+        if not st.toggle("평가금액 추이 보기", key="nav_open"):
+            return
+
+        fetch_executor.begin_render()
+
+        with st.spinner('일별 평가금액 계산 중...'):
+            nav, unmapped, errors = self.calculate_nav()
+
+        for ticker, error in errors.items():
+            st.error(f"{ticker} 시세 조회 실패: {error}")
+        if unmapped:
+            st.warning(f"티커를 찾지 못해 제외된 종목: {', '.join(unmapped)}")
+
+        if nav.empty:
+            st.warning("NO DATA AVAILABLE")
+            return
+
+        accounts = st.multiselect("ACCOUNTS", list(nav.columns), default=list(nav.columns), key="nav_accounts")
+        if not accounts:
+            return
+
+        selected = nav[accounts]
+        latest = selected.iloc[-1]
+
+        cols = st.columns(len(accounts) + 1)
+        cols[0].metric("총 평가금액", f"{latest.sum():,.0f}원")
+        for col, account in zip(cols[1:], accounts):
+            col.metric(str(account), f"{latest[account]:,.0f}원")
+
+        with script_profiler.section('chart building'):
+            st.line_chart(selected)
+        st.caption(f"{selected.index[0]:%Y-%m-%d} ~ {selected.index[-1]:%Y-%m-%d} | 해외 종목은 일별 USD/KRW 환율로 환산")
+
+        self.display_analytics(accounts)
+
+        if not self.us_trades.empty:
+            with st.expander(f"해외 종목 원화 손익 (현재 환율 {self.us.exchange_rate:,.2f}원)"):
+                summary = self.us.get_ledger_summary(self.us_trades)
+                st.dataframe(
+                    summary.style.format({
+                        '순매입금액(USD)': '${:,.2f}',
+                        '순매입금액(원)': '{:,.0f}',
+                        '평가금액(원)': '{:,.0f}',
+                        '손익(원)': '{:+,.0f}',
+                        '환차손익(원)': '{:+,.0f}'
+                    }),
+                    use_container_width=True,
+                    hide_index=True
+                )
+                st.caption("매입 금액은 거래일 환율, 평가금액은 실시간 환율 기준")
+
+    def display_analytics(self, accounts):
+        """선택한 계좌별 기간 수익률 지표와 종목별 손익 기여도 표시"""
+        st.markdown("### 📐 수익률 분석")
+        period = st.radio("PERIOD", list(PERIODS), index=list(PERIODS).index('1Y'), horizontal=True, key="nav_period")
+
+        targets = [None] + accounts if len(accounts) > 1 else accounts
+        rows = []
+        for account in targets:
+            result = account_analytics(self.engine, account, period)
+            rows.append({
+                '계좌': '전체' if account is None else account,
+                '기간': f"{result['start']:%Y-%m-%d} ~ {result['end']:%Y-%m-%d}",
+                '시간가중수익률': f"{result['twr']:.2%}",
+                '금액가중수익률(연)': f"{result['irr']:.2%}" if pd.notna(result['irr']) else '-',
+                '최대 낙폭': f"{result['mdd']:.2%}",
+                '변동성(연)': f"{result['volatility']:.2%}" if pd.notna(result['volatility']) else '-',
+                '손익(원)': f"{result['pnl']:,.0f}"
+            })
+        st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+
+        # 계좌별 60거래일 이동 변동성
+        returns = pd.DataFrame({
+            '전체' if account is None else account: account_analytics(self.engine, account, period)['returns']
+            for account in targets
+        })
+        st.caption("60거래일 이동 변동성 (연환산)")
+        with script_profiler.section('chart building'):
+            st.line_chart(rolling_volatility(returns, window=60))
+
+        account = st.selectbox("손익 기여도 계좌", accounts, key="nav_attribution_account")
+        attribution = account_analytics(self.engine, account, period)['attribution']
+        st.dataframe(
+            attribution.style.format({
+                '기말 평가금액(원)': '{:,.0f}',
+                '손익(원)': '{:,.0f}',
+                '손익 기여도': '{:.1%}'
+            }),
+            use_container_width=True,
+            hide_index=True
+        )
@@ -0,0 +1,168 @@
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+
+from modules.metrics import upstream_metrics
+from modules.settings import cache_path
+from modules.trading_calendar import get_calendar
+
+COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+
+def _to_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return pd.Timestamp(value).date()
+
+
+class OHLCVStore:
+    """종목별 일봉을 로컬 SQLite에 저장하고 부족한 구간만 추가 조회하는 저장소"""
+
+    def __init__(self, path=None, live_ttl=60):
+        """
+        Args:
+            path: SQLite 파일 경로 (기본값: 캐시 디렉터리의 ohlcv.sqlite)
+            live_ttl: 장중일 수 있는 마지막 봉을 다시 조회하는 주기(초)
+        """
+        self.path = path or cache_path('ohlcv.sqlite')
+        self.live_ttl = live_ttl
+        self._lock = threading.Lock()
+
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS bars (
+                    market TEXT, ticker TEXT, date TEXT,
+                    open REAL, high REAL, low REAL, close REAL, volume REAL,
+                    PRIMARY KEY (market, ticker, date)
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS coverage (
+                    market TEXT, ticker TEXT,
+                    first_date TEXT, last_date TEXT, fetched_at REAL,
+                    PRIMARY KEY (market, ticker)
+                )
+            """)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def coverage(self, market, ticker):
+        """저장된 구간 (first_date, last_date, fetched_at) 또는 None"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT first_date, last_date, fetched_at FROM coverage WHERE market = ? AND ticker = ?",
+                (market, ticker)
+            ).fetchone()
+
+        if row is None:
+            return None
+        return date.fromisoformat(row[0]), date.fromisoformat(row[1]), row[2]
+
+    def missing_ranges(self, market, ticker, start, end):
+        """[start, end] 구간을 채우기 위해 조회해야 하는 (시작, 끝) 목록"""
+        start, end = _to_date(start), _to_date(end)
+        stored = self.coverage(market, ticker)
+
+        if stored is None:
+            return [(start, end)]
+
+        first, last, fetched_at = stored
+        ranges = []
+
+        if start < first:
+            ranges.append((start, first - timedelta(days=1)))
+
+        # 마지막 봉이 해당 시장의 장 마감 전에 저장됐다면 장중 값일 수 있으므로 다시 조회
+        session_end = get_calendar(market).session_close(last)
+        last_is_live = fetched_at < session_end and time.time() - fetched_at > self.live_ttl
+
+        if end > last or last_is_live:
+            ranges.append((last, max(end, last)))
+
+        return ranges
+
+    def write(self, market, ticker, df, start, end):
+        """조회한 봉을 저장하고 저장 구간을 start부터 실제로 받은 마지막 봉까지 넓힘
+
+        조회 실패로 빈 결과(None 또는 빈 DataFrame)를 받으면 저장 구간을 바꾸지 않아 다음 조회에서 다시 요청합니다.
+
+        Args:
+            df: 날짜 인덱스와 open/high/low/close/volume 컬럼을 가진 DataFrame
+        """
+        if df is None or df.empty:
+            return
+
+        start, end = _to_date(start), _to_date(end)
+
+        frame = df.reindex(columns=COLUMNS).astype(float)
+        frame = frame.astype(object).where(frame.notna(), None)
+        dates = [_to_date(index).isoformat() for index in frame.index]
+        rows = [
+            (market, ticker, day, *values)
+            for day, values in zip(dates, frame.itertuples(index=False, name=None))
+        ]
+        # 요청 구간 끝까지 봉이 없으면(아직 생성 전 등) 받은 마지막 봉까지만 저장된 것으로 기록
+        end = min(end, date.fromisoformat(max(dates)))
+
+        with self._lock, self._connect() as conn:
+            conn.executemany("INSERT OR REPLACE INTO bars VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+            stored = conn.execute(
+                "SELECT first_date, last_date, fetched_at FROM coverage WHERE market = ? AND ticker = ?",
+                (market, ticker)
+            ).fetchone()
+
+            fetched_at = time.time()
+            if stored is not None:
+                first, last = date.fromisoformat(stored[0]), date.fromisoformat(stored[1])
+                # 과거 구간만 채운 경우에는 마지막 봉의 조회 시각을 유지
+                if end < last:
+                    fetched_at = stored[2]
+                start = min(start, first)
+                end = max(end, last)
+
+            conn.execute(
+                "INSERT OR REPLACE INTO coverage VALUES (?, ?, ?, ?, ?)",
+                (market, ticker, start.isoformat(), end.isoformat(), fetched_at)
+            )
+
+    def read(self, market, ticker, start, end):
+        """저장된 일봉 중 [start, end] 구간을 DataFrame으로 반환"""
+        with self._connect() as conn:
+            df = pd.read_sql_query(
+                "SELECT date, open, high, low, close, volume FROM bars "
+                "WHERE market = ? AND ticker = ? AND date BETWEEN ? AND ? ORDER BY date",
+                conn,
+                params=(market, ticker, _to_date(start).isoformat(), _to_date(end).isoformat())
+            )
+
+        df.index = pd.to_datetime(df.pop('date'))
+        df.index.name = None
+        return df
+
+    def get_history(self, market, ticker, start, end, fetch):
+        """부족한 구간만 fetch(start, end)로 받아 저장한 뒤 [start, end] 구간을 반환
+
+        Args:
+            market: 'KRX', 'US' 또는 'FX' (거래일 달력 선택에 사용)
+            fetch: (시작일, 종료일)을 받아 open/high/low/close/volume DataFrame을 반환하는 함수
+        """
+        end = get_calendar(market).last_session(_to_date(end))
+
+        ranges = self.missing_ranges(market, ticker, start, end)
+        upstream_metrics.record_cache('ohlcv', market, ticker, not ranges)
+
+        for fetch_start, fetch_end in ranges:
+            self.write(market, ticker, fetch(fetch_start, fetch_end), fetch_start, fetch_end)
+
+        return self.read(market, ticker, start, end)
+
+
+# 프로세스 전체에서 공유하는 저장소
+ohlcv_store = OHLCVStore()
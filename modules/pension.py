@@ -1,13 +1,38 @@
-import FinanceDataReader as fdr
+import logging
+
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import streamlit as st
 
 from modules.history import TransactionHistory
+from modules.providers import get_provider
+from modules.profiler import script_profiler
+from modules.quote_cache import quote_cache
+from modules.trading_calendar import get_calendar, last_trading_date
+from modules.krx_snapshot import BOARD_ERRORS, get_etf_board, get_etf_quote
+from modules.metrics import upstream_metrics
+from modules.fetch_executor import fetch_executor
+from modules.rebalance_optimizer import optimize_shares
+from modules.scenarios import MAX_SCENARIOS, evaluate_scenarios, shock_grid
+
+logger = logging.getLogger(__name__)
+
+# 리밸런싱 방식 (표시 이름 -> 최적화 모드, None이면 목표 금액 기준 단순 내림)
+REBALANCING_METHODS = {
+    '단순 내림': None,
+    '최적화 (매수/매도)': 'full',
+    '최적화 (매수만)': 'buy_only'
+}
 
 class PensionRebalancing:
-    def __init__(self):
+    def __init__(self, history=None):
+        """
+        Args:
+            history: 공유할 TransactionHistory (없으면 새로 생성)
+        """
+        self.history = history if history is not None else TransactionHistory()
+
         # 자산 구성 및 목표 비중 정의
         # search_key: 구글 시트 '종목명' 매칭을 위한 키워드
         self.assets = {
@@ -19,23 +44,18 @@ class PensionRebalancing:
         }
         self.tickers = list(self.assets.keys())
 
+    @script_profiler.profiled('calculate_holdings')
     def calculate_holdings(self):
         """거래내역을 기반으로 현재 보유 수량을 계산합니다."""
         try:
-            history = TransactionHistory()
-            df = history.get_history()
+            positions = self.history.get_positions()
             
-            if df.empty:
-                return {}
-
-            # 계좌 컬럼 찾기
-            accounts, account_col = history.get_accounts(df)
-            if not account_col:
+            if positions.empty:
                 return {}
 
             # '연금저축'이 포함된 계좌 필터링
             pension_account = None
-            for acc in accounts:
+            for acc in positions['계좌'].unique():
                 if '연금저축' in str(acc):
                     pension_account = acc
                     break
@@ -44,50 +64,16 @@ class PensionRebalancing:
                 st.warning("계좌 목록에서 '연금저축' 계좌를 찾을 수 없습니다.")
                 return {}
 
-            # 해당 계좌의 거래내역만 필터링
-            df_pension = df[df[account_col] == pension_account].copy()
+            # 해당 계좌의 종목별 보유 수량
+            pension_positions = positions[positions['계좌'] == pension_account]
+            names = pension_positions['종목명']
             
-            # 보유 수량 계산
+            # 자산별 수량 합산 (종목명 고유값에 대해서만 키워드 매칭)
             current_holdings = {}
-            
-            # 종목명이나 코드로 매칭
-            name_col = None
-            qty_col = None
-            type_col = None # 매수/매도 구분
-            
-            for col in df_pension.columns:
-                if '종목명' in col or '종목' in col:
-                    name_col = col
-                if '수량' in col or '주수' in col:
-                    qty_col = col
-                if '구분' in col or '거래' in col: # 매수/매도
-                    type_col = col
-            
-            if not (name_col and qty_col):
-                return {}
-
-            # 자산별 수량 합산
             for ticker, info in self.assets.items():
                 search_key = info.get('search_key', info['name'])
-                
-                # 종목명에 검색 키워드가 포함된 행 필터링
-                asset_df = df_pension[df_pension[name_col].astype(str).str.contains(search_key, na=False)]
-                
-                total_qty = 0
-                for _, row in asset_df.iterrows():
-                    qty = pd.to_numeric(row[qty_col], errors='coerce')
-                    if pd.isna(qty): continue
-                    
-                    trade_type = str(row[type_col]) if type_col else ''
-                    
-                    if '매수' in trade_type:
-                        total_qty += qty
-                    elif '매도' in trade_type:
-                        total_qty -= qty
-                    else:
-                        total_qty += qty
-                
-                current_holdings[ticker] = int(total_qty)
+                matched = names.str.contains(search_key, regex=False, na=False)
+                current_holdings[ticker] = int(pension_positions.loc[matched, '보유수량'].sum())
                 
             return current_holdings
 
@@ -95,48 +81,90 @@ class PensionRebalancing:
             st.error(f"보유 수량 계산 중 오류 발생: {e}")
             return {}
 
+    def _fetch_daily_quote(self, ticker, date):
+        """가장 최근 거래일의 OHLCV 한 행을 조회"""
+        # ETF 시세판에 있으면 그대로 사용 (전 종목 1회 조회)
+        try:
+            quote = get_etf_quote(ticker, date)
+            if quote is not None:
+                return quote
+        except BOARD_ERRORS as e:
+            logger.warning("ETF 시세판 조회 실패, 개별 조회로 대체 (%s, %s): %s: %s", ticker, date, type(e).__name__, e)
+
+        # 시세판에 없으면 FinanceDataReader로 개별 조회
+        # 거래일 달력 기준 직전 거래일까지 한 번에 조회하여 마지막 행 사용
+        session = datetime.strptime(date, '%Y%m%d')
+        previous = get_calendar('KRX').last_session(session - timedelta(days=1))
+        df = get_provider().fdr_ohlcv(ticker, previous.strftime('%Y%m%d'), date)
+
+        if len(df) == 0:
+            return None
+
+        data = df.iloc[-1]
+        return {
+            'open': data['Open'],
+            'high': data['High'],
+            'low': data['Low'],
+            'close': data['Close'],
+            'volume': data['Volume']
+        }
+
+    @script_profiler.profiled('get_current_prices')
     def get_current_prices(self):
-        """현재가 조회"""
+        """현재가 조회 (국내 ETF 탭과 공용 시세 캐시 사용)"""
         prices = {}
-        today = datetime.now()
-        
+        date = last_trading_date()
+
+        # ETF 시세판을 먼저 한 번 받아 두고, 나머지 개별 조회는 병렬로 실행
+        try:
+            get_etf_board(date)
+        except BOARD_ERRORS as e:
+            # 실패해도 종목별 조회(_fetch_daily_quote)에서 개별 조회로 대체
+            logger.warning("ETF 시세판 조회 실패 (%s): %s: %s", date, type(e).__name__, e)
+
+        results = fetch_executor.map(
+            'fdr',
+            lambda ticker: quote_cache.get_or_fetch(
+                'KRX', ticker, date,
+                lambda: self._fetch_daily_quote(ticker, date)
+            ),
+            self.tickers
+        )
+
         for ticker in self.tickers:
-            try:
-                # 오늘 날짜로 먼저 조회
-                df = fdr.DataReader(ticker, today.strftime('%Y%m%d'), today.strftime('%Y%m%d'))
-                
-                # 데이터가 없으면 전일 데이터 조회 (최대 5일 전까지 시도)
-                if len(df) == 0:
-                    for i in range(1, 6):
-                        past_day = today - timedelta(days=i)
-                        df = fdr.DataReader(ticker, past_day.strftime('%Y%m%d'), past_day.strftime('%Y%m%d'))
-                        if len(df) > 0:
-                            break
-                
-                if len(df) > 0:
-                    prices[ticker] = df['Close'].iloc[-1]
-                else:
-                    prices[ticker] = 0 # 가격 조회 실패 시 0 처리 혹은 에러 처리
-            except Exception as e:
-                st.error(f"{self.assets[ticker]['name']} ({ticker}) 가격 조회 실패: {e}")
+            quote = results[ticker]
+
+            if isinstance(quote, Exception):
+                st.error(f"{self.assets[ticker]['name']} ({ticker}) 가격 조회 실패: {quote}")
                 prices[ticker] = 0
-                
+            elif quote is not None:
+                prices[ticker] = quote['close']
+            else:
+                prices[ticker] = 0 # 가격 조회 실패 시 0 처리 혹은 에러 처리
+
         return prices
 
-    def calculate_rebalancing(self, current_shares_input):
-        """리밸런싱 계산"""
+    def calculate_rebalancing(self, current_shares_input, options=None):
+        """리밸런싱 계산
+
+        Args:
+            current_shares_input: 자산별 현재 보유 수량
+            options: optimize_shares 옵션 (mode, cash, min_trade_value, fee_rate, sell_tax_rate).
+                None이면 자산별 목표 금액을 현재가로 나눈 뒤 내림
+        """
         prices = self.get_current_prices()
+        cash = options.get('cash', 0) if options else 0
         
         # 데이터 준비
         data = []
-        total_value = 0
+        holdings_value = 0
         
         # 1. 현재 가치 계산
         for ticker, info in self.assets.items():
             current_shares = current_shares_input.get(ticker, info['default_shares'])
             price = prices.get(ticker, 0)
             current_value = current_shares * price
-            total_value += current_value
+            holdings_value += current_value
             
             data.append({
                 'ticker': ticker,
@@ -146,18 +174,34 @@ class PensionRebalancing:
                 'current_value': current_value,
                 'target_weight': info['target_weight']
             })
+
+        # 추가 납입금(현금)도 목표 비중대로 배분할 총 자산에 포함
+        total_value = holdings_value + cash
+
+        # 최적화 모드이면 전체 자산의 목표 수량을 한 번에 계산
+        plan = None
+        if options is not None:
+            plan = optimize_shares(
+                prices=[item['price'] for item in data],
+                current_shares=[item['current_shares'] for item in data],
+                target_weights=[item['target_weight'] for item in data],
+                **options
+            )
             
         # 2. 리밸런싱 계산
         results = []
         after_total_value = 0
         
-        for item in data:
+        for i, item in enumerate(data):
             # 현재 비중
-            current_weight = item['current_value'] / total_value if total_value > 0 else 0
+            current_weight = item['current_value'] / holdings_value if holdings_value > 0 else 0
             
             # 목표 금액 및 수량
-            target_value = total_value * item['target_weight']
-            target_shares = int(target_value / item['price']) if item['price'] > 0 else 0
+            if plan is not None:
+                target_shares = int(plan['shares'][i])
+            else:
+                target_value = total_value * item['target_weight']
+                target_shares = int(target_value / item['price']) if item['price'] > 0 else 0
             
             # 매수/매도 수량
             shares_diff = target_shares - item['current_shares']
@@ -176,14 +220,19 @@ class PensionRebalancing:
                 '매수/매도': shares_diff,
                 '현재 보유금액(원)': item['current_value'],
                 '리밸런싱 후 금액(원)': after_value,
-                '예상 거래금액(원)': abs(shares_diff * item['price'])
+                '예상 거래금액(원)': abs(shares_diff * item['price']),
+                '예상 거래비용(원)': plan['costs'][i] if plan is not None else 0
             })
             
         df = pd.DataFrame(results)
         return df, total_value, after_total_value
 
-    def display_dashboard(self):
-        """대시보드 표시"""
+    def display_dashboard(self, refresh_interval=None):
+        """대시보드 표시
+
+        Args:
+            refresh_interval: 리밸런싱 결과(현재가)를 자동 갱신하는 주기(초). None이면 갱신하지 않음
+        """
         st.subheader("📊 연금저축펀드 리밸런싱 분석")
         
         # 보유 수량 자동 계산
@@ -209,57 +258,164 @@ class PensionRebalancing:
                     )
                     current_shares_input[ticker] = shares
         
+        # 리밸런싱 방식 및 제약 조건
+        with st.expander("리밸런싱 옵션"):
+            method = st.radio("계산 방식", list(REBALANCING_METHODS), horizontal=True, key="pension_method")
+            col1, col2, col3, col4 = st.columns(4)
+            cash = col1.number_input("추가 납입금(원)", min_value=0, value=0, step=100000, key="pension_cash")
+            min_trade_value = col2.number_input("최소 거래금액(원)", min_value=0, value=0, step=10000, key="pension_min_trade")
+            fee_pct = col3.number_input("수수료율(%)", min_value=0.0, value=0.015, step=0.005, format="%.3f", key="pension_fee")
+            tax_pct = col4.number_input("매도 세율(%)", min_value=0.0, value=0.0, step=0.01, format="%.3f", key="pension_tax")
+            st.caption("추가 납입금, 최소 거래금액, 수수료/세금은 최적화 방식에만 적용됩니다.")
+
+        options = None
+        if REBALANCING_METHODS[method] is not None:
+            options = {
+                'mode': REBALANCING_METHODS[method],
+                'cash': cash,
+                'min_trade_value': min_trade_value,
+                'fee_rate': fee_pct / 100,
+                'sell_tax_rate': tax_pct / 100
+            }
+
         # 계산 실행
         if st.button("리밸런싱 계산", type="primary"):
-            with st.spinner('현재가 조회 및 리밸런싱 계산 중...'):
-                df, total_val, after_total = self.calculate_rebalancing(current_shares_input)
-                
-                # 요약 메트릭
-                m1, m2, m3 = st.columns(3)
-                m1.metric("총 자산", f"{total_val:,.0f}원")
-                m2.metric("리밸런싱 후 예상 자산", f"{after_total:,.0f}원")
-                diff_val = after_total - total_val
-                m3.metric("자투리 금액 차이", f"{diff_val:,.0f}원", delta_color="off")
-                
-                st.markdown("---")
-                
-                # 테이블 표시를 위한 포맷팅
-                display_df = df.copy()
-                display_df['현재가'] = display_df['현재가'].apply(lambda x: f"{x:,.0f}")
-                display_df['현재 비중'] = display_df['현재 비중'].apply(lambda x: f"{x:.1%}")
-                display_df['목표 비중'] = display_df['목표 비중'].apply(lambda x: f"{x:.1%}")
-                display_df['매수/매도'] = display_df['매수/매도'].apply(lambda x: f"{x:+d}")
-                display_df['현재 보유금액(원)'] = display_df['현재 보유금액(원)'].apply(lambda x: f"{x:,.0f}")
-                display_df['리밸런싱 후 금액(원)'] = display_df['리밸런싱 후 금액(원)'].apply(lambda x: f"{x:,.0f}")
-                
-                # 예상 거래금액에 매수/매도 텍스트 추가
-                def format_trade_amount(row):
-                    amount = row['예상 거래금액(원)']
-                    action = "매수" if int(row['매수/매도']) > 0 else "매도" if int(row['매수/매도']) < 0 else "-"
-                    if action == "-":
-                        return "-"
-                    return f"{amount:,.0f} ({action})"
-                
-                display_df['예상 거래금액(원)'] = df.apply(format_trade_amount, axis=1)
-                
-                # 주요 컬럼만 선택하여 표시
-                cols_to_show = ['자산명', '현재 보유(주)', '현재 비중', '목표 수량(주)', '목표 비중', '매수/매도', '현재 보유금액(원)', '리밸런싱 후 금액(원)', '예상 거래금액(원)']
-                
-                # 스타일링 적용
-                styled_df = display_df[cols_to_show].style.set_properties(**{
-                    'background-color': '#131722',
-                    'color': '#D1D4DC',
-                    'border-color': '#2A2E39'
-                }).map(lambda x: 'color: #26a69a' if '매수' in str(x) else ('color: #ef5350' if '매도' in str(x) else ''), subset=['예상 거래금액(원)']) \
-                  .map(lambda x: 'color: #26a69a' if '+' in str(x) else ('color: #ef5350' if '-' in str(x) else ''), subset=['매수/매도'])
-
-                st.dataframe(
-                    styled_df,
-                    use_container_width=True,
-                    hide_index=True
-                )
-                
-                # 차트 시각화
-                st.markdown("### 📈 비중 변화 시각화")
-                chart_data = df[['자산명', '현재 비중', '목표 비중']].set_index('자산명')
+            st.session_state['pension_rebalancing_requested'] = True
+
+        # 한 번 계산한 뒤에는 결과 영역만 주기적으로 다시 실행하여 현재가 반영
+        # (거래내역 조회 등 나머지 화면은 다시 실행하지 않음)
+        if st.session_state.get('pension_rebalancing_requested'):
+            upstream_metrics.fragment(self.display_rebalancing, run_every=refresh_interval)(current_shares_input, options)
+
+        # 시나리오 분석 (입력 변경 시 이 영역만 다시 실행)
+        upstream_metrics.fragment(self.display_scenarios)(current_shares_input, fee_pct / 100, tax_pct / 100)
+
+    def display_rebalancing(self, current_shares_input, options=None):
+        """현재가 기준 리밸런싱 결과 표시"""
+        fetch_executor.begin_render()
+
+        with st.spinner('현재가 조회 및 리밸런싱 계산 중...'):
+            df, total_val, after_total = self.calculate_rebalancing(current_shares_input, options)
+
+            # 요약 메트릭
+            m1, m2, m3, m4 = st.columns(4)
+            m1.metric("총 자산", f"{total_val:,.0f}원")
+            m2.metric("리밸런싱 후 예상 자산", f"{after_total:,.0f}원")
+            diff_val = after_total - total_val
+            m3.metric("자투리 금액 차이", f"{diff_val:,.0f}원", delta_color="off")
+            m4.metric("예상 거래비용", f"{df['예상 거래비용(원)'].sum():,.0f}원")
+
+            st.markdown("---")
+
+            # 테이블 표시를 위한 포맷팅
+            display_df = df.copy()
+            display_df['현재가'] = display_df['현재가'].apply(lambda x: f"{x:,.0f}")
+            display_df['현재 비중'] = display_df['현재 비중'].apply(lambda x: f"{x:.1%}")
+            display_df['목표 비중'] = display_df['목표 비중'].apply(lambda x: f"{x:.1%}")
+            display_df['매수/매도'] = display_df['매수/매도'].apply(lambda x: f"{x:+d}")
+            display_df['현재 보유금액(원)'] = display_df['현재 보유금액(원)'].apply(lambda x: f"{x:,.0f}")
+            display_df['리밸런싱 후 금액(원)'] = display_df['리밸런싱 후 금액(원)'].apply(lambda x: f"{x:,.0f}")
+
+            # 예상 거래금액에 매수/매도 텍스트 추가
+            def format_trade_amount(row):
+                amount = row['예상 거래금액(원)']
+                action = "매수" if int(row['매수/매도']) > 0 else "매도" if int(row['매수/매도']) < 0 else "-"
+                if action == "-":
+                    return "-"
+                return f"{amount:,.0f} ({action})"
+
+            display_df['예상 거래금액(원)'] = df.apply(format_trade_amount, axis=1)
+
+            # 주요 컬럼만 선택하여 표시
+            cols_to_show = ['자산명', '현재 보유(주)', '현재 비중', '목표 수량(주)', '목표 비중', '매수/매도', '현재 보유금액(원)', '리밸런싱 후 금액(원)', '예상 거래금액(원)']
+
+            # 스타일링 적용
+            styled_df = display_df[cols_to_show].style.set_properties(**{
+                'background-color': '#131722',
+                'color': '#D1D4DC',
+                'border-color': '#2A2E39'
+            }).map(lambda x: 'color: #26a69a' if '매수' in str(x) else ('color: #ef5350' if '매도' in str(x) else ''), subset=['예상 거래금액(원)']) \
+              .map(lambda x: 'color: #26a69a' if '+' in str(x) else ('color: #ef5350' if '-' in str(x) else ''), subset=['매수/매도'])
+
+            st.dataframe(
+                styled_df,
+                use_container_width=True,
+                hide_index=True
+            )
+
+            # 차트 시각화
+            st.markdown("### 📈 비중 변화 시각화")
+            chart_data = df[['자산명', '현재 비중', '목표 비중']].set_index('자산명')
+            with script_profiler.section('chart building'):
                 st.bar_chart(chart_data)
+
+    def display_scenarios(self, current_shares_input, fee_rate=0.0, sell_tax_rate=0.0):
+        """가격 변화 x 목표 비중안 x 추가 납입금 조합별 리밸런싱 결과 비교"""
+        with st.expander("🔮 시나리오 분석 (What-if)"):
+            col1, col2, col3 = st.columns(3)
+            shock_text = col1.text_input("가격 변화율(%)", "-20, -10, 0, 10, 20", key="scenario_shocks")
+            contribution_text = col2.text_input("추가 납입금(원)", "0, 1000000, 3000000", key="scenario_contributions")
+            mode = col3.radio("방식", ['매수/매도', '매수만'], horizontal=True, key="scenario_mode")
+
+            weight_text = st.text_input(
+                "추가 비중안(%) - 자산 순서대로 쉼표로 구분 (" + ", ".join(info['name'] for info in self.assets.values()) + ")",
+                "", key="scenario_weights"
+            )
+            combine = st.checkbox("자산별 가격 변화의 모든 조합 계산", key="scenario_combine")
+
+            if st.button("시나리오 계산", key="scenario_run"):
+                st.session_state['pension_scenarios_requested'] = True
+
+            if not st.session_state.get('pension_scenarios_requested'):
+                return
+
+            try:
+                shocks = [float(x) / 100 for x in shock_text.split(',') if x.strip()]
+                contributions = [float(x) for x in contribution_text.split(',') if x.strip()]
+                custom_weights = [float(x) for x in weight_text.split(',') if x.strip()]
+            except ValueError:
+                st.error("숫자를 쉼표로 구분하여 입력하세요. (예: -10, 0, 10)")
+                return
+
+            if custom_weights and len(custom_weights) != len(self.tickers):
+                st.error(f"추가 비중안은 자산 수({len(self.tickers)}개)만큼 입력하세요.")
+                return
+
+            weight_sets = [[info['target_weight'] for info in self.assets.values()], [1] * len(self.tickers)]
+            weight_names = ['현재 목표', '동일 비중']
+            if custom_weights:
+                weight_sets.append(custom_weights)
+                weight_names.append('사용자 입력')
+
+            shock_count = len(shocks or [0]) ** len(self.tickers) if combine else len(shocks or [0])
+            scenario_count = shock_count * len(weight_sets) * len(contributions or [0])
+            if scenario_count > MAX_SCENARIOS:
+                st.error(f"시나리오가 너무 많습니다 ({scenario_count:,}개 > {MAX_SCENARIOS:,}개). "
+                         "가격 변화율이나 납입금 개수를 줄이거나 모든 조합 계산을 끄세요.")
+                return
+
+            prices = self.get_current_prices()
+            df = evaluate_scenarios(
+                prices=[prices.get(ticker, 0) for ticker in self.tickers],
+                current_shares=[current_shares_input.get(ticker, self.assets[ticker]['default_shares']) for ticker in self.tickers],
+                price_shocks=shock_grid(shocks or [0], len(self.tickers), combine=combine),
+                weight_sets=weight_sets,
+                contributions=contributions or [0],
+                mode='buy_only' if mode == '매수만' else 'full',
+                fee_rate=fee_rate,
+                sell_tax_rate=sell_tax_rate,
+                asset_names=[info['name'] for info in self.assets.values()],
+                weight_names=weight_names
+            )
+
+            sort_by = st.selectbox(
+                "정렬 기준",
+                ['리밸런싱 후 편차', '잔여 현금(원)', '거래비용(원)', '리밸런싱 후 자산(원)'],
+                key="scenario_sort"
+            )
+            df = df.sort_values(sort_by, ascending=sort_by != '리밸런싱 후 자산(원)', kind='stable')
+
+            st.caption(f"{len(df):,}개 시나리오")
+            st.dataframe(df, use_container_width=True, hide_index=True)
+            with script_profiler.section('chart building'):
+                st.scatter_chart(df, x='리밸런싱 후 편차', y='잔여 현금(원)', color='비중안')
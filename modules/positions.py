@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+
+
+def trade_signs(types):
+    """매수 = +1, 매도 = -1 (그 외는 +1). 고유값 단위로 판별하여 행 수와 무관하게 빠름"""
+    if isinstance(types.dtype, pd.CategoricalDtype):
+        # 범주형이면 이미 계산된 코드를 그대로 사용
+        codes, uniques = types.cat.codes.to_numpy(), types.cat.categories
+    else:
+        codes, uniques = pd.factorize(types.astype(str))
+
+    # 마지막 원소는 결측값(코드 -1)용
+    unique_signs = np.array([
+        1 if '매수' in str(value) else (-1 if '매도' in str(value) else 1)
+        for value in uniques
+    ] + [1], dtype=np.int8)
+
+    return unique_signs[codes]
+
+
+def compute_positions(df, account_col, name_col, qty_col, type_col=None):
+    """모든 계좌 x 종목의 보유 수량을 한 번의 groupby로 계산
+
+    Returns:
+        '계좌', '종목명', '보유수량', '거래건수' 컬럼을 가진 DataFrame
+    """
+    columns = ['계좌', '종목명', '보유수량', '거래건수']
+    if df.empty:
+        return pd.DataFrame(columns=columns)
+
+    qty = pd.to_numeric(df[qty_col], errors='coerce').to_numpy(dtype=float)
+    sign = trade_signs(df[type_col]) if type_col else 1
+
+    trades = pd.DataFrame({
+        '계좌': df[account_col].to_numpy() if account_col else '',
+        '종목명': df[name_col].astype(str).to_numpy(),
+        'signed_qty': qty * sign
+    })
+
+    # 수량이 숫자가 아닌 행은 제외
+    trades = trades[~np.isnan(qty)]
+
+    positions = trades.groupby(['계좌', '종목명'], sort=False).agg(
+        보유수량=('signed_qty', 'sum'),
+        거래건수=('signed_qty', 'size')
+    ).reset_index()
+
+    return positions[columns]
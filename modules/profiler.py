@@ -0,0 +1,343 @@
+import functools
+import html
+import itertools
+import os
+import sys
+import threading
+import time
+import zlib
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+import streamlit as st
+
+from modules.settings import PROFILE_DIR, PROFILE_INTERVAL
+
+# 실행 번호 (같은 초에 저장된 프로파일 파일 이름이 겹치지 않도록)
+_run_numbers = itertools.count(1)
+
+
+def _frame_label(code):
+    """코드 객체 -> 'qualname (파일:줄)'. folded 형식의 구분자(;)는 쓰지 않음"""
+    name = getattr(code, 'co_qualname', code.co_name)
+    return f"{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(';', ',')
+
+
+def _section_label(name):
+    return f"[{name}]"
+
+
+class ProfileRun:
+    """스크립트 스레드 하나를 일정 간격으로 샘플링하여 스택별 샘플 수와 구간별 실행 시간을 모으는 프로파일"""
+
+    def __init__(self, thread_id, root, interval=PROFILE_INTERVAL):
+        """
+        Args:
+            thread_id: 샘플링할 스레드 (스크립트 실행 스레드)
+            root: 스택을 자를 최상위 프레임 (app.py 모듈 프레임). 그 아래 Streamlit 실행기 프레임은 제외
+            interval: 샘플링 간격(초)
+        """
+        self.thread_id = thread_id
+        self.root = root
+        self.interval = interval
+
+        self.stacks = Counter()
+        self.sections = {}  # 구간 이름 -> [호출 수, 실제 소요 시간(초)]
+        self.active = ()    # 현재 실행 중인 구간 (중첩 순서). 샘플링 스레드가 읽으므로 튜플을 통째로 교체
+        self.started_at = datetime.now()
+        self.wall = 0.0
+        self.paths = {}
+        self.svg = None
+        self.error = None
+
+        self._labels = {}
+        self._started = time.perf_counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, name='profile-sampler', daemon=True)
+
+    @property
+    def total(self):
+        return sum(self.stacks.values())
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.wall = time.perf_counter() - self._started
+        self.root = None
+
+    def _stack(self, frame):
+        """현재 구간 + 최상위 프레임부터 frame까지의 라벨 (스크립트 밖이면 None)"""
+        labels = []
+        while frame is not None:
+            code = frame.f_code
+            label = self._labels.get(code)
+            if label is None:
+                label = self._labels[code] = _frame_label(code)
+            labels.append(label)
+            if frame is self.root:
+                return tuple(_section_label(name) for name in self.active) + tuple(reversed(labels))
+            frame = frame.f_back
+        return None
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                # 스크립트 스레드가 끝났으면(end_run 없이 중단된 실행) 최상위 프레임 참조를 놓고 종료
+                self.root = None
+                break
+            stack = self._stack(frame)
+            del frame
+            if stack is not None:
+                self.stacks[stack] += 1
+
+    def enter(self, name):
+        self.active = self.active + (name,)
+        return time.perf_counter()
+
+    def exit(self, name, started):
+        self.active = self.active[:-1]
+        stats = self.sections.setdefault(name, [0, 0.0])
+        stats[0] += 1
+        stats[1] += time.perf_counter() - started
+
+    def sections_frame(self):
+        """구간별 호출 수, 실제 소요 시간, 전체 샘플 중 비중"""
+        total = self.total or 1
+        samples = Counter()
+        for stack, count in self.stacks.items():
+            for label in set(label for label in stack if label.startswith('[')):
+                samples[label] += count
+
+        rows = [
+            {'SECTION': name, 'CALLS': calls, 'WALL(s)': round(seconds, 3),
+             'SAMPLES(%)': round(samples[_section_label(name)] / total * 100, 1)}
+            for name, (calls, seconds) in self.sections.items()
+        ]
+        frame = pd.DataFrame(rows, columns=['SECTION', 'CALLS', 'WALL(s)', 'SAMPLES(%)'])
+        return frame.sort_values('WALL(s)', ascending=False, ignore_index=True)
+
+    def top_functions(self, n=20, by='SELF'):
+        """샘플 수 상위 함수 (SELF: 스택 맨 위에 있던 샘플, TOTAL: 스택 어딘가에 있던 샘플)"""
+        total = self.total or 1
+        self_counts = Counter()
+        total_counts = Counter()
+        for stack, count in self.stacks.items():
+            frames = [label for label in stack if not label.startswith('[')]
+            if not frames:
+                continue
+            self_counts[frames[-1]] += count
+            for label in set(frames):
+                total_counts[label] += count
+
+        frame = pd.DataFrame({
+            'FUNCTION': list(total_counts),
+            'SELF': [self_counts[label] for label in total_counts],
+            'TOTAL': list(total_counts.values())
+        }, columns=['FUNCTION', 'SELF', 'TOTAL'])
+        frame['SELF(%)'] = (frame['SELF'] / total * 100).round(1)
+        frame['TOTAL(%)'] = (frame['TOTAL'] / total * 100).round(1)
+        # 샘플 수를 실제 실행 시간 비율로 환산한 추정 시간
+        frame['SELF(s)'] = (frame['SELF'] / total * self.wall).round(3)
+        return frame.sort_values([by, 'TOTAL'], ascending=False, ignore_index=True).head(n)
+
+    def folded(self):
+        """flamegraph.pl, speedscope 등에서 읽을 수 있는 folded stack 형식"""
+        return ''.join(f"{';'.join(stack)} {count}\n" for stack, count in self.stacks.most_common())
+
+    def report(self, n=20):
+        """구간별 시간과 상위 함수 표 (텍스트)"""
+        columns = ['FUNCTION', 'SELF', 'SELF(%)', 'TOTAL', 'TOTAL(%)', 'SELF(s)']
+        lines = [
+            f"started  {self.started_at:%Y-%m-%d %H:%M:%S}",
+            f"wall     {self.wall:.3f}s",
+            f"samples  {self.total} (interval {self.interval * 1000:.1f}ms)",
+            '',
+            '== sections ==',
+            self.sections_frame().to_string(index=False),
+            '',
+            f"== top {n} by self ==",
+            self.top_functions(n, 'SELF')[columns].to_string(index=False),
+            '',
+            f"== top {n} by total ==",
+            self.top_functions(n, 'TOTAL')[columns].to_string(index=False)
+        ]
+        return '\n'.join(lines) + '\n'
+
+    def flame_graph(self, width=1200, row_height=16):
+        """의존성 없이 그리는 SVG flame graph (아래가 최상위 프레임, 칸에 마우스를 올리면 샘플 수 표시)"""
+        root = {'count': 0, 'children': {}}
+        for stack, count in self.stacks.items():
+            root['count'] += count
+            node = root
+            for label in stack:
+                node = node['children'].setdefault(label, {'count': 0, 'children': {}})
+                node['count'] += count
+
+        total = root['count'] or 1
+        boxes = []
+
+        def layout(children, x, depth):
+            for label, node in sorted(children.items()):
+                w = node['count'] / total * width
+                if w >= 0.1:
+                    boxes.append((label, node['count'], x, depth, w))
+                    layout(node['children'], x, depth + 1)
+                x += w
+
+        layout(root['children'], 0.0, 1)
+        depth = max((box[3] for box in boxes), default=0) + 1
+        height = depth * row_height + 40
+
+        title = f"{self.started_at:%Y-%m-%d %H:%M:%S} | {self.wall:.3f}s | {self.total} samples"
+        parts = [
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+            f'font-family="monospace" font-size="11">',
+            f'<rect width="{width}" height="{height}" fill="#131722"/>',
+            f'<text x="6" y="18" fill="#D1D4DC" font-size="13">{html.escape(title)}</text>',
+            f'<g><title>all ({self.total} samples)</title>'
+            f'<rect x="0" y="{height - row_height}" width="{width}" height="{row_height - 1}" fill="#2A2E39"/>'
+            f'<text x="4" y="{height - 4}" fill="#D1D4DC">all</text></g>'
+        ]
+        for label, count, x, level, w in boxes:
+            y = height - (level + 1) * row_height
+            if label.startswith('['):
+                fill = '#2962FF'
+            else:
+                seed = zlib.crc32(label.encode('utf-8'))
+                fill = f"rgb({205 + seed % 50},{80 + (seed >> 8) % 120},{40 + (seed >> 16) % 40})"
+            tooltip = html.escape(f"{label} ({count} samples, {count / total:.1%})")
+            text = ''
+            if w > 30:
+                chars = int(w / 7)
+                shown = label if len(label) <= chars else label[:max(chars - 2, 1)] + '..'
+                text = f'<text x="{x + 3:.1f}" y="{y + row_height - 4}" fill="#131722">{html.escape(shown)}</text>'
+            parts.append(
+                f'<g><title>{tooltip}</title><rect x="{x:.1f}" y="{y}" width="{w:.1f}" '
+                f'height="{row_height - 1}" fill="{fill}"/>{text}</g>'
+            )
+        parts.append('</svg>')
+        return '\n'.join(parts) + '\n'
+
+    def save(self, directory, n=20):
+        """{directory}/{시각}-{번호}.folded/.svg/.txt로 저장하고 경로 반환"""
+        os.makedirs(directory, exist_ok=True)
+        stem = os.path.join(directory, f"{self.started_at:%Y%m%d-%H%M%S}-{os.getpid()}-{next(_run_numbers)}")
+        self.svg = self.flame_graph()
+        outputs = {'folded': self.folded(), 'svg': self.svg, 'txt': self.report(n)}
+
+        for extension, content in outputs.items():
+            path = f"{stem}.{extension}"
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(content)
+            self.paths[extension] = path
+        return self.paths
+
+
+class ScriptProfiler:
+    """app.py 실행 전체를 샘플링 프로파일러로 감싸고 주요 구간에 시간을 배분하는 프로파일러
+
+    스크립트 스레드별로 ProfileRun 하나를 두며, 프로파일링 중이 아닌 스레드의 구간 표시는 아무 일도 하지 않습니다.
+    """
+
+    def __init__(self, directory=PROFILE_DIR, interval=PROFILE_INTERVAL, top_n=20):
+        self.directory = directory
+        self.interval = interval
+        self.top_n = top_n
+        self._runs = {}  # 스레드 ID -> ProfileRun
+        self._lock = threading.Lock()
+
+    def begin_run(self, enabled):
+        """enabled이면 호출한 스크립트(모듈 프레임) 실행을 프로파일링 시작
+
+        Returns:
+            ProfileRun (프로파일링하지 않으면 None)
+        """
+        thread_id = threading.get_ident()
+        alive = {thread.ident for thread in threading.enumerate()}
+        with self._lock:
+            # 예외 등으로 end_run에 도달하지 못한 실행(같은 스레드의 이전 실행, 이미 끝난 스레드의 실행)은
+            # 저장하지 않고 정리하여 app.py 모듈 프레임 참조를 놓음
+            stale = [self._runs.pop(ident) for ident in list(self._runs)
+                     if ident == thread_id or ident not in alive]
+        for run in stale:
+            run.stop()
+        if not enabled:
+            return None
+
+        run = ProfileRun(thread_id, sys._getframe(1), self.interval)
+        with self._lock:
+            self._runs[thread_id] = run
+        run.start()
+        return run
+
+    def end_run(self):
+        """현재 스레드의 프로파일링을 끝내고 결과 파일 저장
+
+        Returns:
+            ProfileRun (프로파일링 중이 아니었으면 None)
+        """
+        with self._lock:
+            run = self._runs.pop(threading.get_ident(), None)
+        if run is None:
+            return None
+
+        run.stop()
+        try:
+            run.save(self.directory, self.top_n)
+        except OSError as e:
+            run.error = e
+        return run
+
+    @contextmanager
+    def section(self, name):
+        """프로파일 구간 표시 (샘플 스택 맨 아래에 [name]으로 붙고 실제 소요 시간도 기록)"""
+        run = self._runs.get(threading.get_ident())
+        if run is None:
+            yield
+            return
+
+        started = run.enter(name)
+        try:
+            yield
+        finally:
+            run.exit(name, started)
+
+    def profiled(self, name):
+        """함수 전체를 프로파일 구간으로 표시하는 데코레이터"""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.section(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def display_panel(self, run):
+        """사이드바 프로파일 결과 패널 (프로파일링한 실행에서만 표시)"""
+        if run is None:
+            return
+
+        with st.expander("PROFILE"):
+            st.caption(f"{run.wall:.2f}s | {run.total} samples ({run.interval * 1000:.0f}ms)")
+            if run.error is not None:
+                st.warning(f"PROFILE SAVE ERROR: {run.error}")
+            else:
+                st.caption(f"SAVED: {run.paths['svg']}")
+
+            st.dataframe(run.sections_frame(), hide_index=True, use_container_width=True)
+            st.dataframe(run.top_functions(10)[['FUNCTION', 'SELF(%)', 'TOTAL(%)']],
+                         hide_index=True, use_container_width=True)
+
+            if run.svg is not None:
+                st.download_button("FLAME GRAPH", run.svg, file_name=os.path.basename(run.paths['svg']),
+                                   mime="image/svg+xml", key="profile_flame_graph")
+
+
+# 프로세스 공용 프로파일러
+script_profiler = ScriptProfiler()
@@ -0,0 +1,254 @@
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import re
+import threading
+
+from modules.lazy_import import lazy_import
+from modules.metrics import upstream_metrics
+from modules.settings import PROVIDER_MODE, RECORDINGS_DIR, REPLAY_STRICT
+
+# 공급자 라이브러리는 실제로 호출할 때 import (재생/고정 데이터 공급자는 import하지 않음)
+fdr = lazy_import('FinanceDataReader')
+gspread = lazy_import('gspread')
+stock = lazy_import('pykrx.stock')
+yf = lazy_import('yfinance')
+service_account = lazy_import('google.oauth2.service_account')
+
+MODES = ('live', 'record', 'replay')
+
+# 재생 모드에서 값이 달라도 같은 요청으로 대체할 수 있는 날짜 인자
+DATE_ARGS = ('date', 'start', 'end')
+
+# yfinance 컬럼명 <-> 저장소 컬럼명 (해외 주식/환율 공용)
+YF_COLUMNS = {'Open': 'open', 'High': 'high', 'Low': 'low', 'Close': 'close', 'Volume': 'volume'}
+
+GSPREAD_SCOPES = [
+    "https://www.googleapis.com/auth/spreadsheets.readonly",
+    "https://www.googleapis.com/auth/drive.readonly"
+]
+
+
+class ReplayMissError(LookupError):
+    """재생 모드에서 저장된 응답이 없는 요청"""
+
+
+class LiveProvider:
+    """실제 API(pykrx, FinanceDataReader, yfinance, 구글 시트)를 호출하는 시세/거래내역 공급자
+
+    응답은 각 라이브러리가 돌려주는 형식 그대로 반환하며, 컬럼 변환은 호출하는 쪽에서 처리합니다.
+    """
+
+    mode = 'live'
+
+    def __init__(self):
+        # (클라이언트, 스프레드시트 ID, 시트 이름) -> 워크시트 (시트를 여는 요청은 한 번만)
+        self._worksheets = {}
+        self._lock = threading.Lock()
+
+    # 국내 ETF 시세 (pykrx)
+    def etf_board(self, date):
+        """해당 거래일(YYYYMMDD)의 ETF 전 종목 OHLCV"""
+        return stock.get_etf_ohlcv_by_ticker(date)
+
+    def etf_ohlcv(self, ticker, start, end):
+        """ETF 한 종목의 [start, end] 구간 일봉 (YYYYMMDD)"""
+        return stock.get_etf_ohlcv_by_date(start, end, ticker)
+
+    # 국내 종목/지수 일봉 (FinanceDataReader)
+    def fdr_ohlcv(self, symbol, start, end=None):
+        """FinanceDataReader 일봉"""
+        return fdr.DataReader(symbol, start, end)
+
+    # 해외 주식/지수/환율 (yfinance)
+    def yf_history(self, symbol, **kwargs):
+        """yf.Ticker(symbol).history(**kwargs)"""
+        return yf.Ticker(symbol).history(**kwargs)
+
+    def yf_download(self, tickers, **kwargs):
+        """여러 종목 일괄 조회 yf.download(tickers, **kwargs)"""
+        return yf.download(tickers, **kwargs)
+
+    def yf_info(self, symbol):
+        """종목 기본 정보 (yf.Ticker(symbol).info)"""
+        return yf.Ticker(symbol).info
+
+    # 거래내역 (구글 시트)
+    def ledger_client(self, credentials_json):
+        """서비스 계정으로 인증한 gspread 클라이언트"""
+        credentials = service_account.Credentials.from_service_account_info(json.loads(credentials_json), scopes=GSPREAD_SCOPES)
+        return gspread.authorize(credentials)
+
+    def _worksheet(self, gc, spreadsheet_id, sheet_name):
+        key = (id(gc), spreadsheet_id, sheet_name)
+        with self._lock:
+            worksheet = self._worksheets.get(key)
+        if worksheet is None:
+            worksheet = gc.open_by_key(spreadsheet_id).worksheet(sheet_name)
+            with self._lock:
+                self._worksheets[key] = worksheet
+        return worksheet
+
+    def ledger_modified_time(self, gc, spreadsheet_id, sheet_name):
+        """스프레드시트 수정 시각 (Drive API modifiedTime)"""
+        spreadsheet = self._worksheet(gc, spreadsheet_id, sheet_name).spreadsheet
+        # gspread 6.x는 메서드, 5.x는 프로퍼티로 제공
+        getter = getattr(spreadsheet, 'get_lastUpdateTime', None)
+        if getter is not None:
+            return getter()
+        return spreadsheet.lastUpdateTime
+
+    def ledger_values(self, gc, spreadsheet_id, sheet_name):
+        """시트 전체 값 (헤더 포함 행 목록)"""
+        return self._worksheet(gc, spreadsheet_id, sheet_name).get_all_values()
+
+    def ledger_ranges(self, gc, spreadsheet_id, sheet_name, ranges):
+        """A1 표기 여러 구간의 값을 한 번에 조회"""
+        return self._worksheet(gc, spreadsheet_id, sheet_name).batch_get(ranges)
+
+
+def _digest(value):
+    return hashlib.sha1(repr(value).encode('utf-8')).hexdigest()[:16]
+
+
+def _recorded(name, skip=0):
+    """LiveProvider 메서드를 응답 저장/재생 메서드로 감쌈
+
+    Args:
+        name: LiveProvider 메서드 이름
+        skip: 요청 키에서 제외할 앞쪽 인자 수 (인증 클라이언트 등)
+    """
+    signature = inspect.signature(getattr(LiveProvider, name))
+    skipped = set(list(signature.parameters)[1:1 + skip])
+
+    def method(self, *args, **kwargs):
+        # 위치/키워드 인자를 이름 붙은 요청으로 통일 (예: fdr_ohlcv('KS11', s)와 fdr_ohlcv('KS11', s, None)은 같은 요청)
+        bound = signature.bind(self, *args, **kwargs)
+        bound.apply_defaults()
+        request = {key: value for key, value in bound.arguments.items() if key != 'self' and key not in skipped}
+        request.update(request.pop('kwargs', {}))
+        return self._call(name, request, lambda: getattr(self.live, name)(*args, **kwargs))
+
+    method.__name__ = name
+    method.__doc__ = getattr(LiveProvider, name).__doc__
+    return method
+
+
+class RecordReplayProvider:
+    """응답을 디스크에 저장(record)하거나 저장된 응답만으로 동작(replay)하는 공급자
+
+    요청(메서드, 인자)마다 {directory}/{메서드}/{날짜 외 인자}/{날짜}-{요청}.pkl 파일 하나에 응답을 저장합니다.
+    재생 모드에서 같은 요청이 없으면 날짜 인자(date, start, end)만 다른 요청 중 가장 최근 날짜의 응답을 사용하고
+    (예: 다른 날의 ETF 시세판), strict=True이거나 그마저 없으면 ReplayMissError를 발생시킵니다.
+    종목, period 등 다른 인자가 다르거나 날짜 인자의 종류가 다른 응답(start 조회 vs period 조회)은 대체하지 않습니다.
+    """
+
+    def __init__(self, mode, directory, live=None, strict=False):
+        """
+        Args:
+            mode: 'record' 또는 'replay'
+            directory: 응답을 저장할 디렉터리
+            live: 저장 모드에서 실제로 호출할 공급자 (기본값: LiveProvider)
+            strict: True이면 재생 모드에서 요청이 정확히 일치할 때만 응답
+        """
+        if mode not in ('record', 'replay'):
+            raise ValueError(f"지원하지 않는 모드입니다: {mode}")
+
+        self.mode = mode
+        self.directory = directory
+        self.live = live if live is not None else LiveProvider()
+        self.strict = strict
+
+    def _path(self, name, request):
+        dates = sorted((key, value) for key, value in request.items() if key in DATE_ARGS)
+        # 날짜 외 인자와 날짜 인자의 이름이 같은 요청끼리 한 디렉터리에 저장
+        shape = (sorted((key, repr(value)) for key, value in request.items() if key not in DATE_ARGS),
+                 [key for key, _ in dates])
+        # 파일 이름 앞에 날짜 값을 붙여 이름 순서가 날짜 순서가 되도록 함
+        stamp = '_'.join(re.sub(r'\W', '', str(value)) for _, value in dates) or 'request'
+        request_key = sorted((key, repr(value)) for key, value in request.items())
+        return os.path.join(self.directory, name, _digest(shape), f"{stamp}-{_digest(request_key)}.pkl")
+
+    def _call(self, name, request, fetch):
+        path = self._path(name, request)
+
+        if self.mode == 'record':
+            value = fetch()
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # 다른 스레드가 읽는 중에도 깨진 파일이 보이지 않도록 임시 파일에 쓴 뒤 교체
+            temp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(temp_path, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, path)
+            return value
+
+        if not os.path.exists(path) and not self.strict:
+            path = self._latest(os.path.dirname(path)) or path
+
+        try:
+            with open(path, 'rb') as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            raise ReplayMissError(f"저장된 응답이 없습니다: {name}({request})") from None
+
+    @staticmethod
+    def _latest(directory):
+        """날짜만 다른 요청의 응답 중 가장 최근 날짜의 파일 (같은 날짜면 나중에 저장된 파일, 없으면 None)"""
+        try:
+            paths = [os.path.join(directory, name) for name in os.listdir(directory) if name.endswith('.pkl')]
+        except FileNotFoundError:
+            return None
+        return max(paths, key=lambda path: (os.path.basename(path).rsplit('-', 1)[0], os.path.getmtime(path)),
+                   default=None)
+
+    def ledger_client(self, credentials_json):
+        """저장 모드는 실제 인증, 재생 모드는 인증 없이 자리표시 클라이언트"""
+        if self.mode == 'replay':
+            return 'replay'
+        return self.live.ledger_client(credentials_json)
+
+    etf_board = _recorded('etf_board')
+    etf_ohlcv = _recorded('etf_ohlcv')
+    fdr_ohlcv = _recorded('fdr_ohlcv')
+    yf_history = _recorded('yf_history')
+    yf_download = _recorded('yf_download')
+    yf_info = _recorded('yf_info')
+    ledger_modified_time = _recorded('ledger_modified_time', skip=1)
+    ledger_values = _recorded('ledger_values', skip=1)
+    ledger_ranges = _recorded('ledger_ranges', skip=1)
+
+
+def create_provider(mode='live', directory=RECORDINGS_DIR, strict=False):
+    """모드에 맞는 공급자 생성
+
+    Args:
+        mode: 'live', 'record' 또는 'replay'
+    """
+    if mode == 'live':
+        return LiveProvider()
+    if mode in MODES:
+        return RecordReplayProvider(mode, directory, strict=strict)
+    raise ValueError(f"지원하지 않는 공급자 모드입니다: {mode} (가능한 값: {', '.join(MODES)})")
+
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def get_provider():
+    """프로세스 공용 공급자 (처음 호출될 때 STOCK_DASHBOARD_PROVIDER 설정으로 생성, 모든 호출을 계측)"""
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            _provider = upstream_metrics.instrument(create_provider(PROVIDER_MODE, RECORDINGS_DIR, REPLAY_STRICT))
+        return _provider
+
+
+def set_provider(provider):
+    """프로세스 공용 공급자 교체 (계측 래퍼를 씌워 저장하고 이전 공급자 반환)"""
+    global _provider
+    with _provider_lock:
+        previous, _provider = _provider, upstream_metrics.instrument(provider)
+        return previous
@@ -0,0 +1,130 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from modules.metrics import upstream_metrics
+
+
+class QuoteCache:
+    """(시장, 티커, 거래일) 단위의 프로세스 공용 시세 캐시 (TTL + LRU)"""
+
+    def __init__(self, ttl=60, maxsize=1024):
+        """
+        Args:
+            ttl: 캐시 유지 시간(초)
+            maxsize: 최대 보관 항목 수 (초과 시 가장 오래 사용하지 않은 항목부터 제거)
+        """
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+    def configure(self, ttl=None, maxsize=None):
+        """TTL 및 최대 크기 변경"""
+        with self._lock:
+            if ttl is not None:
+                self.ttl = ttl
+            if maxsize is not None:
+                self.maxsize = maxsize
+                self._evict()
+
+    def _evict(self):
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def _lookup(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        stored_at, value = entry
+        if time.monotonic() - stored_at > self.ttl:
+            del self._entries[key]
+            return False, None
+        self._entries.move_to_end(key)
+        return True, value
+
+    def get(self, market, ticker, trading_date):
+        """캐시된 값 반환 (없거나 만료되면 None)"""
+        with self._lock:
+            found, value = self._lookup((market, ticker, trading_date))
+            return value if found else None
+
+    def set(self, market, ticker, trading_date, value):
+        """값 저장"""
+        with self._lock:
+            key = (market, ticker, trading_date)
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            self._evict()
+
+    def get_or_fetch(self, market, ticker, trading_date, fetch):
+        """캐시에 있으면 반환하고, 없으면 fetch()를 한 번만 호출해 저장합니다.
+
+        여러 세션이 같은 키를 동시에 요청해도 upstream 호출은 한 번만 일어납니다.
+        fetch()에서 발생한 예외는 캐시하지 않고 그대로 전달합니다.
+        """
+        key = (market, ticker, trading_date)
+
+        with self._lock:
+            found, value = self._lookup(key)
+            if found:
+                self.hits += 1
+        if found:
+            upstream_metrics.record_cache('quote', market, ticker, True)
+            return value
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            # 대기하는 동안 다른 세션이 채웠는지 다시 확인
+            with self._lock:
+                found, value = self._lookup(key)
+                if found:
+                    self.hits += 1
+                else:
+                    self.misses += 1
+
+            upstream_metrics.record_cache('quote', market, ticker, found)
+            if found:
+                return value
+
+            try:
+                value = fetch()
+                self.set(market, ticker, trading_date, value)
+                return value
+            finally:
+                with self._lock:
+                    self._key_locks.pop(key, None)
+
+    def clear(self):
+        """전체 캐시 및 통계 초기화"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """캐시 적중/미적중 통계 반환"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total > 0 else 0,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl
+            }
+
+
+# 프로세스 전체에서 공유하는 캐시 인스턴스 (모든 브라우저 세션 공용)
+# 환경변수 QUOTE_CACHE_TTL, QUOTE_CACHE_MAXSIZE로 설정할 수 있습니다.
+quote_cache = QuoteCache(
+    ttl=float(os.environ.get('QUOTE_CACHE_TTL', 60)),
+    maxsize=int(os.environ.get('QUOTE_CACHE_MAXSIZE', 1024))
+)
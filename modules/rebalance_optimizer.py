@@ -0,0 +1,138 @@
+import numpy as np
+
+# 최적화 모드: 'full' = 매수/매도 모두 허용, 'buy_only' = 보유 수량을 줄이지 않고 현금(추가 납입금)으로만 매수
+MODES = ('full', 'buy_only')
+
+
+def _trade_amounts(shares, current_shares, prices):
+    """(매수 금액, 매도 금액) 자산별 배열"""
+    diff = shares - current_shares
+    return np.clip(diff, 0, None) * prices, np.clip(-diff, 0, None) * prices
+
+
+def _cash_after(shares, current_shares, prices, cash, fee_rate, sell_tax_rate):
+    """매매 후 남는 현금 (수수료/세금 차감)"""
+    buys, sells = _trade_amounts(shares, current_shares, prices)
+    return cash - buys.sum() * (1 + fee_rate) + sells.sum() * (1 - fee_rate - sell_tax_rate)
+
+
+def floor_shares(prices, current_shares, target_values, cash, mode, fee_rate=0.0, free=True):
+    """'full'은 목표 수량 내림, 'buy_only'는 부족분에 비례해 현금을 나눈 뒤 내림
+
+    마지막 축이 자산이며, 앞쪽 축(시나리오 등)은 브로드캐스팅으로 한 번에 계산합니다.
+    cash는 자산 축을 제외한 모양이어야 합니다.
+    """
+    safe_prices = np.where(prices > 0, prices, 1)
+
+    if mode == 'buy_only':
+        shortfall = np.where(free, np.clip(target_values - current_shares * prices, 0, None), 0)
+        total_shortfall = shortfall.sum(axis=-1)
+        budget = np.asarray(cash, dtype=float) / (1 + fee_rate)
+        scale = np.where(total_shortfall > budget, budget / np.where(total_shortfall > 0, total_shortfall, 1), 1)
+        shares = current_shares + np.floor(shortfall * scale[..., np.newaxis] / safe_prices).astype(np.int64)
+    else:
+        shares = np.floor(target_values / safe_prices).astype(np.int64)
+
+    return np.where(free, shares, current_shares)
+
+
+def _solve(prices, current_shares, target_values, cash, mode, fee_rate, sell_tax_rate, free, max_steps):
+    """free 자산만 조정하여 목표 금액과의 편차 제곱합을 최소화하는 정수 수량 (탐욕적 1주 단위 이동)"""
+    lower = current_shares if mode == 'buy_only' else np.zeros_like(current_shares)
+    shares = floor_shares(prices, current_shares, target_values, cash, mode, fee_rate, free)
+
+    buy_cost = prices * (1 + fee_rate)
+    sell_proceeds = prices * (1 - fee_rate - sell_tax_rate)
+    remaining = _cash_after(shares, current_shares, prices, cash, fee_rate, sell_tax_rate)
+
+    for _ in range(max_steps):
+        diff = shares - current_shares
+        gap = shares * prices - target_values
+
+        # 1주 추가/제거 시 편차 제곱합 변화량과 현금 변화량 (모든 자산을 한 번에 계산)
+        add_delta = prices * (2 * gap + prices)
+        remove_delta = prices * (prices - 2 * gap)
+        add_cash = -np.where(diff >= 0, buy_cost, sell_proceeds)
+        remove_cash = np.where(diff > 0, buy_cost, sell_proceeds)
+
+        can_remove = free & (shares > lower)
+
+        if remaining < 0:
+            # 현금이 부족하면 편차가 가장 적게 늘어나는 자산부터 1주씩 줄임
+            candidates = np.where(can_remove & (remove_cash > 0), remove_delta, np.inf)
+            i = int(np.argmin(candidates))
+            if not np.isfinite(candidates[i]):
+                break
+            shares[i] -= 1
+            remaining += remove_cash[i]
+            continue
+
+        add_delta = np.where(free & (remaining + add_cash >= 0), add_delta, np.inf)
+        remove_delta = np.where(can_remove, remove_delta, np.inf)
+
+        i_add = int(np.argmin(add_delta))
+        i_remove = int(np.argmin(remove_delta))
+
+        if min(add_delta[i_add], remove_delta[i_remove]) >= 0:
+            break
+
+        if add_delta[i_add] <= remove_delta[i_remove]:
+            shares[i_add] += 1
+            remaining += add_cash[i_add]
+        else:
+            shares[i_remove] -= 1
+            remaining += remove_cash[i_remove]
+
+    return shares
+
+
+def optimize_shares(prices, current_shares, target_weights, cash=0.0, mode='full',
+                    min_trade_value=0.0, fee_rate=0.0, sell_tax_rate=0.0, max_steps=100000):
+    """목표 비중과의 편차가 최소가 되는 정수 목표 수량 계산
+
+    Args:
+        prices: 자산별 현재가
+        current_shares: 자산별 현재 보유 수량
+        target_weights: 자산별 목표 비중 (합이 1이 아니면 정규화)
+        cash: 매매에 사용할 수 있는 현금 (추가 납입금 포함)
+        mode: 'full' (매수/매도) 또는 'buy_only' (매수만)
+        min_trade_value: 이 금액 미만의 매매는 하지 않음
+        fee_rate: 매수/매도 수수료율
+        sell_tax_rate: 매도 시 세율
+        max_steps: 1주 단위 조정 최대 횟수
+
+    Returns:
+        {'shares', 'cash_left', 'costs', 'deviation'} (shares/costs는 자산별 배열, deviation은 비중 편차 절대값 합)
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown rebalancing mode: {mode}")
+
+    prices = np.asarray(prices, dtype=float)
+    current_shares = np.asarray(current_shares, dtype=np.int64)
+    weights = np.asarray(target_weights, dtype=float)
+    weights = weights / weights.sum() if weights.sum() > 0 else weights
+    cash = max(float(cash), 0.0)
+
+    total_value = current_shares @ prices + cash
+    target_values = weights * total_value
+
+    # 가격이 없는 자산은 매매하지 않음. 최소 거래금액 미만 매매가 나온 자산도 고정 후 다시 계산
+    free = prices > 0
+    for _ in range(len(prices) + 1):
+        shares = _solve(prices, current_shares, target_values, cash, mode, fee_rate, sell_tax_rate, free, max_steps)
+        trade_values = np.abs(shares - current_shares) * prices
+        small = free & (trade_values > 0) & (trade_values < min_trade_value)
+        if not small.any():
+            break
+        free = free & ~small
+
+    buys, sells = _trade_amounts(shares, current_shares, prices)
+    costs = buys * fee_rate + sells * (fee_rate + sell_tax_rate)
+    after_values = shares * prices
+
+    return {
+        'shares': shares,
+        'cash_left': _cash_after(shares, current_shares, prices, cash, fee_rate, sell_tax_rate),
+        'costs': costs,
+        'deviation': float(np.abs(after_values / total_value - weights).sum()) if total_value > 0 else 0.0
+    }
@@ -0,0 +1,117 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from modules.rebalance_optimizer import floor_shares
+
+# 한 번에 계산/표시할 최대 시나리오 수 (표와 차트로 브라우저에 보내는 행 수)
+MAX_SCENARIOS = 20000
+
+
+def shock_grid(levels, n_assets, combine=False, max_rows=MAX_SCENARIOS):
+    """가격 충격 행렬 (시나리오 수, 자산 수)
+
+    Args:
+        levels: 수익률 목록 (예: [-0.1, 0, 0.1])
+        n_assets: 자산 수
+        combine: False이면 모든 자산에 같은 충격, True이면 자산별 충격의 모든 조합
+        max_rows: 조합 수 상한 (넘으면 ValueError)
+    """
+    levels = np.asarray(levels, dtype=float)
+    if combine:
+        if len(levels) ** n_assets > max_rows:
+            raise ValueError(f"가격 변화 조합이 너무 많습니다: {len(levels)}^{n_assets} > {max_rows:,}")
+        return np.array(list(itertools.product(levels, repeat=n_assets)), dtype=float)
+    return np.repeat(levels[:, np.newaxis], n_assets, axis=1)
+
+
+def evaluate_scenarios(prices, current_shares, price_shocks, weight_sets, contributions,
+                       mode='full', fee_rate=0.0, sell_tax_rate=0.0, asset_names=None, weight_names=None):
+    """가격 충격 x 목표 비중안 x 납입금의 모든 조합에 대한 리밸런싱 결과를 배열 연산으로 한 번에 계산
+
+    Args:
+        prices: 자산별 현재가 (n,)
+        current_shares: 자산별 현재 보유 수량 (n,)
+        price_shocks: 자산별 가격 변화율 행렬 (S, n)
+        weight_sets: 목표 비중안 행렬 (W, n), 각 행은 합이 1이 되도록 정규화
+        contributions: 추가 납입금 목록 (C,)
+        mode: 'full' (목표 수량 내림) 또는 'buy_only' (납입금으로만 매수)
+        fee_rate: 매수/매도 수수료율
+        sell_tax_rate: 매도 시 세율
+        asset_names: 자산 이름 목록 (자산별 매매 수량 컬럼명에 사용)
+        weight_names: 비중안 이름 목록
+
+    Returns:
+        시나리오 하나가 한 행인 DataFrame (S x W x C 행)
+    """
+    prices = np.asarray(prices, dtype=float)
+    current_shares = np.asarray(current_shares, dtype=np.int64)
+    shocks = np.atleast_2d(np.asarray(price_shocks, dtype=float))
+    weights = np.atleast_2d(np.asarray(weight_sets, dtype=float))
+    weights = weights / np.where(weights.sum(axis=1, keepdims=True) > 0, weights.sum(axis=1, keepdims=True), 1)
+    contributions = np.atleast_1d(np.asarray(contributions, dtype=float))
+
+    n = len(prices)
+    asset_names = list(asset_names) if asset_names is not None else [str(i) for i in range(n)]
+    weight_names = list(weight_names) if weight_names is not None else [f"안 {i + 1}" for i in range(len(weights))]
+
+    # 축: (충격 S, 비중안 W, 납입금 C, 자산 n)
+    P = (prices * (1 + shocks))[:, np.newaxis, np.newaxis, :]
+    w = weights[np.newaxis, :, np.newaxis, :]
+    cash = contributions[np.newaxis, np.newaxis, :]
+
+    S, W, C = len(shocks), len(weights), len(contributions)
+    holdings_value = (current_shares * P).sum(axis=-1)
+    total_value = np.broadcast_to(holdings_value + cash, (S, W, C))
+
+    def rebalance(budget):
+        shares = floor_shares(P, current_shares, w * budget[..., np.newaxis], cash, mode, fee_rate, free=P > 0)
+        diff = shares - current_shares
+        buys = (np.clip(diff, 0, None) * P).sum(axis=-1)
+        sells = (np.clip(-diff, 0, None) * P).sum(axis=-1)
+        return shares, buys, sells, buys * fee_rate + sells * (fee_rate + sell_tax_rate)
+
+    shares, buys, sells, costs = rebalance(total_value)
+    if mode == 'full':
+        # 목표 금액을 정할 때 거래비용만큼 남겨 둠. 비용은 매매량에 따라 바뀌므로
+        # 남겨 둔 금액이 실제 비용 이상이 될 때까지(잔여 현금 >= 0) 늘려 가며 다시 계산
+        reserve = np.zeros_like(total_value)
+        for _ in range(20):
+            if (costs <= reserve + 1e-6).all():
+                break
+            reserve = np.maximum(reserve, costs)
+            shares, buys, sells, costs = rebalance(total_value - reserve)
+    diff = shares - current_shares
+
+    after_values = shares * P
+    after_total = after_values.sum(axis=-1)
+
+    safe_total = np.where(total_value > 0, total_value, 1)
+    before_deviation = np.abs(current_shares * P / safe_total[..., np.newaxis] - w).sum(axis=-1)
+    after_deviation = np.abs(after_values / safe_total[..., np.newaxis] - w).sum(axis=-1)
+
+    # 행 우선 순서로 펼쳐 표 구성 (시나리오 번호는 충격 -> 비중안 -> 납입금 순)
+    s_idx, w_idx, c_idx = (axis.ravel() for axis in np.indices((S, W, C)))
+
+    table = {
+        '시나리오': np.arange(S * W * C),
+        '평균 가격 변화': shocks.mean(axis=1)[s_idx],
+        '비중안': np.asarray(weight_names, dtype=object)[w_idx],
+        '추가 납입금(원)': contributions[c_idx],
+        '총 자산(원)': total_value.ravel(),
+        '리밸런싱 후 자산(원)': after_total.ravel(),
+        '잔여 현금(원)': (total_value - after_total - costs).ravel(),
+        '매수 금액(원)': buys.ravel(),
+        '매도 금액(원)': sells.ravel(),
+        '거래비용(원)': costs.ravel(),
+        '리밸런싱 전 편차': before_deviation.ravel(),
+        '리밸런싱 후 편차': after_deviation.ravel()
+    }
+    # 자산별 충격과 매매 수량
+    flat_diff = diff.reshape(-1, n)
+    for i, name in enumerate(asset_names):
+        table[f"{name} 가격 변화"] = shocks[s_idx, i]
+        table[f"{name} 매매(주)"] = flat_diff[:, i]
+
+    return pd.DataFrame(table)
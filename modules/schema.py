@@ -0,0 +1,91 @@
+from functools import lru_cache
+
+import pandas as pd
+
+# 컬럼 역할별 컬럼명 키워드
+ACCOUNT_KEYWORDS = ['계좌', '증권사', 'Account', 'account', '자산']
+NAME_KEYWORDS = ['종목명', '종목']
+CODE_KEYWORDS = ['종목코드', '코드', '티커', 'Ticker', 'ticker', 'Symbol', 'symbol']
+QTY_KEYWORDS = ['수량', '주수']
+TYPE_KEYWORDS = ['구분', '거래'] # 매수/매도
+PRICE_KEYWORDS = ['단가', '가격', 'Price', 'price']
+DATE_KEYWORDS = ['날짜', '일자', 'Date', 'date']
+
+
+def _first_match(columns, keywords, exclude=()):
+    for col in columns:
+        if col not in exclude and any(keyword in col for keyword in keywords):
+            return col
+    return None
+
+
+def _last_match(columns, keywords, exclude=()):
+    return _first_match(list(reversed(columns)), keywords, exclude)
+
+
+class LedgerSchema:
+    """거래내역 컬럼의 역할(계좌, 종목명, 종목코드, 수량, 단가, 구분, 날짜)과 자료형 정의
+
+    컬럼 역할은 헤더가 바뀔 때만 한 번 판별합니다 (get_schema 참고).
+    """
+
+    def __init__(self, columns):
+        """
+        Args:
+            columns: 거래내역 헤더 (컬럼명 목록)
+        """
+        self.columns = list(columns)
+
+        # 계좌는 처음 일치하는 컬럼, 종목명/수량/구분은 마지막으로 일치하는 컬럼 (기존 판별 순서 기준)
+        # 기존 규칙과 달리 날짜 컬럼은 구분 후보에서, 종목코드 컬럼은 종목명 후보에서 제외
+        # ('거래일자'가 매수/매도 구분으로, '종목코드'가 종목명으로 잡히지 않도록)
+        self.date = _first_match(self.columns, DATE_KEYWORDS)
+        self.account = _first_match(self.columns, ACCOUNT_KEYWORDS)
+        self.code = _first_match(self.columns, CODE_KEYWORDS)
+        self.name = _last_match(self.columns, NAME_KEYWORDS, exclude=(self.code,))
+        self.qty = _last_match(self.columns, QTY_KEYWORDS)
+        self.type = _last_match(self.columns, TYPE_KEYWORDS, exclude=(self.date,))
+        self.price = _first_match(self.columns, PRICE_KEYWORDS, exclude=(self.qty,))
+
+        self.numeric = [col for col in (self.qty, self.price) if col]
+        self.categorical = [col for col in dict.fromkeys((self.account, self.name, self.code, self.type)) if col]
+
+    def _convert(self, col, values):
+        """컬럼 하나를 역할에 맞는 자료형으로 변환"""
+        series = pd.Series(values, dtype=object)
+
+        if col == self.date:
+            return pd.to_datetime(series, errors='coerce')
+        if col in self.numeric:
+            # '1,000' 같은 천 단위 구분 기호는 제거 후 숫자로 변환
+            return pd.to_numeric(series.astype(str).str.replace(',', '', regex=False), errors='coerce')
+        if col == self.code:
+            # 숫자로 변환되며 사라진 국내 종목코드의 앞자리 0 복원 (예: 69500 -> '069500')
+            codes = series.astype(str)
+            return codes.where(~codes.str.isdigit(), codes.str.zfill(6)).astype('category')
+        if col in self.categorical:
+            return series.astype(str).astype('category')
+        return series.infer_objects()
+
+    def build_frame(self, rows):
+        """시트 행 목록을 컬럼 단위로 변환하여 DataFrame 생성"""
+        width = len(self.columns)
+        columns = list(zip(*rows)) if rows else [()] * width
+
+        # 헤더에 같은 이름(빈 칸 등)이 있을 수 있으므로 위치로 만든 뒤 컬럼명 지정
+        df = pd.DataFrame({
+            i: self._convert(col, values)
+            for i, (col, values) in enumerate(zip(self.columns, columns))
+        })
+        df.columns = self.columns
+        return df
+
+
+@lru_cache(maxsize=32)
+def _get_schema(columns):
+    return LedgerSchema(columns)
+
+
+def get_schema(columns):
+    """헤더별로 한 번만 판별한 LedgerSchema 반환"""
+    return _get_schema(tuple(columns))
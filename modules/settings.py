@@ -0,0 +1,35 @@
+import os
+
+# 로컬 캐시 파일(거래일 달력 등)을 저장할 디렉터리
+CACHE_DIR = os.environ.get('STOCK_DASHBOARD_CACHE_DIR', '.cache')
+
+
+def cache_path(*parts):
+    """캐시 디렉터리 아래 경로를 반환 (상위 디렉터리는 자동 생성)"""
+    path = os.path.join(CACHE_DIR, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+
+# 시세/거래내역 공급자: live(실제 API), record(실제 API 응답을 저장), replay(저장된 응답만 사용)
+PROVIDER_MODE = os.environ.get('STOCK_DASHBOARD_PROVIDER', 'live')
+
+# record/replay 모드에서 응답을 저장하는 디렉터리
+RECORDINGS_DIR = os.environ.get('STOCK_DASHBOARD_RECORDINGS', os.path.join(CACHE_DIR, 'recordings'))
+
+# replay 모드에서 요청이 정확히 일치하는 응답만 사용할지 여부
+REPLAY_STRICT = os.environ.get('STOCK_DASHBOARD_REPLAY_STRICT', '') == '1'
+
+# upstream 계측 내보내기 파일 (비어 있으면 내보내지 않음)
+# Prometheus textfile collector용 파일은 매 실행마다 덮어쓰고, JSON lines 파일에는 실행별 통계를 추가
+METRICS_PROMETHEUS_FILE = os.environ.get('STOCK_DASHBOARD_METRICS_PROM', '')
+METRICS_JSONL_FILE = os.environ.get('STOCK_DASHBOARD_METRICS_JSONL', '')
+
+# 스크립트 실행 프로파일링 (1이면 모든 실행을 프로파일링, 사이드바 토글로 세션별로도 켤 수 있음)
+PROFILE_ENABLED = os.environ.get('STOCK_DASHBOARD_PROFILE', '') == '1'
+
+# 실행별 flame graph(.svg), folded stack(.folded), 상위 함수 표(.txt)를 저장하는 디렉터리
+PROFILE_DIR = os.environ.get('STOCK_DASHBOARD_PROFILE_DIR', os.path.join(CACHE_DIR, 'profiles'))
+
+# 스택 샘플링 간격(초)
+PROFILE_INTERVAL = float(os.environ.get('STOCK_DASHBOARD_PROFILE_INTERVAL', '0.005'))
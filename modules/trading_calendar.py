@@ -0,0 +1,224 @@
+import json
+import threading
+import time
+from concurrent.futures import wait
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from modules.fetch_executor import fetch_executor
+from modules.providers import get_provider
+from modules.settings import cache_path
+
+# 달력을 만들 기준 지수 (해당 지수에 일봉이 있는 날 = 거래일)
+_SESSION_SOURCES = {
+    'KRX': lambda start: get_provider().fdr_ohlcv('KS11', start.strftime('%Y-%m-%d')).index,
+    'US': lambda start: get_provider().yf_history('^GSPC', start=start.strftime('%Y-%m-%d'), auto_adjust=False).index,
+    'FX': lambda start: get_provider().yf_history('KRW=X', start=start.strftime('%Y-%m-%d'), auto_adjust=False).index
+}
+
+# 시장별 장 시작/마감 시각 (시간대, 시, 분). 외환은 런던 기준 하루
+SESSION_OPEN = {
+    'KRX': ('Asia/Seoul', 9, 0),
+    'US': ('America/New_York', 9, 30),
+    'FX': ('Europe/London', 0, 0)
+}
+SESSION_CLOSE = {
+    'KRX': ('Asia/Seoul', 15, 30),
+    'US': ('America/New_York', 16, 0),
+    'FX': ('Europe/London', 23, 59)
+}
+
+# 달력을 만드는 지수의 조회 공급자 (fetch_executor의 공급자별 요청 제한 적용)
+_SESSION_PROVIDERS = {'KRX': 'fdr', 'US': 'yfinance', 'FX': 'yfinance'}
+
+# 장 시작 후 이 시간(초)이 지나도 그날 봉이 없으면 휴장일로 보고 다시 조회하지 않음
+PUBLISH_DELAY = 3600
+
+
+def _build_index(sessions, checked_through=None):
+    """거래일 목록 -> (거래일 튜플, 첫 날짜 서수, 날짜별 그 날 이전 마지막 거래일 튜플, 휴장 확인 완료일)
+
+    조회 스레드와 갱신 스레드가 함께 읽으므로 항상 새 튜플을 만들어 통째로 교체합니다.
+    """
+    sessions = tuple(sessions)
+    if not sessions:
+        return (), None, (), checked_through
+
+    first = sessions[0].toordinal()
+    last = sessions[-1].toordinal()
+    table = [None] * (last - first + 1)
+
+    for i, session in enumerate(sessions):
+        end = sessions[i + 1].toordinal() if i + 1 < len(sessions) else last + 1
+        for ordinal in range(session.toordinal(), end):
+            table[ordinal - first] = session
+
+    return sessions, first, tuple(table), checked_through
+
+
+class TradingCalendar:
+    """거래소 거래일 달력 (로컬 파일 캐시 + O(1) 마지막 거래일 조회)"""
+
+    def __init__(self, market, history_years=10, refresh_interval=3600, pending_refresh_interval=300):
+        """
+        Args:
+            market: 'KRX', 'US' 또는 'FX' (외환 시장)
+            history_years: 처음 만들 때 조회할 과거 기간(년)
+            refresh_interval: 최신 거래일을 다시 확인하는 주기(초)
+            pending_refresh_interval: 달력 이후의 평일을 조회할 때 새 거래일이 생겼는지 다시 확인하는 주기(초)
+        """
+        self.market = market
+        self.history_years = history_years
+        self.refresh_interval = refresh_interval
+        self.pending_refresh_interval = pending_refresh_interval
+        self.path = cache_path(f"calendar_{market}.json")
+
+        self.updated_at = 0
+        self._index = _build_index([])
+        self._pending = None  # 진행 중인 조회 (fetch_executor Future)
+        self._lock = threading.Lock()
+
+        self._load()
+
+    @property
+    def sessions(self):
+        return self._index[0]
+
+    def _load(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+            checked_through = data.get('checked_through')
+            self._index = _build_index(
+                [date.fromisoformat(d) for d in data['sessions']],
+                date.fromisoformat(checked_through) if checked_through else None
+            )
+            self.updated_at = data['updated_at']
+        except (OSError, ValueError, KeyError):
+            self._index = _build_index([])
+            self.updated_at = 0
+
+    def _save(self):
+        sessions, _, _, checked_through = self._index
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'updated_at': self.updated_at,
+                'sessions': [d.isoformat() for d in sessions],
+                'checked_through': checked_through.isoformat() if checked_through else None
+            }, f)
+
+    def _checked_through(self, now):
+        """now 시점에 조회한 결과로 거래 여부가 확정된 마지막 날짜 (장 시작 후 PUBLISH_DELAY가 지난 날까지)"""
+        tz, hour, minute = SESSION_OPEN[self.market]
+        local = datetime.fromtimestamp(now, ZoneInfo(tz))
+        opened = local.replace(hour=hour, minute=minute, second=0, microsecond=0).timestamp()
+        today = local.date()
+        return today if now >= opened + PUBLISH_DELAY else today - timedelta(days=1)
+
+    def _fetch(self, start):
+        """start 이후 거래일 목록과 조회 시각 (fetch_executor 워커에서 실행)"""
+        now = time.time()
+        index = _SESSION_SOURCES[self.market](start)
+        return sorted({d.date() for d in index}), now
+
+    def _apply(self, new_sessions, fetched_at):
+        sessions = self.sessions
+        self._index = _build_index(sorted(set(sessions) | set(new_sessions)), self._checked_through(fetched_at))
+        self.updated_at = fetched_at
+        self._save()
+
+    def refresh(self):
+        """마지막으로 저장된 거래일 이후 구간만 추가로 조회하여 달력 갱신 (조회가 끝날 때까지 대기)"""
+        start = self.sessions[-1] if self.sessions else date.today() - timedelta(days=365 * self.history_years)
+        new_sessions, fetched_at = self._fetch(start)
+        with self._lock:
+            self._apply(new_sessions, fetched_at)
+
+    def _ensure_fresh(self, interval=None):
+        """갱신 주기가 지났으면 fetch_executor로 조회하고 렌더링 마감 시각까지만 대기
+
+        마감 시각까지 끝나지 않은 조회(처음 만드는 10년치 달력 등)는 계속 진행되며, 다음 호출에서 결과를 반영합니다.
+        그 사이에는 기존 달력(없으면 주말만 제외하는 규칙)으로 응답합니다.
+        """
+        interval = self.refresh_interval if interval is None else interval
+        if self._pending is None and time.time() - self.updated_at < interval:
+            return
+
+        with self._lock:
+            if self._pending is None:
+                if time.time() - self.updated_at < interval:
+                    return
+                sessions = self.sessions
+                start = sessions[-1] if sessions else date.today() - timedelta(days=365 * self.history_years)
+                self._pending = fetch_executor.submit(_SESSION_PROVIDERS[self.market], self._fetch, start)
+            future = self._pending
+
+        # 워커 스레드(일봉 병렬 조회 등)에서는 기다리지 않고 기존 달력으로 응답
+        wait([future], timeout=0 if fetch_executor.in_worker() else fetch_executor.remaining())
+        if not future.done():
+            return
+
+        with self._lock:
+            if self._pending is not future:
+                return  # 다른 스레드가 이미 반영
+            self._pending = None
+            try:
+                self._apply(*future.result())
+            except Exception:
+                # 조회 실패 시 기존 달력을 유지하고 다음 주기에 재시도
+                self.updated_at = time.time()
+
+    def last_session(self, day=None):
+        """day 당일 또는 그 이전의 마지막 거래일 (datetime.date)"""
+        day = day or date.today()
+        if isinstance(day, datetime):
+            day = day.date()
+
+        self._ensure_fresh()
+
+        # 달력의 마지막 거래일 이후 평일이면 그날 봉이 생겼을 수 있으므로 더 짧은 주기로 다시 확인
+        # (휴장 여부가 이미 확인된 날은 제외)
+        sessions, _, _, checked_through = self._index
+        if (sessions and day > sessions[-1] and day.weekday() < 5
+                and (checked_through is None or day > checked_through)):
+            self._ensure_fresh(self.pending_refresh_interval)
+
+        # 갱신 스레드가 교체하는 중에도 한 시점의 색인만 사용
+        sessions, first_ordinal, table, _ = self._index
+        if first_ordinal is not None:
+            offset = day.toordinal() - first_ordinal
+            if offset >= len(table):
+                return sessions[-1]
+            if offset >= 0:
+                return table[offset]
+
+        # 달력이 없으면 주말만 제외
+        if day.weekday() >= 5:
+            day = day - timedelta(days=day.weekday() - 4)
+        return day
+
+    def session_close(self, day):
+        """day 거래일의 장 마감 시각 (epoch 초, 시장 현지 시간대 기준)"""
+        tz, hour, minute = SESSION_CLOSE[self.market]
+        return datetime(day.year, day.month, day.day, hour, minute, tzinfo=ZoneInfo(tz)).timestamp()
+
+    def is_session(self, day):
+        """거래일 여부"""
+        return self.last_session(day) == day
+
+
+_calendars = {}
+_calendars_lock = threading.Lock()
+
+
+def get_calendar(market='KRX'):
+    """프로세스 공용 거래일 달력 인스턴스 반환"""
+    with _calendars_lock:
+        if market not in _calendars:
+            _calendars[market] = TradingCalendar(market)
+        return _calendars[market]
+
+
+def last_trading_date(market='KRX', day=None):
+    """마지막 거래일 (YYYYMMDD)"""
+    return get_calendar(market).last_session(day).strftime('%Y%m%d')
@@ -1,17 +1,30 @@
 import streamlit as st
-import yfinance as yf
 import pandas as pd
-from datetime import datetime
-import plotly.graph_objects as go
+from datetime import datetime, timedelta
+
+from modules.lazy_import import lazy_import
+from modules.metrics import upstream_metrics
+from modules.providers import YF_COLUMNS, get_provider
+from modules.profiler import script_profiler
+from modules.quote_cache import quote_cache
+from modules.trading_calendar import get_calendar, last_trading_date
+from modules.ohlcv_store import ohlcv_store
+from modules.fx import fx_service
+
+# 차트는 펼친 종목에서만 그리므로 plotly는 처음 그릴 때 import
+go = lazy_import('plotly.graph_objects')
+
+# yfinance 기간 문자열 -> 조회 일수
+PERIOD_DAYS = {'5d': 7, '1mo': 31, '3mo': 92, '6mo': 183, '1y': 366, '2y': 731, '5y': 1827, '10y': 3653}
 
 
 class USPortfolio:
     """해외 주식 포트폴리오 관리 클래스"""
 
-    def __init__(self, exchange_rate=1350):
+    def __init__(self, exchange_rate=None):
         """
         Args:
-            exchange_rate: USD/KRW 환율 (기본값: 1350원)
+            exchange_rate: USD/KRW 환율 (기본값: 실시간 환율)
         """
         # 보유주식수
         self.holdings = {
@@ -37,30 +50,124 @@ class USPortfolio:
             'OXY': 'Occidental Petroleum'
         }
 
-        # 환율
-        self.exchange_rate = exchange_rate
+        # 환율 (현재 평가금액 환산용). 지정하지 않으면 처음 사용할 때 실시간 환율 조회
+        self._exchange_rate = exchange_rate
+
+        # 일괄 조회 결과 (티커 -> OHLCV DataFrame)
+        self.batch_period = "1mo"
+        self.batch_data = {}
+
+    @property
+    def exchange_rate(self):
+        """USD/KRW 환율 (생성 시 조회하지 않고 처음 사용할 때 한 번 조회)"""
+        if self._exchange_rate is None:
+            self._exchange_rate = fx_service.live_rate()
+        return self._exchange_rate
+
+    @exchange_rate.setter
+    def exchange_rate(self, value):
+        self._exchange_rate = value
+
+    def _download_batch(self, tickers, start, end):
+        """여러 종목의 일봉을 한 번의 yfinance 요청으로 조회하여 종목별로 분리"""
+        data = get_provider().yf_download(
+            tickers,
+            start=start.strftime('%Y-%m-%d'),
+            end=(end + timedelta(days=1)).strftime('%Y-%m-%d'),
+            group_by='ticker',
+            auto_adjust=True,
+            progress=False
+        )
+
+        frames = {}
+        for ticker in tickers:
+            if isinstance(data.columns, pd.MultiIndex):
+                if ticker in data.columns.get_level_values(0):
+                    frames[ticker] = data[ticker].dropna(how='all').rename(columns=YF_COLUMNS)
+                else:
+                    frames[ticker] = pd.DataFrame()
+            else:
+                frames[ticker] = data.dropna(how='all').rename(columns=YF_COLUMNS)
+
+        return frames
+
+    def _load_batch(self, tickers, period):
+        """로컬 저장소에 없는 거래일만 일괄 조회하여 채운 뒤 종목별 OHLCV 반환"""
+        start = datetime.now() - timedelta(days=PERIOD_DAYS[period])
+        end = get_calendar('US').last_session()
+
+        # 종목마다 부족한 구간을 모아 한 번의 요청으로 조회
+        missing = {
+            ticker: ohlcv_store.missing_ranges('US', ticker, start, end)
+            for ticker in tickers
+        }
+        ranges = [r for ticker_ranges in missing.values() for r in ticker_ranges]
+
+        if ranges:
+            fetch_start = min(r[0] for r in ranges)
+            fetch_end = max(r[1] for r in ranges)
+            stale = [ticker for ticker, ticker_ranges in missing.items() if ticker_ranges]
+
+            downloaded = self._download_batch(stale, fetch_start, fetch_end)
+            for ticker in stale:
+                ohlcv_store.write('US', ticker, downloaded.get(ticker), fetch_start, fetch_end)
+
+        frames = {
+            ticker: ohlcv_store.read('US', ticker, start, end).rename(columns={v: k for k, v in YF_COLUMNS.items()})
+            for ticker in tickers
+        }
+
+        # 종목별 현재가도 공용 캐시에 채워 개별 조회를 생략
+        date = last_trading_date('US')
+        for ticker, hist in frames.items():
+            if not hist.empty:
+                quote_cache.set('US', ticker, date, round(hist['Close'].iloc[-1], 2))
+
+        return frames
+
+    def fetch_batch(self):
+        """보유 종목 전체의 시세와 1개월 OHLCV를 한 번에 조회"""
+        tickers = sorted(self.holdings)
+
+        try:
+            self.batch_data = quote_cache.get_or_fetch(
+                'US_BATCH', f"{','.join(tickers)}:{self.batch_period}", last_trading_date('US'),
+                lambda: self._load_batch(tickers, self.batch_period)
+            )
+        except Exception as e:
+            st.error(f"오류: 해외 주식 일괄 조회 중 문제가 발생했습니다: {e}")
+            self.batch_data = {}
+
+        return self.batch_data
+
+    def _fetch_current_price(self, ticker):
+        """yfinance에서 최근 종가를 조회"""
+        hist = get_provider().yf_history(ticker, period="1d")
+
+        if hist.empty:
+            return None
+        return round(hist['Close'].iloc[-1], 2)
 
     def get_current_price(self, ticker):
         """주식 심볼을 입력받아 현재 가격을 반환하는 함수"""
         try:
-            stock = yf.Ticker(ticker)
-            hist = stock.history(period="1d")
-
-            if not hist.empty:
-                current_price = hist['Close'].iloc[-1]
-                return round(current_price, 2)
-            else:
-                return None
+            return quote_cache.get_or_fetch(
+                'US', ticker, last_trading_date('US'),
+                lambda: self._fetch_current_price(ticker)
+            )
 
         except Exception as e:
             st.error(f"오류: {ticker} 조회 중 문제가 발생했습니다: {e}")
             return None
 
+    def _fetch_info(self, ticker):
+        """yfinance에서 종목 정보를 조회 (워커 스레드에서 실행 가능)"""
+        return get_provider().yf_info(ticker)
+
     def get_stock_info(self, ticker):
         """주식의 상세 정보를 조회하는 함수"""
         try:
-            stock_obj = yf.Ticker(ticker)
-            info = stock_obj.info
+            info = self._fetch_info(ticker)
 
             stock_info = {
                 'symbol': ticker,
@@ -84,6 +191,9 @@ class USPortfolio:
 
     def get_portfolio_summary(self):
         """포트폴리오 전체 요약 데이터 반환 (USD 및 KRW)"""
+        if not self.batch_data:
+            self.fetch_batch()
+
         total_investment = 0
         total_current_value = 0
 
@@ -114,31 +224,189 @@ class USPortfolio:
             'exchange_rate': self.exchange_rate
         }
 
+    def get_ledger_summary(self, trades):
+        """거래내역 기준 종목별 원화 손익 (매입 금액은 거래일 환율, 평가금액은 실시간 환율로 환산)
+
+        Args:
+            trades: '날짜', '티커', '수량', '금액' 컬럼의 해외 종목 거래 목록 (수량/금액은 매수 +, 매도 -, 금액은 USD)
+
+        Returns:
+            종목별 보유수량, 순매입금액(USD/원), 평가금액(원), 손익(원), 환차손익(원) DataFrame
+        """
+        if trades.empty:
+            return pd.DataFrame()
+
+        # 모든 거래의 원화 매입 금액을 한 번에 환산
+        trades = trades.assign(원화금액=fx_service.convert(trades['금액'], trades['날짜']))
+        summary = trades.groupby('티커', sort=False).agg(
+            보유수량=('수량', 'sum'),
+            순매입금액_USD=('금액', 'sum'),
+            순매입금액_원=('원화금액', 'sum')
+        )
+
+        prices = pd.Series({ticker: self.get_current_price(ticker) for ticker in summary.index}, dtype=float)
+        value_usd = summary['보유수량'] * prices
+        summary['평가금액(원)'] = value_usd * self.exchange_rate
+        summary['손익(원)'] = summary['평가금액(원)'] - summary['순매입금액_원']
+        # 환차손익: 순매입 달러를 현재 환율로 바꿨을 때와 거래일 환율로 바꿨을 때의 차이
+        summary['환차손익(원)'] = summary['순매입금액_USD'] * self.exchange_rate - summary['순매입금액_원']
+
+        return summary.rename(columns={
+            '순매입금액_USD': '순매입금액(USD)',
+            '순매입금액_원': '순매입금액(원)'
+        }).reset_index()
+
+    def _fetch_ohlcv(self, ticker, start, end):
+        """yfinance에서 [start, end] 구간의 일봉을 조회"""
+        hist = get_provider().yf_history(
+            ticker,
+            start=start.strftime('%Y-%m-%d'),
+            end=(end + timedelta(days=1)).strftime('%Y-%m-%d')
+        )
+        return hist.rename(columns=YF_COLUMNS)
+
     def get_historical_data(self, ticker, period="1mo"):
         """주식의 과거 데이터를 조회하는 함수"""
+        # 일괄 조회한 기간이면 그 결과를 그대로 사용
+        if period == self.batch_period and ticker in self.batch_data:
+            return self.batch_data[ticker]
+
         try:
-            stock = yf.Ticker(ticker)
-            hist = stock.history(period=period)
+            if period in PERIOD_DAYS:
+                # 로컬 저장소에서 읽고 부족한 거래일만 조회
+                hist = ohlcv_store.get_history(
+                    'US', ticker, datetime.now() - timedelta(days=PERIOD_DAYS[period]), datetime.now(),
+                    lambda start, end: self._fetch_ohlcv(ticker, start, end)
+                )
+                return hist.rename(columns={v: k for k, v in YF_COLUMNS.items()})
+
+            hist = get_provider().yf_history(ticker, period=period)
             return hist
         except Exception as e:
             st.error(f"과거 데이터 조회 중 오류 발생: {e}")
             return None
 
-    def display_dashboard(self):
-        """Streamlit 대시보드 표시"""
+    def display_dashboard(self, refresh_interval=None):
+        """Streamlit 대시보드 표시
+
+        Args:
+            refresh_interval: 요약/상세 테이블(현재가)을 자동 갱신하는 주기(초). None이면 갱신하지 않음
+        """
 
-        # 환율 설정
+        # 환율 설정 (기본값은 실시간 환율)
         exchange_rate_input = st.number_input(
             "환율 설정 (USD/KRW)",
-            min_value=1000,
-            max_value=2000,
-            value=self.exchange_rate,
-            step=10
+            min_value=1000.0,
+            max_value=2000.0,
+            value=float(self.exchange_rate),
+            step=10.0,
+            key="us_exchange_rate"
         )
         self.exchange_rate = exchange_rate_input
 
         st.markdown("---")
 
+        # 현재가에 의존하는 요약/상세 테이블만 주기적으로 다시 실행 (차트는 그대로 유지)
+        upstream_metrics.fragment(self.display_summary, run_every=refresh_interval)()
+
+        st.markdown("---")
+
+        # 개별 종목 차트
+        st.subheader("종목별 30일 가격 추이")
+
+        # 종목을 펼쳐 '차트 보기'를 켠 경우에만 데이터를 조회하고 차트를 생성
+        for ticker in self.holdings:
+            with st.expander(f"📈 {self.stock_names[ticker]} ({ticker})"):
+                upstream_metrics.fragment(self.display_chart)(ticker)
+
+    @script_profiler.profiled('chart building')
+    def build_chart(self, ticker):
+        """30일 캔들스틱 차트와 상세 정보 생성 (데이터가 없으면 None)"""
+        hist_data = self.get_historical_data(ticker, period="1mo")
+
+        if hist_data is None or hist_data.empty:
+            return None
+
+        # Plotly 캔들스틱 차트
+        fig = go.Figure(data=[go.Candlestick(
+            x=hist_data.index,
+            open=hist_data['Open'],
+            high=hist_data['High'],
+            low=hist_data['Low'],
+            close=hist_data['Close']
+        )])
+
+        fig.update_layout(
+            title=f"{self.stock_names[ticker]} 30일 가격 차트",
+            yaxis_title="가격 (USD)",
+            xaxis_title="날짜",
+            height=400
+        )
+
+        return fig, self.get_stock_info(ticker)
+
+    def display_chart(self, ticker):
+        """종목 차트 및 상세 정보 표시 (요청 시에만 생성하고 세션별로 캐시)"""
+        if not st.toggle("차트 보기", key=f"us_chart_open_{ticker}"):
+            return
+
+        trading_date = last_trading_date('US')
+        charts = st.session_state.setdefault('us_charts', {})
+        # 이전 거래일 차트는 다시 쓰지 않으므로 정리
+        for stale in [key for key in charts if key[1] != trading_date]:
+            del charts[stale]
+
+        key = (ticker, trading_date)
+        if key not in charts:
+            chart = self.build_chart(ticker)
+            if chart is None:
+                # 일시적인 조회 실패일 수 있으므로 캐시하지 않고 다음 실행에서 다시 시도
+                st.warning(f"{self.stock_names[ticker]} 차트 데이터를 불러올 수 없습니다.")
+                return
+            charts[key] = chart
+
+        fig, info = charts[key]
+        st.plotly_chart(fig, use_container_width=True)
+
+        # 상세 정보
+        if info:
+            col1, col2, col3, col4 = st.columns(4)
+
+            with col1:
+                if info['previous_close'] != 'N/A':
+                    st.metric("전일종가", f"${info['previous_close']:.2f}")
+                else:
+                    st.metric("전일종가", "N/A")
+
+            with col2:
+                if info['52_week_high'] != 'N/A':
+                    st.metric("52주 최고가", f"${info['52_week_high']:.2f}")
+                else:
+                    st.metric("52주 최고가", "N/A")
+
+            with col3:
+                if info['52_week_low'] != 'N/A':
+                    st.metric("52주 최저가", f"${info['52_week_low']:.2f}")
+                else:
+                    st.metric("52주 최저가", "N/A")
+
+            with col4:
+                if info['pe_ratio'] != 'N/A':
+                    st.metric("PER", f"{info['pe_ratio']:.2f}")
+                else:
+                    st.metric("PER", "N/A")
+
+            # 추가 정보
+            if info['market_cap'] != 'N/A':
+                st.info(f"시가총액: ${info['market_cap']:,}")
+            if info['dividend_yield'] != 'N/A':
+                st.info(f"배당수익률: {info['dividend_yield']:.2%}")
+
+    def display_summary(self):
+        """포트폴리오 요약 메트릭 및 보유 종목 상세 테이블 표시"""
+        # 요약, 상세 테이블, 차트가 모두 같은 일괄 조회 결과를 사용
+        self.fetch_batch()
+
         # 전체 포트폴리오 요약
         summary = self.get_portfolio_summary()
 
@@ -215,68 +483,3 @@ class USPortfolio:
         }).map(lambda x: 'color: #00FF00' if '+' in str(x) else ('color: #FF0000' if '-' in str(x) else ''), subset=['수익률', '손익', '손익(원)'])
         
         st.dataframe(styled_df, use_container_width=True, hide_index=True)
-
-        st.markdown("---")
-
-        # 개별 종목 차트
-        st.subheader("종목별 30일 가격 추이")
-
-        for ticker in self.holdings:
-            with st.expander(f"📈 {self.stock_names[ticker]} ({ticker})"):
-                hist_data = self.get_historical_data(ticker, period="1mo")
-
-                if hist_data is not None and not hist_data.empty:
-                    # Plotly 캔들스틱 차트
-                    fig = go.Figure(data=[go.Candlestick(
-                        x=hist_data.index,
-                        open=hist_data['Open'],
-                        high=hist_data['High'],
-                        low=hist_data['Low'],
-                        close=hist_data['Close']
-                    )])
-
-                    fig.update_layout(
-                        title=f"{self.stock_names[ticker]} 30일 가격 차트",
-                        yaxis_title="가격 (USD)",
-                        xaxis_title="날짜",
-                        height=400
-                    )
-
-                    st.plotly_chart(fig, use_container_width=True)
-
-                    # 상세 정보
-                    info = self.get_stock_info(ticker)
-                    if info:
-                        col1, col2, col3, col4 = st.columns(4)
-
-                        with col1:
-                            if info['previous_close'] != 'N/A':
-                                st.metric("전일종가", f"${info['previous_close']:.2f}")
-                            else:
-                                st.metric("전일종가", "N/A")
-
-                        with col2:
-                            if info['52_week_high'] != 'N/A':
-                                st.metric("52주 최고가", f"${info['52_week_high']:.2f}")
-                            else:
-                                st.metric("52주 최고가", "N/A")
-
-                        with col3:
-                            if info['52_week_low'] != 'N/A':
-                                st.metric("52주 최저가", f"${info['52_week_low']:.2f}")
-                            else:
-                                st.metric("52주 최저가", "N/A")
-
-                        with col4:
-                            if info['pe_ratio'] != 'N/A':
-                                st.metric("PER", f"{info['pe_ratio']:.2f}")
-                            else:
-                                st.metric("PER", "N/A")
-
-                        # 추가 정보
-                        if info['market_cap'] != 'N/A':
-                            st.info(f"시가총액: ${info['market_cap']:,}")
-                        if info['dividend_yield'] != 'N/A':
-                            st.info(f"배당수익률: {info['dividend_yield']:.2%}")
-                else:
-                    st.warning(f"{self.stock_names[ticker]} 차트 데이터를 불러올 수 없습니다.")
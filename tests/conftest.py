@@ -0,0 +1,7 @@
+import os
+import sys
+import tempfile
+
+# 모듈 import 전에 빈 캐시 디렉터리를 지정 (저장소/달력 파일이 작업 디렉터리에 생기지 않도록)
+os.environ.setdefault('STOCK_DASHBOARD_CACHE_DIR', tempfile.mkdtemp(prefix='stock-dashboard-test-'))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
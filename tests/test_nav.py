@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+
+from modules.analytics import account_analytics
+from modules.nav import NavEngine
+
+
+def _closes(days, last_close=None):
+    dates = pd.bdate_range('2024-01-01', periods=days)
+    closes = pd.DataFrame({'AAA': np.linspace(100, 100 + days - 1, days)}, index=dates)
+    if last_close is not None:
+        closes.iloc[-1, 0] = last_close
+    return closes
+
+
+def _trades(*rows):
+    return pd.DataFrame(
+        [(pd.Timestamp(day), 'ACC', 'AAA', qty, np.nan) for day, qty in rows],
+        columns=['날짜', '계좌', '티커', '수량', '금액']
+    )
+
+
+def test_unchanged_when_trades_and_closes_are_identical():
+    engine = NavEngine()
+    trades = _trades(('2024-01-01', 10))
+    engine.update(trades, _closes(5))
+    version = engine.version
+
+    engine.update(trades, _closes(5))
+
+    assert engine.last_update == 'unchanged'
+    assert engine.version == version
+
+
+def test_intraday_close_change_recomputes_last_row_and_bumps_version():
+    engine = NavEngine()
+    trades = _trades(('2024-01-01', 10))
+    engine.update(trades, _closes(5))
+    version = engine.version
+    before = account_analytics(engine, 'ACC')
+
+    nav = engine.update(trades, _closes(5, last_close=200))
+
+    assert engine.last_update == 'incremental'
+    assert engine.version == version + 1
+    assert nav['ACC'].iloc[-1] == 2000
+    assert account_analytics(engine, 'ACC')['twr'] != before['twr']
+
+
+def test_new_session_and_trade_update_incrementally():
+    engine = NavEngine()
+    engine.update(_trades(('2024-01-01', 10)), _closes(5))
+    version = engine.version
+
+    closes = _closes(6)
+    nav = engine.update(_trades(('2024-01-01', 10), ('2024-01-08', 5)), closes)
+
+    expected = NavEngine().update(_trades(('2024-01-01', 10), ('2024-01-08', 5)), closes)
+    assert engine.last_update == 'incremental'
+    assert engine.version == version + 1
+    pd.testing.assert_frame_equal(nav, expected)